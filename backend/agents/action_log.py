@@ -0,0 +1,166 @@
+"""
+Action Log - Bounded per-agent action rings with running counters and pluggable sinks
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+DEFAULT_CAPACITY = int(os.environ.get("ACTION_LOG_CAPACITY", "1024"))
+ACTION_LOG_PATH = os.environ.get("ACTION_LOG_PATH")
+
+# Offset that turns a monotonic timestamp into wall-clock epoch nanoseconds
+_WALL_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+
+class ActionRecord:
+    """One logged agent action; timestamp is time.monotonic_ns(), data_accessed the data categories it touched"""
+
+    __slots__ = ("agent_id", "action", "details", "timestamp_ns", "data_accessed")
+
+    def __init__(self, agent_id: str, action: str, details: Optional[dict], timestamp_ns: int,
+                 data_accessed: tuple = ()):
+        self.agent_id = agent_id
+        self.action = action
+        self.details = details
+        self.timestamp_ns = timestamp_ns
+        self.data_accessed = data_accessed
+
+    @property
+    def wall_time(self) -> float:
+        """Epoch seconds"""
+        return (self.timestamp_ns + _WALL_OFFSET_NS) / 1e9
+
+    def to_dict(self) -> Dict:
+        return {
+            "agent_id": self.agent_id,
+            "action": self.action,
+            "details": self.details,
+            "data_accessed": list(self.data_accessed),
+            "timestamp": datetime.fromtimestamp(self.wall_time).isoformat()
+        }
+
+
+_sinks: List[Callable[[ActionRecord], None]] = []
+
+
+def register_sink(sink: Callable[[ActionRecord], None]):
+    """Send every future action record from every agent to `sink`; it must not block"""
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def unregister_sink(sink: Callable[[ActionRecord], None]):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def registered_sinks() -> List[Callable[[ActionRecord], None]]:
+    """Sinks currently receiving action records"""
+    return list(_sinks)
+
+
+class ActionLog:
+    """Fixed-capacity ring of an agent's most recent actions plus lifetime per-action counters"""
+
+    def __init__(self, agent_id: str, capacity: int = DEFAULT_CAPACITY):
+        self.agent_id = sys.intern(agent_id)
+        self.capacity = capacity
+        self._records: List[Optional[ActionRecord]] = [None] * capacity
+        self._head = 0
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def append(self, action: str, details: dict = None, data_accessed: List[str] = None) -> ActionRecord:
+        """Record an action, overwriting the oldest once the ring is full"""
+        action = sys.intern(action)
+        record = ActionRecord(self.agent_id, action, details, time.monotonic_ns(),
+                              tuple(data_accessed) if data_accessed else ())
+        with self._lock:
+            self._records[self._head] = record
+            self._head = (self._head + 1) % self.capacity
+            self.total += 1
+            self.counts[action] = self.counts.get(action, 0) + 1
+        for sink in _sinks:
+            sink(record)
+        return record
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def __iter__(self) -> Iterator[ActionRecord]:
+        """Retained records, oldest first"""
+        with self._lock:
+            if self.total < self.capacity:
+                records = self._records[:self._head]
+            else:
+                records = self._records[self._head:] + self._records[:self._head]
+        return iter(records)
+
+    def recent(self, n: int = 50) -> List[Dict]:
+        """The last n actions as dicts, newest last"""
+        records = list(self)
+        return [record.to_dict() for record in records[max(0, len(records) - n):]]
+
+
+class FileSink:
+    """Buffers action records and appends them to a JSON-lines file from a background thread"""
+
+    def __init__(self, path: str, flush_interval: float = 1.0, max_buffer: int = 100000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer = deque(maxlen=max_buffer)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, record: ActionRecord):
+        self._buffer.append(record)
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="action-log-sink", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write out anything still buffered"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.flush()
+
+    def flush(self) -> int:
+        """Write buffered records in one append; returns the number written"""
+        lines = []
+        while self._buffer:
+            try:
+                record = self._buffer.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps(record.to_dict(), default=str))
+        if lines:
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        return len(lines)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+# Optional file sink, enabled by ACTION_LOG_PATH
+file_sink = FileSink(ACTION_LOG_PATH) if ACTION_LOG_PATH else None
+if file_sink is not None:
+    register_sink(file_sink)
@@ -0,0 +1,235 @@
+"""
+Streaming Anomaly Detectors - History-aware per-vehicle, per-sensor detectors in compact arrays
+"""
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class StreamingDetector(ABC):
+    """Base class for detectors whose state lives in (slots x sensors) arrays.
+
+    update() scores incoming values against the state built from earlier readings,
+    then folds them in. Scores and flags of the latest reading stay in arrays so
+    the whole fleet can be evaluated with one vectorized read.
+    """
+
+    name = "detector"
+
+    def __init__(self, n_sensors: int):
+        self.n_sensors = n_sensors
+        self.capacity = 0
+        self.score = np.zeros((0, n_sensors))
+        self.flag = np.zeros((0, n_sensors), dtype=bool)
+
+    def _state_shapes(self) -> Dict[str, Tuple[tuple, type, float]]:
+        """Per-slot state arrays: name -> (trailing shape, dtype, fill value)"""
+        return {}
+
+    def grow(self, capacity: int):
+        """Resize all state arrays to hold `capacity` slots"""
+        shapes = {"score": ((self.n_sensors,), np.float64, 0.0), "flag": ((self.n_sensors,), bool, False)}
+        shapes.update(self._state_shapes())
+        for name, (trailing, dtype, fill) in shapes.items():
+            array = np.full((capacity,) + trailing, fill, dtype=dtype)
+            if self.capacity:
+                array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    @abstractmethod
+    def update(self, slots: np.ndarray, values: np.ndarray):
+        """Score and absorb (k x sensors) values for k distinct slots; NaN means missing"""
+
+
+class EWMAZScoreDetector(StreamingDetector):
+    """Flags values far from an exponentially weighted mean in units of its EW standard deviation"""
+
+    name = "ewma_zscore"
+
+    def __init__(self, n_sensors: int, alpha: float = 0.1, threshold: float = 3.0, warmup: int = 10):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        super().__init__(n_sensors)
+
+    def _state_shapes(self):
+        trailing = (self.n_sensors,)
+        return {"mean": (trailing, np.float64, 0.0), "var": (trailing, np.float64, 0.0), "n": (trailing, np.int64, 0)}
+
+    def update(self, slots: np.ndarray, values: np.ndarray):
+        present = np.isfinite(values)
+        x = np.where(present, values, 0.0)
+        mean, var, n = self.mean[slots], self.var[slots], self.n[slots]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = np.abs(x - mean) / np.sqrt(var)
+        z = np.where(present & (n >= self.warmup) & (var > 0), z, 0.0)
+        self.score[slots] = z
+        self.flag[slots] = z > self.threshold
+
+        first = present & (n == 0)
+        diff = x - mean
+        increment = self.alpha * diff
+        self.mean[slots] = np.where(first, x, np.where(present, mean + increment, mean))
+        self.var[slots] = np.where(present & ~first, (1 - self.alpha) * (var + diff * increment), var)
+        self.n[slots] = n + present
+
+
+class CUSUMDetector(StreamingDetector):
+    """Two-sided CUSUM on values standardized against a baseline learned over the first readings"""
+
+    name = "cusum"
+
+    def __init__(self, n_sensors: int, k: float = 0.5, h: float = 8.0, warmup: int = 50):
+        self.k = k
+        self.h = h
+        self.warmup = warmup
+        super().__init__(n_sensors)
+
+    def _state_shapes(self):
+        trailing = (self.n_sensors,)
+        return {
+            "n": (trailing, np.int64, 0),
+            "base_mean": (trailing, np.float64, 0.0),
+            "base_m2": (trailing, np.float64, 0.0),
+            "s_high": (trailing, np.float64, 0.0),
+            "s_low": (trailing, np.float64, 0.0)
+        }
+
+    def update(self, slots: np.ndarray, values: np.ndarray):
+        present = np.isfinite(values)
+        x = np.where(present, values, 0.0)
+        n = self.n[slots]
+        learning = present & (n < self.warmup)
+        monitoring = present & ~learning
+
+        # Baseline: Welford over the warmup readings, frozen afterwards
+        mean, m2 = self.base_mean[slots], self.base_m2[slots]
+        count = n + learning
+        delta = np.where(learning, x - mean, 0.0)
+        mean = mean + delta / np.maximum(count, 1)
+        m2 = m2 + np.where(learning, delta * (x - mean), 0.0)
+        self.base_mean[slots] = mean
+        self.base_m2[slots] = m2
+        self.n[slots] = n + present
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(m2 / np.maximum(np.minimum(count, self.warmup), 1))
+            z = np.where(std > 0, (x - mean) / std, 0.0)
+        s_high = np.where(monitoring, np.maximum(0.0, self.s_high[slots] + z - self.k), self.s_high[slots])
+        s_low = np.where(monitoring, np.maximum(0.0, self.s_low[slots] - z - self.k), self.s_low[slots])
+        self.s_high[slots] = s_high
+        self.s_low[slots] = s_low
+
+        score = np.maximum(s_high, s_low)
+        self.score[slots] = score
+        self.flag[slots] = score > self.h
+
+
+class RollingQuantileDetector(StreamingDetector):
+    """Flags values outside a band around rolling low/high quantiles of the last `window` readings"""
+
+    name = "rolling_quantile"
+
+    def __init__(self, n_sensors: int, window: int = 32, low: float = 0.05, high: float = 0.95,
+                 tolerance: float = 0.5, warmup: int = 16):
+        self.window = window
+        self.low = low
+        self.high = high
+        self.tolerance = tolerance
+        self.warmup = warmup
+        super().__init__(n_sensors)
+
+    def _state_shapes(self):
+        return {
+            "ring": ((self.n_sensors, self.window), np.float32, np.nan),
+            "head": ((self.n_sensors,), np.int64, 0),
+            "n": ((self.n_sensors,), np.int64, 0)
+        }
+
+    def update(self, slots: np.ndarray, values: np.ndarray):
+        present = np.isfinite(values)
+        ring = self.ring[slots]
+        n = self.n[slots]
+
+        ready = present & (n >= self.warmup)
+        score = np.zeros(values.shape)
+        if ready.any():
+            low, high = np.nanquantile(ring[ready], [self.low, self.high], axis=1)
+            spread = np.maximum(high - low, 1e-9)
+            x = values[ready]
+            outside = np.maximum(low - self.tolerance * spread - x, x - high - self.tolerance * spread)
+            score[ready] = np.maximum(outside, 0.0) / spread
+        self.score[slots] = score
+        self.flag[slots] = score > 0
+
+        head = self.head[slots]
+        rows, sensors = np.nonzero(present)
+        self.ring[slots[rows], sensors, head[rows, sensors]] = values[rows, sensors]
+        self.head[slots] = np.where(present, (head + 1) % self.window, head)
+        self.n[slots] = np.minimum(n + present, self.window)
+
+
+class DetectorBank:
+    """Pluggable set of streaming detectors sharing one vehicle -> slot index"""
+
+    def __init__(self, n_sensors: int, detectors: Optional[List[StreamingDetector]] = None, initial_slots: int = 16):
+        self.n_sensors = n_sensors
+        self.detectors: List[StreamingDetector] = []
+        self._slots: Dict[str, int] = {}
+        self.vehicle_ids: List[str] = []
+        self._capacity = initial_slots
+        self._lock = threading.Lock()
+        if detectors is None:
+            detectors = [EWMAZScoreDetector(n_sensors), CUSUMDetector(n_sensors), RollingQuantileDetector(n_sensors)]
+        for detector in detectors:
+            self.register(detector)
+
+    def register(self, detector: StreamingDetector):
+        """Add a detector; it starts with empty state for every vehicle"""
+        detector.grow(self._capacity)
+        self.detectors.append(detector)
+
+    def _slot(self, vehicle_id: str) -> int:
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            slot = len(self.vehicle_ids)
+            if slot >= self._capacity:
+                self._capacity *= 2
+                for detector in self.detectors:
+                    detector.grow(self._capacity)
+            self._slots[vehicle_id] = slot
+            self.vehicle_ids.append(vehicle_id)
+        return slot
+
+    def update(self, vehicle_id: str, values: np.ndarray):
+        """Feed one reading to every detector"""
+        self.update_batch([vehicle_id], np.asarray(values, dtype=np.float64)[None, :])
+
+    def update_batch(self, vehicle_ids: List[str], values: np.ndarray):
+        """Feed (k x sensors) readings for k distinct vehicles to every detector in one pass"""
+        with self._lock:
+            slots = np.fromiter((self._slot(v) for v in vehicle_ids), dtype=np.int64, count=len(vehicle_ids))
+            values = np.asarray(values, dtype=np.float64)
+            for detector in self.detectors:
+                detector.update(slots, values)
+
+    def vehicle_flags(self, vehicle_id: str) -> Dict[str, np.ndarray]:
+        """Latest flags per detector for one vehicle as (sensors,) arrays"""
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            return {}
+        return {detector.name: detector.flag[slot].copy() for detector in self.detectors}
+
+    def evaluate(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Fleet-wide pass: vehicle ids, (vehicles x sensors x detectors) flags and scores"""
+        with self._lock:
+            n = len(self.vehicle_ids)
+            if not self.detectors:
+                empty = np.zeros((n, self.n_sensors, 0))
+                return list(self.vehicle_ids), empty.astype(bool), empty
+            flags = np.stack([detector.flag[:n] for detector in self.detectors], axis=2)
+            scores = np.stack([detector.score[:n] for detector in self.detectors], axis=2)
+            return list(self.vehicle_ids), flags, scores
@@ -5,6 +5,10 @@ Implements persuasive conversational AI for service recommendations
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import random
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitoring.metrics import timed
+from .action_log import ActionLog
 
 class CustomerEngagementAgent:
     """Worker agent for customer communication and engagement"""
@@ -13,18 +17,14 @@ class CustomerEngagementAgent:
         self.agent_id = "customer_engagement_agent"
         self.name = "Customer Engagement Agent"
         self.permissions = ["read_customer", "read_diagnosis", "send_notification", "initiate_chat"]
-        self.action_log = []
+        self.action_log = ActionLog(self.agent_id)
         self.conversation_state = {}
     
-    def log_action(self, action: str, details: dict = None):
+    def log_action(self, action: str, details: dict = None, data_accessed: List[str] = None):
         """Log agent action for UEBA monitoring"""
-        self.action_log.append({
-            "agent_id": self.agent_id,
-            "action": action,
-            "details": details,
-            "timestamp": datetime.now().isoformat()
-        })
+        self.action_log.append(action, details, data_accessed)
     
+    @timed
     def initiate_conversation(self, vehicle: Dict, diagnosis: Dict, owner: Dict) -> Dict[str, Any]:
         """Start a proactive conversation with vehicle owner"""
         self.log_action("initiate_conversation", {"vehicle_id": vehicle.get("id"), "owner": owner.get("name")})
@@ -111,6 +111,7 @@ class CustomerEngagementAgent:
             f"Would you like to schedule a convenient appointment?"
         )
     
+    @timed
     def process_response(self, conversation_id: str, user_message: str) -> Dict[str, Any]:
         """Process user response and generate appropriate reply"""
         self.log_action("process_response", {"conversation_id": conversation_id})
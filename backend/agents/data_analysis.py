@@ -5,6 +5,125 @@ Detects early warning signs and forecasts service demand
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import numpy as np
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.vehicles import SENSOR_NAMES, SENSOR_UNITS, SENSOR_MIN, SENSOR_MAX, STATUS_LABELS, sensor_arrays
+from monitoring.metrics import timed
+from .streaming_stats import SensorStatsBank
+from .anomaly_detectors import DetectorBank
+from .action_log import ActionLog
+
+# Deviation from a historical average, as a fraction of the sensor's normal band, that counts as drift
+HISTORICAL_DEVIATION = 0.5
+# Recommendation per sensor-name fragment; the first fragment found in a sensor's name wins
+SENSOR_RECOMMENDATIONS = {
+    "engine_temp": "Schedule cooling system inspection",
+    "oil_pressure": "Check oil level and quality, possible pump issue",
+    "battery_voltage": "Battery health check required",
+    "brake_pad_wear": "Brake pad replacement needed",
+    "tire_pressure": "Check tire condition and inflation",
+    "coolant_level": "Coolant top-up or leak inspection needed",
+    "transmission_temp": "Transmission fluid check recommended",
+    "air_filter_health": "Air filter replacement due"
+}
+
+
+def sensor_recommendation(sensor: str) -> str:
+    """Get recommendation based on sensor reading"""
+    for key, rec in SENSOR_RECOMMENDATIONS.items():
+        if key in sensor:
+            return rec
+    return "Inspection recommended"
+
+
+_RECOMMENDATIONS = [sensor_recommendation(name) for name in SENSOR_NAMES]
+
+
+def sensor_anomalies(values: np.ndarray, status: np.ndarray, drift: Dict[int, List[str]], timestamp: str) -> List[Dict]:
+    """Anomalies for one vehicle's (sensors,) values and statuses, NaN meaning not reported.
+
+    Warning and critical sensors come first, then sensors that only drifted;
+    drift maps a sensor column to the detectors or checks that flagged it.
+    """
+    anomalies = []
+    for i in np.flatnonzero(status):
+        anomaly = {
+            "sensor": SENSOR_NAMES[i],
+            "value": round(float(values[i]), 2),
+            "unit": SENSOR_UNITS[i],
+            "severity": STATUS_LABELS[status[i]],
+            "timestamp": timestamp,
+            "recommendation": _RECOMMENDATIONS[i]
+        }
+        if i in drift:
+            anomaly["detectors"] = drift[i]
+        anomalies.append(anomaly)
+    for i in sorted(drift):
+        if status[i] or np.isnan(values[i]):
+            continue
+        anomalies.append({
+            "sensor": SENSOR_NAMES[i],
+            "value": round(float(values[i]), 2),
+            "unit": SENSOR_UNITS[i],
+            "severity": "warning",
+            "type": "drift",
+            "detectors": drift[i],
+            "timestamp": timestamp,
+            "recommendation": _RECOMMENDATIONS[i]
+        })
+    return anomalies
+
+
+def dtc_anomalies(dtcs: List[Dict]) -> List[Dict]:
+    """Active DTCs as anomalies"""
+    return [
+        {
+            "type": "dtc",
+            "code": dtc["code"],
+            "description": dtc["description"],
+            "severity": dtc["severity"],
+            "component": dtc["component"],
+            "first_occurrence": dtc.get("first_occurrence")
+        }
+        for dtc in dtcs
+    ]
+
+
+def detector_drift(detector_names: List[str], flags: np.ndarray) -> Dict[int, List[str]]:
+    """Sensor column -> names of the detectors flagging it, from one vehicle's (sensors x detectors) flags"""
+    return {int(i): [detector_names[d] for d in np.flatnonzero(flags[i])] for i in np.flatnonzero(flags.any(axis=1))}
+
+
+def risk_assessments(vehicle_ids: List[str], health: np.ndarray, alerts: np.ndarray, unscheduled: np.ndarray,
+                     odometer: np.ndarray) -> List[Dict]:
+    """get_vehicle_risk_assessment for many vehicles, scoring them in one pass"""
+    score = np.where(health < 60, 40, np.where(health < 80, 20, 0)) + alerts * 15
+    score = score + np.where(unscheduled >= 2, 25, 0) + np.where(odometer > 75000, 15, 0)
+
+    assessments = []
+    for i, vehicle_id in enumerate(vehicle_ids):
+        risk_factors = []
+        if health[i] < 60:
+            risk_factors.append("Low health score")
+        elif health[i] < 80:
+            risk_factors.append("Moderate health score")
+        if alerts[i] > 0:
+            risk_factors.append(f"{int(alerts[i])} active alerts")
+        if unscheduled[i] >= 2:
+            risk_factors.append("Recurring unscheduled repairs")
+        if odometer[i] > 75000:
+            risk_factors.append("High mileage vehicle")
+        risk_score = int(score[i])
+        assessments.append({
+            "vehicle_id": vehicle_id,
+            "risk_score": min(100, risk_score),
+            "risk_level": "high" if risk_score >= 60 else "medium" if risk_score >= 30 else "low",
+            "risk_factors": risk_factors,
+            "recommendation": "Immediate attention required" if risk_score >= 60 else
+                            "Schedule preventive maintenance" if risk_score >= 30 else
+                            "Continue monitoring"
+        })
+    return assessments
 
 class DataAnalysisAgent:
     """Worker agent for analyzing vehicle telematics data"""
@@ -13,17 +132,45 @@ class DataAnalysisAgent:
         self.agent_id = "data_analysis_agent"
         self.name = "Data Analysis Agent"
         self.permissions = ["read_telematics", "read_maintenance", "write_analysis"]
-        self.action_log = []
+        self.action_log = ActionLog(self.agent_id)
+        self.sensor_stats = SensorStatsBank(len(SENSOR_NAMES))
+        self.detectors = DetectorBank(len(SENSOR_NAMES))
     
-    def log_action(self, action: str, details: dict = None):
+    def log_action(self, action: str, details: dict = None, data_accessed: List[str] = None):
         """Log agent action for UEBA monitoring"""
-        self.action_log.append({
-            "agent_id": self.agent_id,
-            "action": action,
-            "details": details,
-            "timestamp": datetime.now().isoformat()
-        })
+        self.action_log.append(action, details, data_accessed)
     
+    def observe_reading(self, vehicle_id: str, timestamp: float, values: np.ndarray):
+        """Fold an ingested reading into the streaming statistics and detectors (TelemetryStore listener)"""
+        self.sensor_stats.update(vehicle_id, values)
+        self.detectors.update(vehicle_id, values)
+    
+    @timed
+    def get_vehicle_trends(self, vehicle_id: str) -> Dict[str, Any]:
+        """Sensor trends from streaming statistics, independent of history length"""
+        self.log_action("analyze_sensor_trends", {"vehicle_id": vehicle_id})
+        
+        stats = self.sensor_stats.snapshot(vehicle_id)
+        if stats is None:
+            return {"status": "no_data"}
+        
+        trends = {}
+        for i, sensor_name in enumerate(SENSOR_NAMES):
+            if stats["count"][i] == 0:
+                continue
+            trends[sensor_name] = {
+                "current": round(float(stats["current"][i]), 2),
+                "average": round(float(stats["mean"][i]), 2),
+                "min": round(float(stats["min"][i]), 2),
+                "max": round(float(stats["max"][i]), 2),
+                "trend": self._classify_slope(stats["slope"][i]),
+                "volatility": round(float(stats["std"][i]), 2) if stats["count"][i] > 1 else 0,
+                "samples": int(stats["count"][i])
+            }
+        
+        return trends
+    
+    @timed
     def analyze_sensor_trends(self, readings: List[Dict]) -> Dict[str, Any]:
         """Analyze trends in sensor readings over time"""
         self.log_action("analyze_sensor_trends", {"readings_count": len(readings)})
@@ -31,18 +178,40 @@ class DataAnalysisAgent:
         if not readings:
             return {"status": "no_data"}
         
+        sensor_names = list(readings[0].get("sensors", {}).keys())
+        values = np.array([
+            [r.get("sensors", {}).get(name, {}).get("value", np.nan) for r in readings]
+            for name in sensor_names
+        ], dtype=np.float64).reshape(len(sensor_names), len(readings))
+        return self._summarize_window(values, sensor_names)
+    
+    @timed
+    def analyze_sensor_window(self, timestamps: np.ndarray, values: np.ndarray, sensor_names: List[str]) -> Dict[str, Any]:
+        """Analyze trends over a (sensors x samples) telemetry window without copying it"""
+        self.log_action("analyze_sensor_trends", {"readings_count": len(timestamps)})
+        
+        if len(timestamps) == 0:
+            return {"status": "no_data"}
+        return self._summarize_window(values, sensor_names)
+    
+    def _summarize_window(self, values: np.ndarray, sensor_names: List[str]) -> Dict[str, Any]:
+        """Per-sensor summary of a (sensors x samples) array, skipping missing samples"""
         trends = {}
-        for sensor_name in readings[0].get("sensors", {}).keys():
-            values = [r["sensors"][sensor_name]["value"] for r in readings if sensor_name in r.get("sensors", {})]
-            if values:
-                trends[sensor_name] = {
-                    "current": values[-1],
-                    "average": round(np.mean(values), 2),
-                    "min": round(min(values), 2),
-                    "max": round(max(values), 2),
-                    "trend": self._calculate_trend(values),
-                    "volatility": round(np.std(values), 2) if len(values) > 1 else 0
-                }
+        for i, sensor_name in enumerate(sensor_names):
+            series = values[i]
+            finite = np.isfinite(series)
+            if not finite.all():
+                series = series[finite]
+            if len(series) == 0:
+                continue
+            trends[sensor_name] = {
+                "current": round(float(series[-1]), 2),
+                "average": round(float(series.mean(dtype=np.float64)), 2),
+                "min": round(float(series.min()), 2),
+                "max": round(float(series.max()), 2),
+                "trend": self._classify_slope(self._regression_slope(series)),
+                "volatility": round(float(series.std(dtype=np.float64)), 2) if len(series) > 1 else 0
+            }
         
         return trends
     
@@ -50,69 +219,86 @@ class DataAnalysisAgent:
         """Calculate trend direction"""
         if len(values) < 2:
             return "stable"
-        
-        # Simple linear regression slope
+        return self._classify_slope(self._regression_slope(np.asarray(values, dtype=np.float64)))
+    
+    def _regression_slope(self, values: np.ndarray) -> float:
+        """Least-squares slope of values against their sample index"""
         n = len(values)
-        x = list(range(n))
-        slope = (n * sum(x[i] * values[i] for i in range(n)) - sum(x) * sum(values)) / \
-                (n * sum(i**2 for i in x) - sum(x)**2) if n > 1 else 0
-        
+        if n < 2:
+            return 0.0
+        x = np.arange(n, dtype=np.float64)
+        x -= x.mean()
+        return float(np.dot(x, values) / np.dot(x, x))
+    
+    def _classify_slope(self, slope: float) -> str:
         if slope > 0.5:
             return "increasing"
         elif slope < -0.5:
             return "decreasing"
         return "stable"
     
+    @timed
     def detect_anomalies(self, current_reading: Dict, historical_avg: Dict = None) -> List[Dict]:
         """Detect anomalies in current readings"""
-        self.log_action("detect_anomalies", {"vehicle_id": current_reading.get("vehicle_id")})
+        vehicle_id = current_reading.get("vehicle_id")
+        self.log_action("detect_anomalies", {"vehicle_id": vehicle_id})
         
-        anomalies = []
         sensors = current_reading.get("sensors", {})
+        values, status = sensor_arrays(sensors)
         
-        for sensor_name, data in sensors.items():
-            if data["status"] in ["warning", "critical"]:
-                anomaly = {
-                    "sensor": sensor_name,
-                    "value": data["value"],
-                    "unit": data["unit"],
-                    "severity": data["status"],
-                    "timestamp": current_reading.get("timestamp"),
-                    "recommendation": self._get_sensor_recommendation(sensor_name, data)
-                }
-                anomalies.append(anomaly)
+        # Drift against history: caller-supplied averages and the streaming detectors
+        drift = {}
+        for sensor_name, reason in self._historical_deviations(sensors, historical_avg or {}):
+            drift.setdefault(SENSOR_NAMES.index(sensor_name), []).append(reason)
+        for detector_name, flags in self.detectors.vehicle_flags(vehicle_id).items():
+            for i in np.flatnonzero(flags):
+                drift.setdefault(int(i), []).append(detector_name)
         
+        anomalies = sensor_anomalies(values, status, drift, current_reading.get("timestamp"))
         # Add DTCs as anomalies
-        for dtc in current_reading.get("active_dtcs", []):
-            anomalies.append({
-                "type": "dtc",
-                "code": dtc["code"],
-                "description": dtc["description"],
-                "severity": dtc["severity"],
-                "component": dtc["component"],
-                "first_occurrence": dtc.get("first_occurrence")
-            })
-        
+        anomalies.extend(dtc_anomalies(current_reading.get("active_dtcs", [])))
         return anomalies
     
-    def _get_sensor_recommendation(self, sensor: str, data: Dict) -> str:
-        """Get recommendation based on sensor reading"""
-        recommendations = {
-            "engine_temp": "Schedule cooling system inspection",
-            "oil_pressure": "Check oil level and quality, possible pump issue",
-            "battery_voltage": "Battery health check required",
-            "brake_pad_wear": "Brake pad replacement needed",
-            "tire_pressure": "Check tire condition and inflation",
-            "coolant_level": "Coolant top-up or leak inspection needed",
-            "transmission_temp": "Transmission fluid check recommended",
-            "air_filter_health": "Air filter replacement due"
-        }
+    def _historical_deviations(self, sensors: Dict, historical_avg: Dict):
+        """Sensors whose value is far from the supplied historical average"""
+        for i, sensor_name in enumerate(SENSOR_NAMES):
+            if sensor_name not in sensors or sensor_name not in historical_avg:
+                continue
+            average = historical_avg[sensor_name]
+            if isinstance(average, dict):
+                average = average.get("average")
+            if average is None:
+                continue
+            band = SENSOR_MAX[i] - SENSOR_MIN[i]
+            if abs(sensors[sensor_name]["value"] - average) > HISTORICAL_DEVIATION * band:
+                yield sensor_name, "historical_average"
+    
+    @timed
+    def detect_fleet_anomalies(self) -> Dict[str, Any]:
+        """Evaluate every streaming detector for the whole fleet in one vectorized pass"""
+        self.log_action("detect_anomalies", {"scope": "fleet"})
         
-        for key, rec in recommendations.items():
-            if key in sensor:
-                return rec
-        return "Inspection recommended"
+        vehicle_ids, flags, scores = self.detectors.evaluate()
+        names = [d.name for d in self.detectors.detectors]
+        flagged = flags.any(axis=2)
+        
+        results = []
+        for row, sensor in zip(*np.nonzero(flagged)):
+            results.append({
+                "vehicle_id": vehicle_ids[row],
+                "sensor": SENSOR_NAMES[sensor],
+                "detectors": [names[d] for d in np.flatnonzero(flags[row, sensor])],
+                "max_score": round(float(scores[row, sensor].max()), 2)
+            })
+        
+        return {
+            "vehicles_monitored": len(vehicle_ids),
+            "vehicles_flagged": int(flagged.any(axis=1).sum()),
+            "anomalies": results,
+            "timestamp": datetime.now().isoformat()
+        }
     
+    @timed
     def forecast_service_demand(self, fleet_data: List[Dict]) -> Dict[str, Any]:
         """Forecast service demand based on fleet patterns"""
         self.log_action("forecast_service_demand", {"fleet_size": len(fleet_data)})
@@ -140,7 +326,27 @@ class DataAnalysisAgent:
                     "priority": "scheduled"
                 })
         
-        forecast = {
+        return self._build_forecast(urgent_services, scheduled_services)
+    
+    @timed
+    def forecast_fleet_demand(self, vehicle_ids: List[str], health_scores: np.ndarray, alerts: np.ndarray) -> Dict[str, Any]:
+        """Forecast service demand from fleet-wide score arrays (vectorized forecast_service_demand)"""
+        self.log_action("forecast_service_demand", {"fleet_size": len(health_scores)})
+        
+        urgent = (health_scores < 60) | (alerts >= 2)
+        scheduled = ~urgent & ((health_scores < 80) | (alerts >= 1))
+        
+        def entries(mask, priority):
+            return [
+                {"vehicle_id": vehicle_ids[row], "health_score": int(health_scores[row]), "alerts": int(alerts[row]), "priority": priority}
+                for row in np.flatnonzero(mask)
+            ]
+        
+        return self._build_forecast(entries(urgent, "urgent"), entries(scheduled, "scheduled"))
+    
+    def _build_forecast(self, urgent_services: List[Dict], scheduled_services: List[Dict]) -> Dict[str, Any]:
+        """Assemble the demand forecast response"""
+        return {
             "forecast_date": datetime.now().isoformat(),
             "next_7_days": {
                 "urgent_services": len(urgent_services),
@@ -151,8 +357,6 @@ class DataAnalysisAgent:
             "scheduled_vehicles": scheduled_services,
             "recommendation": self._get_demand_recommendation(len(urgent_services), len(scheduled_services))
         }
-        
-        return forecast
     
     def _get_demand_recommendation(self, urgent: int, scheduled: int) -> str:
         """Generate staffing/capacity recommendation"""
@@ -163,46 +367,14 @@ class DataAnalysisAgent:
             return "Moderate demand expected. Ensure standard staffing."
         return "Normal demand expected."
     
+    @timed
     def get_vehicle_risk_assessment(self, vehicle_data: Dict, maintenance_history: List) -> Dict:
         """Assess overall risk for a vehicle"""
         self.log_action("risk_assessment", {"vehicle_id": vehicle_data.get("id")})
         
-        risk_score = 0
-        risk_factors = []
-        
-        # Check health score
-        health = vehicle_data.get("health_score", 100)
-        if health < 60:
-            risk_score += 40
-            risk_factors.append("Low health score")
-        elif health < 80:
-            risk_score += 20
-            risk_factors.append("Moderate health score")
-        
-        # Check active alerts
-        alerts = vehicle_data.get("active_alerts", 0)
-        risk_score += alerts * 15
-        if alerts > 0:
-            risk_factors.append(f"{alerts} active alerts")
-        
-        # Check maintenance history
         unscheduled = sum(1 for m in maintenance_history if m.get("type") == "unscheduled")
-        if unscheduled >= 2:
-            risk_score += 25
-            risk_factors.append("Recurring unscheduled repairs")
-        
-        # Check odometer
-        odometer = vehicle_data.get("odometer", 0)
-        if odometer > 75000:
-            risk_score += 15
-            risk_factors.append("High mileage vehicle")
-        
-        return {
-            "vehicle_id": vehicle_data.get("id"),
-            "risk_score": min(100, risk_score),
-            "risk_level": "high" if risk_score >= 60 else "medium" if risk_score >= 30 else "low",
-            "risk_factors": risk_factors,
-            "recommendation": "Immediate attention required" if risk_score >= 60 else 
-                            "Schedule preventive maintenance" if risk_score >= 30 else
-                            "Continue monitoring"
-        }
+        return risk_assessments(
+            [vehicle_data.get("id")], np.array([vehicle_data.get("health_score", 100)]),
+            np.array([vehicle_data.get("active_alerts", 0)]), np.array([unscheduled]),
+            np.array([vehicle_data.get("odometer", 0)])
+        )[0]
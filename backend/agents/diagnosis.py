@@ -5,9 +5,162 @@ Uses ML-based failure prediction for component assessment
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 import random
+import threading
 import numpy as np
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitoring.metrics import timed, MODEL_INFERENCES, MODEL_INFERENCE_ROWS
+from data.vehicles import SENSOR_NAMES, STATUS_WARNING, STATUS_CRITICAL, sensor_arrays
+from .model_registry import model_registry
+from .tree_engine import CompiledForest
+from .prediction_service import BatchPredictionService
+from .action_log import ActionLog
+
+# Ordered model inputs; changing this invalidates stored model artifacts
+FEATURE_SCHEMA = ["engine_temp", "oil_pressure", "battery_voltage", "brake_pad_wear", "odometer"]
+MODEL_NAME = "failure_model"
+# Recorded with each saved model and checked when one is loaded
+MODEL_METADATA = {"sklearn_version": sklearn.__version__}
+_inferences = MODEL_INFERENCES.labels(MODEL_NAME)
+_inference_rows = MODEL_INFERENCE_ROWS.labels(MODEL_NAME)
+
+# Sensors whose status drives each component's risk; mileage adds risk to the mileage components
+COMPONENT_SENSORS = {
+    "Engine": ["engine_temp", "oil_pressure"],
+    "Electrical": ["battery_voltage"],
+    "Brakes": ["brake_pad_wear"],
+    "Tires": ["tire_pressure_fl", "tire_pressure_fr", "tire_pressure_rl", "tire_pressure_rr"],
+    "Cooling": ["coolant_level", "engine_temp"],
+    "Transmission": ["transmission_temp"],
+    "Air Intake": ["air_filter_health"]
+}
+MILEAGE_COMPONENTS = {"Engine", "Transmission", "Brakes"}
+COMPONENTS = list(COMPONENT_SENSORS)
+# (sensors x components) membership matrix for counting statuses per component in one matmul
+COMPONENT_MATRIX = np.array([[name in COMPONENT_SENSORS[c] for c in COMPONENTS] for name in SENSOR_NAMES], dtype=np.int64)
+_MILEAGE_COLUMNS = np.array([c in MILEAGE_COMPONENTS for c in COMPONENTS])
+_COMPONENT_COLUMNS = [[SENSOR_NAMES.index(name) for name in COMPONENT_SENSORS[c]] for c in COMPONENTS]
+
+
+def component_risk_scores(status: np.ndarray, odometer: np.ndarray) -> np.ndarray:
+    """(vehicles x components) risk scores from (vehicles x sensors) statuses and mileage"""
+    critical = (status == STATUS_CRITICAL).astype(np.int64) @ COMPONENT_MATRIX
+    warning = (status == STATUS_WARNING).astype(np.int64) @ COMPONENT_MATRIX
+    mileage = np.where(odometer > 60000, 10, 0) + np.where(odometer > 80000, 15, 0)
+    return critical * 40 + warning * 15 + mileage[:, None] * _MILEAGE_COLUMNS
+
+
+def component_risks(scores: np.ndarray, present: np.ndarray) -> List[Dict]:
+    """Risk entries for one vehicle's nonzero component scores, highest first; present marks reported sensors"""
+    risks = []
+    for c in np.flatnonzero(scores):
+        risk_score = int(scores[c])
+        component = COMPONENTS[c]
+        risks.append({
+            "component": component,
+            "risk_score": min(100, risk_score),
+            "risk_level": "critical" if risk_score >= 60 else "high" if risk_score >= 40 else
+                         "medium" if risk_score >= 20 else "low",
+            "sensors_affected": [SENSOR_NAMES[i] for i in _COMPONENT_COLUMNS[c] if present[i]],
+            "recommendation": component_recommendation(component, risk_score)
+        })
+    return sorted(risks, key=lambda x: x["risk_score"], reverse=True)
+
+
+def component_recommendation(component: str, risk_score: int) -> str:
+    """Get specific recommendation for a component"""
+    if risk_score >= 60:
+        actions = {
+            "Engine": "Urgent engine inspection required. Risk of major failure.",
+            "Electrical": "Battery replacement or charging system repair needed immediately.",
+            "Brakes": "Brake system requires immediate attention for safety.",
+            "Cooling": "Cooling system repair needed. Risk of overheating damage.",
+            "Transmission": "Transmission fluid flush and inspection urgently required."
+        }
+    elif risk_score >= 40:
+        actions = {
+            "Engine": "Schedule engine diagnostic within 7 days.",
+            "Electrical": "Battery health check recommended soon.",
+            "Brakes": "Brake pad replacement should be scheduled.",
+            "Cooling": "Coolant system inspection recommended.",
+            "Transmission": "Transmission service due soon."
+        }
+    else:
+        actions = {
+            "Engine": "Continue regular monitoring.",
+            "Electrical": "Normal operation. Check during next service.",
+            "Brakes": "Satisfactory condition. Monitor wear rate.",
+            "Cooling": "System functioning normally.",
+            "Transmission": "No issues detected."
+        }
+    
+    return actions.get(component, "Schedule inspection during next service.")
+
+
+def assign_priority(failure_prob: float, risks: List[Dict]) -> Dict[str, Any]:
+    """Assign service priority based on failure probability and risks"""
+    critical_risks = sum(1 for r in risks if r["risk_level"] == "critical")
+    high_risks = sum(1 for r in risks if r["risk_level"] == "high")
+    
+    if failure_prob > 0.7 or critical_risks >= 1:
+        level = "P1"
+        description = "Critical - Immediate attention required"
+        max_delay_days = 1
+    elif failure_prob > 0.5 or high_risks >= 1:
+        level = "P2"
+        description = "High - Service within 3 days"
+        max_delay_days = 3
+    elif failure_prob > 0.3 or high_risks >= 1:
+        level = "P3"
+        description = "Medium - Service within 7 days"
+        max_delay_days = 7
+    else:
+        level = "P4"
+        description = "Low - Schedule at convenience"
+        max_delay_days = 30
+    
+    return {
+        "level": level,
+        "description": description,
+        "max_delay_days": max_delay_days,
+        "critical_components": critical_risks,
+        "high_risk_components": high_risks
+    }
+
+
+def recommend_next_check(failure_prob: float) -> str:
+    """Recommend when to next check the vehicle"""
+    if failure_prob > 0.7:
+        return "Immediately"
+    elif failure_prob > 0.5:
+        return (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    elif failure_prob > 0.3:
+        return (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+    return (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+
+
+def build_predictions(vehicle_ids: List[str], odometer: np.ndarray, status: np.ndarray, present: np.ndarray,
+                      failure_probs: np.ndarray) -> List[Dict[str, Any]]:
+    """predict_failure responses for many vehicles from (vehicles x sensors) statuses, scoring components in one pass"""
+    scores = component_risk_scores(status, odometer)
+    predictions = []
+    for i, vehicle_id in enumerate(vehicle_ids):
+        failure_prob = float(failure_probs[i])
+        risks = component_risks(scores[i], present[i])
+        predictions.append({
+            "vehicle_id": vehicle_id,
+            "overall_failure_probability": round(failure_prob * 100, 1),
+            "prediction_confidence": round(0.85 + random.uniform(-0.1, 0.1), 2),
+            "component_risks": risks,
+            "priority": assign_priority(failure_prob, risks),
+            "timestamp": datetime.now().isoformat(),
+            "next_check_recommended": recommend_next_check(failure_prob)
+        })
+    return predictions
+
 
 class DiagnosisAgent:
     """Worker agent for predictive diagnosis and failure modeling"""
@@ -16,18 +169,51 @@ class DiagnosisAgent:
         self.agent_id = "diagnosis_agent"
         self.name = "Diagnosis Agent"
         self.permissions = ["read_analysis", "read_maintenance", "write_diagnosis"]
-        self.action_log = []
-        self.model = self._train_failure_model()
+        self.action_log = ActionLog(self.agent_id)
+        self.registry = model_registry
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._engine = None
+        self.model_version = None
         self.scaler = StandardScaler()
+        self.prediction_service = BatchPredictionService(self._predict_failure_probabilities)
     
-    def log_action(self, action: str, details: dict = None):
+    def log_action(self, action: str, details: dict = None, data_accessed: List[str] = None):
         """Log agent action for UEBA monitoring"""
-        self.action_log.append({
-            "agent_id": self.agent_id,
-            "action": action,
-            "details": details,
-            "timestamp": datetime.now().isoformat()
-        })
+        self.action_log.append(action, details, data_accessed)
+    
+    @property
+    def model(self):
+        """Failure model, loaded from the registry on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._load_failure_model()
+        return self._model
+    
+    @property
+    def engine(self) -> CompiledForest:
+        """Compiled inference engine for the current model"""
+        if self._engine is None:
+            self._engine = CompiledForest.from_sklearn(self.model)
+        return self._engine
+    
+    def _load_failure_model(self):
+        """Load the latest stored model; only trains when no compatible artifact exists yet"""
+        model, meta = self.registry.load_or_train(MODEL_NAME, FEATURE_SCHEMA, self._train_failure_model, MODEL_METADATA)
+        self._engine = None
+        self.model_version = meta["version"]
+        self._model = model
+    
+    @timed
+    def retrain_failure_model(self) -> Dict[str, Any]:
+        """Fit a new failure model, store it as the next version and start using it"""
+        model = self._train_failure_model()
+        meta = self.registry.save(MODEL_NAME, model, FEATURE_SCHEMA, MODEL_METADATA)
+        self._model = model
+        self._engine = None
+        self.model_version = meta["version"]
+        return meta
     
     def _train_failure_model(self):
         """Train a simple failure prediction model"""
@@ -51,6 +237,17 @@ class DiagnosisAgent:
         
         return model
     
+    def _extract_features(self, vehicle_data: Dict, sensors: Dict) -> List[float]:
+        """Model inputs in FEATURE_SCHEMA order"""
+        return [
+            sensors.get("engine_temp", {}).get("value", 90),
+            sensors.get("oil_pressure", {}).get("value", 45),
+            sensors.get("battery_voltage", {}).get("value", 12.8),
+            sensors.get("brake_pad_wear", {}).get("value", 50),
+            vehicle_data.get("odometer", 30000)
+        ]
+    
+    @timed
     def predict_failure(self, vehicle_data: Dict, sensor_reading: Dict) -> Dict[str, Any]:
         """Predict probability of component failures"""
         self.log_action("predict_failure", {"vehicle_id": vehicle_data.get("id")})
@@ -58,142 +255,51 @@ class DiagnosisAgent:
         sensors = sensor_reading.get("sensors", {})
         
         # Extract features for prediction
-        features = np.array([[
-            sensors.get("engine_temp", {}).get("value", 90),
-            sensors.get("oil_pressure", {}).get("value", 45),
-            sensors.get("battery_voltage", {}).get("value", 12.8),
-            sensors.get("brake_pad_wear", {}).get("value", 50),
-            vehicle_data.get("odometer", 30000)
-        ]])
+        features = np.array([self._extract_features(vehicle_data, sensors)])
         
         # Get prediction probability
-        failure_prob = self.model.predict_proba(features)[0][1]
+        failure_prob = self._predict_failure_probabilities(features)[0]
         
-        # Component-level analysis
-        component_risks = self._analyze_component_risks(sensors, vehicle_data)
-        
-        return {
-            "vehicle_id": vehicle_data.get("id"),
-            "overall_failure_probability": round(failure_prob * 100, 1),
-            "prediction_confidence": round(0.85 + random.uniform(-0.1, 0.1), 2),
-            "component_risks": component_risks,
-            "priority": self._assign_priority(failure_prob, component_risks),
-            "timestamp": datetime.now().isoformat(),
-            "next_check_recommended": self._recommend_next_check(failure_prob)
-        }
+        return self._build_predictions([vehicle_data], [sensors], [failure_prob])[0]
     
-    def _analyze_component_risks(self, sensors: Dict, vehicle_data: Dict) -> List[Dict]:
-        """Analyze risk for each major component"""
-        risks = []
-        
-        component_mappings = {
-            "Engine": ["engine_temp", "oil_pressure"],
-            "Electrical": ["battery_voltage"],
-            "Brakes": ["brake_pad_wear"],
-            "Tires": ["tire_pressure_fl", "tire_pressure_fr", "tire_pressure_rl", "tire_pressure_rr"],
-            "Cooling": ["coolant_level", "engine_temp"],
-            "Transmission": ["transmission_temp"],
-            "Air Intake": ["air_filter_health"]
-        }
+    @timed
+    async def predict_failure_async(self, vehicle_data: Dict, sensor_reading: Dict) -> Dict[str, Any]:
+        """Predict failures through the micro-batching service so concurrent requests share one model call"""
+        self.log_action("predict_failure", {"vehicle_id": vehicle_data.get("id")})
         
-        for component, sensor_keys in component_mappings.items():
-            component_sensors = {k: sensors.get(k, {}) for k in sensor_keys if k in sensors}
-            
-            # Calculate risk based on sensor status
-            critical_count = sum(1 for s in component_sensors.values() if s.get("status") == "critical")
-            warning_count = sum(1 for s in component_sensors.values() if s.get("status") == "warning")
-            
-            risk_score = critical_count * 40 + warning_count * 15
-            
-            # Add mileage factor for certain components
-            if component in ["Engine", "Transmission", "Brakes"]:
-                mileage = vehicle_data.get("odometer", 0)
-                if mileage > 60000:
-                    risk_score += 10
-                if mileage > 80000:
-                    risk_score += 15
-            
-            if risk_score > 0 or random.random() < 0.1:  # Include some low-risk items for completeness
-                risks.append({
-                    "component": component,
-                    "risk_score": min(100, risk_score),
-                    "risk_level": "critical" if risk_score >= 60 else "high" if risk_score >= 40 else 
-                                 "medium" if risk_score >= 20 else "low",
-                    "sensors_affected": list(component_sensors.keys()),
-                    "recommendation": self._get_component_recommendation(component, risk_score)
-                })
+        sensors = sensor_reading.get("sensors", {})
+        failure_prob = await self.prediction_service.predict_async(self._extract_features(vehicle_data, sensors))
         
-        return sorted(risks, key=lambda x: x["risk_score"], reverse=True)
+        return self._build_predictions([vehicle_data], [sensors], [failure_prob])[0]
     
-    def _get_component_recommendation(self, component: str, risk_score: int) -> str:
-        """Get specific recommendation for a component"""
-        if risk_score >= 60:
-            actions = {
-                "Engine": "Urgent engine inspection required. Risk of major failure.",
-                "Electrical": "Battery replacement or charging system repair needed immediately.",
-                "Brakes": "Brake system requires immediate attention for safety.",
-                "Cooling": "Cooling system repair needed. Risk of overheating damage.",
-                "Transmission": "Transmission fluid flush and inspection urgently required."
-            }
-        elif risk_score >= 40:
-            actions = {
-                "Engine": "Schedule engine diagnostic within 7 days.",
-                "Electrical": "Battery health check recommended soon.",
-                "Brakes": "Brake pad replacement should be scheduled.",
-                "Cooling": "Coolant system inspection recommended.",
-                "Transmission": "Transmission service due soon."
-            }
-        else:
-            actions = {
-                "Engine": "Continue regular monitoring.",
-                "Electrical": "Normal operation. Check during next service.",
-                "Brakes": "Satisfactory condition. Monitor wear rate.",
-                "Cooling": "System functioning normally.",
-                "Transmission": "No issues detected."
-            }
-        
-        return actions.get(component, "Schedule inspection during next service.")
+    def _predict_failure_probabilities(self, features: np.ndarray) -> np.ndarray:
+        """Failure-class probability per feature row"""
+        _inferences.inc()
+        _inference_rows.inc(len(features))
+        return self.engine.predict_proba(features)[:, 1]
     
-    def _assign_priority(self, failure_prob: float, risks: List[Dict]) -> Dict[str, Any]:
-        """Assign service priority based on failure probability and risks"""
-        critical_risks = sum(1 for r in risks if r["risk_level"] == "critical")
-        high_risks = sum(1 for r in risks if r["risk_level"] == "high")
+    @timed
+    def predict_failure_batch(self, vehicles: List[Dict], sensor_readings: List[Dict]) -> List[Dict[str, Any]]:
+        """Predict failures for many vehicles with a single model evaluation"""
+        self.log_action("predict_failure", {"vehicle_count": len(vehicles)})
         
-        if failure_prob > 0.7 or critical_risks >= 1:
-            level = "P1"
-            description = "Critical - Immediate attention required"
-            max_delay_days = 1
-        elif failure_prob > 0.5 or high_risks >= 1:
-            level = "P2"
-            description = "High - Service within 3 days"
-            max_delay_days = 3
-        elif failure_prob > 0.3 or high_risks >= 1:
-            level = "P3"
-            description = "Medium - Service within 7 days"
-            max_delay_days = 7
-        else:
-            level = "P4"
-            description = "Low - Schedule at convenience"
-            max_delay_days = 30
+        if not vehicles:
+            return []
+        sensors = [r.get("sensors", {}) for r in sensor_readings]
+        features = np.array([self._extract_features(v, s) for v, s in zip(vehicles, sensors)])
+        failure_probs = self._predict_failure_probabilities(features)
         
-        return {
-            "level": level,
-            "description": description,
-            "max_delay_days": max_delay_days,
-            "critical_components": critical_risks,
-            "high_risk_components": high_risks
-        }
+        return self._build_predictions(vehicles, sensors, failure_probs)
     
-    def _recommend_next_check(self, failure_prob: float) -> str:
-        """Recommend when to next check the vehicle"""
-        if failure_prob > 0.7:
-            return "Immediately"
-        elif failure_prob > 0.5:
-            return (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
-        elif failure_prob > 0.3:
-            return (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-        return (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    def _build_predictions(self, vehicles: List[Dict], sensors: List[Dict], failure_probs) -> List[Dict[str, Any]]:
+        """Assemble prediction responses from readings' sensor dicts"""
+        arrays = [sensor_arrays(s) for s in sensors]
+        values = np.array([a[0] for a in arrays]).reshape(len(arrays), len(SENSOR_NAMES))
+        status = np.array([a[1] for a in arrays]).reshape(len(arrays), len(SENSOR_NAMES))
+        odometer = np.array([v.get("odometer", 0) for v in vehicles])
+        return build_predictions([v.get("id") for v in vehicles], odometer, status, ~np.isnan(values), failure_probs)
     
+    @timed
     def diagnose_dtc(self, dtc_codes: List[Dict]) -> List[Dict]:
         """Provide detailed diagnosis for DTCs"""
         self.log_action("diagnose_dtc", {"codes": [d["code"] for d in dtc_codes]})
@@ -254,3 +360,17 @@ class DiagnosisAgent:
             "electrical": ["Battery", "Alternator", "Wiring harness"]
         }
         return parts_map.get(component.lower(), ["Diagnostic required"])
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage the stored failure prediction model")
+    parser.add_argument("command", choices=["retrain", "versions"])
+    args = parser.parse_args()
+
+    if args.command == "retrain":
+        meta = DiagnosisAgent().retrain_failure_model()
+        print(f"Saved {meta['name']} v{meta['version']} (schema {meta['schema_hash']})")
+    else:
+        for meta in model_registry.list_versions(MODEL_NAME):
+            print(f"v{meta['version']}  {meta['created_at']}  schema={meta['schema_hash']}  sklearn={meta.get('sklearn_version')}")
@@ -3,18 +3,23 @@ Feedback Agent - Handles post-service follow-up and customer satisfaction tracki
 """
 from datetime import datetime
 from typing import List, Dict, Any
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitoring.metrics import timed
+from .action_log import ActionLog
 
 class FeedbackAgent:
     def __init__(self):
         self.agent_id = "feedback_agent"
         self.name = "Feedback Agent"
         self.permissions = ["read_service", "write_feedback", "update_records"]
-        self.action_log = []
+        self.action_log = ActionLog(self.agent_id)
         self.feedback_store = []
     
-    def log_action(self, action: str, details: dict = None):
-        self.action_log.append({"agent_id": self.agent_id, "action": action, "details": details, "timestamp": datetime.now().isoformat()})
+    def log_action(self, action: str, details: dict = None, data_accessed: List[str] = None):
+        self.action_log.append(action, details, data_accessed)
     
+    @timed
     def initiate_followup(self, appointment: Dict, vehicle: Dict, owner: Dict) -> Dict:
         """Initiate post-service follow-up conversation"""
         self.log_action("initiate_followup", {"appointment_id": appointment.get("id")})
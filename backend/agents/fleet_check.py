@@ -0,0 +1,137 @@
+"""
+Fleet Check - Chunked, vectorized vehicle checks for the whole fleet on a process pool
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.vehicles import SENSOR_NAMES, DTC_CODES, FleetReadings
+from data.maintenance import MAINTENANCE_RECORDS
+from data.rca_capa import get_component_defect_pattern
+from .tree_engine import CompiledForest
+from .diagnosis import DiagnosisAgent, FEATURE_SCHEMA, build_predictions
+from .data_analysis import dtc_anomalies, risk_assessments, sensor_anomalies
+from .manufacturing_insights import rca_links
+
+FLEET_CHECK_WORKERS = int(os.environ.get("FLEET_CHECK_WORKERS", str(os.cpu_count() or 2)))
+FLEET_CHECK_CHUNK = int(os.environ.get("FLEET_CHECK_CHUNK", "512"))
+
+FEATURE_COLUMNS = [SENSOR_NAMES.index(name) for name in FEATURE_SCHEMA[:-1]]
+
+# Per-process state, set by the pool initializer
+_engine: Optional[CompiledForest] = None
+_diagnosis: Optional[DiagnosisAgent] = None
+_rca_patterns: Dict[str, Dict] = {}
+
+
+def _init_worker(engine: CompiledForest):
+    """Pool initializer: receive the compiled model once per process"""
+    global _engine, _diagnosis
+    _engine = engine
+    _diagnosis = DiagnosisAgent()
+
+
+def _rca_pattern(component: str) -> Dict:
+    """RCA defect pattern per component, computed once per process"""
+    pattern = _rca_patterns.get(component)
+    if pattern is None:
+        pattern = _rca_patterns[component] = get_component_defect_pattern(component)
+    return pattern
+
+
+def check_fleet_chunk(vehicle_ids: List[str], odometer: np.ndarray, values: np.ndarray, status: np.ndarray,
+                      drift: List[Dict[int, List[str]]], health: np.ndarray, alerts: np.ndarray,
+                      unscheduled: np.ndarray, dtc_codes: List[List[str]], timestamps: List[str]) -> List[Dict]:
+    """Check a slice of the fleet; each result has the shape of MasterAgent.orchestrate_vehicle_check.
+
+    Uses the same helpers as the per-vehicle agents, with the model, component
+    scores and risk scores evaluated once per chunk. Values are rounded to the
+    precision of a reading dict, so both paths see the same model inputs.
+    """
+    values = values.round(2)
+    features = np.column_stack([values[:, FEATURE_COLUMNS], odometer])
+    failure_probs = _engine.predict_proba(features)[:, 1]
+    predictions = build_predictions(vehicle_ids, odometer, status, ~np.isnan(values), failure_probs)
+    risks = risk_assessments(vehicle_ids, health, alerts, unscheduled, odometer)
+
+    results = []
+    for i, vehicle_id in enumerate(vehicle_ids):
+        dtcs = [{"code": code, **DTC_CODES[code]} for code in dtc_codes[i]]
+        anomalies = sensor_anomalies(values[i], status[i], drift[i], timestamps[i])
+        anomalies.extend(dtc_anomalies(dtcs))
+        diagnosis = predictions[i]
+        if dtcs:
+            diagnosis["dtc_diagnosis"] = _diagnosis.diagnose_dtc(dtcs)
+        results.append({
+            "vehicle_id": vehicle_id,
+            "anomalies": anomalies,
+            "risk_assessment": risks[i],
+            "diagnosis": diagnosis,
+            "manufacturing_feedback": rca_links(diagnosis, _rca_pattern),
+            "needs_customer_engagement": diagnosis["priority"]["level"] in ["P1", "P2", "P3"],
+            "orchestration_timestamp": datetime.now().isoformat()
+        })
+    return results
+
+
+def unscheduled_repair_counts(readings: FleetReadings) -> np.ndarray:
+    """Unscheduled maintenance records per fleet row"""
+    counts = np.zeros(len(readings), dtype=np.int64)
+    for record in MAINTENANCE_RECORDS:
+        row = readings.store.row_of(record["vehicle_id"])
+        if row is not None and record.get("type") == "unscheduled":
+            counts[row] += 1
+    return counts
+
+
+def fleet_chunks(readings: FleetReadings, rows: np.ndarray, drift: Dict[int, Dict[int, List[str]]],
+                 chunk_size: int = FLEET_CHECK_CHUNK) -> Iterator[Tuple]:
+    """Argument tuples for check_fleet_chunk, slicing the fleet matrices by row; drift is keyed by row"""
+    ids = readings.store.ids()
+    odometer = readings.store.odometers()
+    unscheduled = unscheduled_repair_counts(readings)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        chunk_ids = [ids[r] for r in chunk]
+        yield (
+            chunk_ids, odometer[chunk], readings.values[chunk], readings.status[chunk],
+            [drift.get(r, {}) for r in chunk.tolist()],
+            readings.health_scores[chunk], readings.dtc_alerts[chunk], unscheduled[chunk],
+            [readings.dtc_codes.get(v, []) for v in chunk_ids],
+            [readings.reading_times.get(v, readings.timestamp) for v in chunk_ids]
+        )
+
+
+class FleetCheckPool:
+    """Lazily started spawn-context process pool whose workers hold the compiled model"""
+
+    def __init__(self, workers: int = FLEET_CHECK_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._engine: Optional[CompiledForest] = None
+
+    def executor(self, engine: CompiledForest) -> ProcessPoolExecutor:
+        """Pool for the given model; restarted when the model changes"""
+        if self._executor is None or engine is not self._engine:
+            self.shutdown()
+            self._engine = engine
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(engine,)
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global fleet check pool
+fleet_check_pool = FleetCheckPool()
@@ -2,21 +2,35 @@
 Manufacturing Insights Agent - RCA/CAPA analysis for manufacturing feedback loop
 """
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data.rca_capa import get_rca_records, get_capa_for_rca, get_manufacturing_insights, get_component_defect_pattern, get_feedback_summary
+from monitoring.metrics import timed
+from .action_log import ActionLog
+
+
+def rca_links(prediction: Dict, defect_pattern: Callable[[str], Dict] = get_component_defect_pattern) -> Dict:
+    """Link a prediction's component risks to the RCA defect pattern of each component that has RCA records"""
+    linked_issues = []
+    for risk in prediction.get("component_risks", []):
+        pattern = defect_pattern(risk["component"])
+        if pattern.get("total_rca_records", 0) > 0:
+            linked_issues.append({"component": risk["component"], "pattern": pattern, "risk_level": risk["risk_level"]})
+    
+    return {"prediction_id": prediction.get("vehicle_id"), "linked_rca_issues": linked_issues, "feedback_generated": len(linked_issues) > 0}
 
 class ManufacturingInsightsAgent:
     def __init__(self):
         self.agent_id = "manufacturing_insights_agent"
         self.name = "Manufacturing Insights Agent"
         self.permissions = ["read_rca", "read_capa", "write_insights"]
-        self.action_log = []
+        self.action_log = ActionLog(self.agent_id)
     
-    def log_action(self, action: str, details: dict = None):
-        self.action_log.append({"agent_id": self.agent_id, "action": action, "details": details, "timestamp": datetime.now().isoformat()})
+    def log_action(self, action: str, details: dict = None, data_accessed: List[str] = None):
+        self.action_log.append(action, details, data_accessed)
     
+    @timed
     def analyze_failure_patterns(self, predictions: List[Dict]) -> Dict:
         """Analyze predicted failures for manufacturing patterns"""
         self.log_action("analyze_patterns", {"predictions_count": len(predictions)})
@@ -40,6 +54,7 @@ class ManufacturingInsightsAgent:
         
         return {"patterns": sorted(patterns, key=lambda x: x["current_predictions"], reverse=True), "timestamp": datetime.now().isoformat()}
     
+    @timed
     def generate_manufacturing_report(self) -> Dict:
         """Generate comprehensive report for manufacturing team"""
         self.log_action("generate_report")
@@ -85,17 +100,11 @@ class ManufacturingInsightsAgent:
         
         return recommendations
     
+    @timed
     def link_prediction_to_rca(self, prediction: Dict) -> Dict:
         """Link a prediction to existing RCA records"""
         self.log_action("link_to_rca", {"vehicle_id": prediction.get("vehicle_id")})
-        
-        linked_issues = []
-        for risk in prediction.get("component_risks", []):
-            pattern = get_component_defect_pattern(risk["component"])
-            if pattern.get("total_rca_records", 0) > 0:
-                linked_issues.append({"component": risk["component"], "pattern": pattern, "risk_level": risk["risk_level"]})
-        
-        return {"prediction_id": prediction.get("vehicle_id"), "linked_rca_issues": linked_issues, "feedback_generated": len(linked_issues) > 0}
+        return rca_links(prediction)
     
     def get_dashboard_data(self) -> Dict:
         """Get data for manufacturing insights dashboard"""
@@ -1,14 +1,24 @@
 """
 Master Agent - Main orchestrator coordinating all worker agents
 """
+import asyncio
+import time
+from functools import partial
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from .data_analysis import DataAnalysisAgent
-from .diagnosis import DiagnosisAgent
+from typing import List, Dict, Any, Optional, AsyncIterator
+import numpy as np
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitoring.metrics import timed, MODEL_INFERENCES, MODEL_INFERENCE_ROWS
+from .data_analysis import DataAnalysisAgent, detector_drift
+from .diagnosis import DiagnosisAgent, MODEL_NAME
 from .customer_engagement import CustomerEngagementAgent
 from .scheduling import SchedulingAgent
 from .feedback import FeedbackAgent
 from .manufacturing_insights import ManufacturingInsightsAgent
+from .orchestration import Step, run_step_graph
+from .fleet_check import FLEET_CHECK_CHUNK, check_fleet_chunk, fleet_check_pool, fleet_chunks
+from .action_log import ActionLog
 
 class MasterAgent:
     def __init__(self):
@@ -22,12 +32,13 @@ class MasterAgent:
             "feedback": FeedbackAgent(),
             "manufacturing_insights": ManufacturingInsightsAgent()
         }
-        self.action_log = []
+        self.action_log = ActionLog(self.agent_id)
         self.active_workflows = {}
     
-    def log_action(self, action: str, details: dict = None):
-        self.action_log.append({"agent_id": self.agent_id, "action": action, "details": details, "timestamp": datetime.now().isoformat()})
+    def log_action(self, action: str, details: dict = None, data_accessed: List[str] = None):
+        self.action_log.append(action, details, data_accessed)
     
+    @timed
     def orchestrate_vehicle_check(self, vehicle: Dict, sensor_reading: Dict, maintenance_history: List) -> Dict:
         """Full orchestration: analyze, diagnose, and prepare for engagement"""
         self.log_action("orchestrate_vehicle_check", {"vehicle_id": vehicle.get("id")})
@@ -58,6 +69,70 @@ class MasterAgent:
             "orchestration_timestamp": datetime.now().isoformat()
         }
     
+    @timed
+    async def orchestrate_vehicle_check_async(self, vehicle: Dict, sensor_reading: Dict, maintenance_history: List) -> Dict:
+        """Full orchestration with independent steps running concurrently and per-step timings"""
+        self.log_action("orchestrate_vehicle_check", {"vehicle_id": vehicle.get("id")})
+        start = time.perf_counter()
+        data_analysis = self.workers["data_analysis"]
+        diagnosis_agent = self.workers["diagnosis"]
+        active_dtcs = sensor_reading.get("active_dtcs")
+        
+        steps = [
+            Step("anomalies", partial(data_analysis.detect_anomalies, sensor_reading)),
+            Step("risk_assessment", partial(data_analysis.get_vehicle_risk_assessment, vehicle, maintenance_history)),
+            Step("prediction", partial(diagnosis_agent.predict_failure_async, vehicle, sensor_reading)),
+            Step("manufacturing_feedback", self.workers["manufacturing_insights"].link_prediction_to_rca, ["prediction"])
+        ]
+        if active_dtcs:
+            steps.append(Step("dtc_diagnosis", partial(diagnosis_agent.diagnose_dtc, active_dtcs)))
+        results, timings = await run_step_graph(steps)
+        
+        diagnosis = results["prediction"]
+        if active_dtcs:
+            diagnosis["dtc_diagnosis"] = results["dtc_diagnosis"]
+        needs_engagement = diagnosis.get("priority", {}).get("level") in ["P1", "P2", "P3"]
+        timings["total"] = round((time.perf_counter() - start) * 1000, 3)
+        
+        return {
+            "vehicle_id": vehicle.get("id"),
+            "anomalies": results["anomalies"],
+            "risk_assessment": results["risk_assessment"],
+            "diagnosis": diagnosis,
+            "manufacturing_feedback": results["manufacturing_feedback"],
+            "needs_customer_engagement": needs_engagement,
+            "timings_ms": timings,
+            "orchestration_timestamp": datetime.now().isoformat()
+        }
+    
+    async def check_fleet(self, readings, rows: np.ndarray, chunk_size: int = FLEET_CHECK_CHUNK) -> AsyncIterator[List[Dict]]:
+        """Check many vehicles in chunks on the process pool, yielding each chunk's results as it finishes"""
+        self.log_action("check_fleet", {"vehicle_count": len(rows)})
+        
+        # Streaming detector drift for flagged vehicles, keyed by fleet row
+        detectors = self.workers["data_analysis"].detectors
+        names = [detector.name for detector in detectors.detectors]
+        detector_ids, flags, _ = detectors.evaluate()
+        drift = {}
+        for i in np.flatnonzero(flags.any(axis=(1, 2))):
+            row = readings.store.row_of(detector_ids[i])
+            if row is not None:
+                drift[row] = detector_drift(names, flags[i])
+        
+        loop = asyncio.get_running_loop()
+        executor = fleet_check_pool.executor(self.workers["diagnosis"].engine)
+        pending = [
+            loop.run_in_executor(executor, check_fleet_chunk, *args)
+            for args in fleet_chunks(readings, rows, drift, chunk_size)
+        ]
+        for chunk in asyncio.as_completed(pending):
+            results = await chunk
+            # Each chunk is one model evaluation in a worker process
+            MODEL_INFERENCES.labels(MODEL_NAME).inc()
+            MODEL_INFERENCE_ROWS.labels(MODEL_NAME).inc(len(results))
+            yield results
+    
+    @timed
     def initiate_customer_workflow(self, vehicle: Dict, diagnosis: Dict, owner: Dict) -> Dict:
         """Start customer engagement workflow"""
         self.log_action("initiate_customer_workflow", {"vehicle_id": vehicle.get("id")})
@@ -75,26 +150,46 @@ class MasterAgent:
         
         return {"workflow_id": workflow_id, "conversation": conversation}
     
+    @timed
     def process_chat_message(self, conversation_id: str, message: str) -> Dict:
         """Process incoming chat message"""
         self.log_action("process_chat", {"conversation_id": conversation_id})
         return self.workers["customer_engagement"].process_response(conversation_id, message)
     
+    @timed
     def schedule_service(self, vehicle: Dict, diagnosis: Dict, preferences: Optional[Dict] = None) -> Dict:
         """Find slots and prepare for scheduling"""
         self.log_action("schedule_service", {"vehicle_id": vehicle.get("id")})
         return self.workers["scheduling"].find_best_slots(vehicle, diagnosis, preferences)
     
-    def complete_booking(self, vehicle_id: str, center_id: str, date: str, time: str, service_type: str, diagnosis: Dict) -> Dict:
+    @timed
+    def complete_booking(self, vehicle_id: str, center_id: str, date: str, time: str, service_type: str, diagnosis: Dict,
+                         idempotency_key: str = None) -> Dict:
         """Complete booking process"""
         self.log_action("complete_booking", {"vehicle_id": vehicle_id})
-        return self.workers["scheduling"].create_booking(vehicle_id, center_id, date, time, service_type, diagnosis)
+        return self.workers["scheduling"].create_booking(vehicle_id, center_id, date, time, service_type, diagnosis,
+                                                         idempotency_key)
+    
+    @timed
+    def plan_fleet_service(self, requests: List[Dict], commit: bool = False) -> Dict:
+        """Plan (and optionally book) service slots for many vehicles at once"""
+        self.log_action("plan_fleet_service", {"vehicle_count": len(requests)})
+        return self.workers["scheduling"].plan_fleet(requests, commit)
     
+    @timed
     def get_fleet_overview(self, vehicles: List[Dict]) -> Dict:
         """Get fleet-level overview"""
         self.log_action("fleet_overview")
         return self.workers["data_analysis"].forecast_service_demand(vehicles)
     
+    @timed
+    def get_fleet_overview_from_readings(self, readings) -> Dict:
+        """Get fleet-level overview from a batched FleetReadings pass"""
+        self.log_action("fleet_overview")
+        vehicle_ids = [v["id"] for v in readings.store.vehicles]
+        return self.workers["data_analysis"].forecast_fleet_demand(vehicle_ids, readings.health_scores, readings.dtc_alerts)
+    
+    @timed
     def get_manufacturing_report(self) -> Dict:
         """Get manufacturing insights report"""
         return self.workers["manufacturing_insights"].generate_manufacturing_report()
@@ -103,5 +198,5 @@ class MasterAgent:
         """Get status of all workers"""
         return {
             "master": {"id": self.agent_id, "status": "active", "active_workflows": len(self.active_workflows)},
-            "workers": {name: {"id": agent.agent_id, "status": "active", "actions": len(agent.action_log)} for name, agent in self.workers.items()}
+            "workers": {name: {"id": agent.agent_id, "status": "active", "actions": agent.action_log.total} for name, agent in self.workers.items()}
         }
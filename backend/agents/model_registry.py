@@ -0,0 +1,137 @@
+"""
+Model Registry - Versioned on-disk storage for fitted models, keyed by feature schema
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from monitoring.metrics import CACHE_HITS, CACHE_MISSES
+
+DEFAULT_ROOT = os.environ.get(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+)
+
+logger = logging.getLogger(__name__)
+
+
+def schema_hash(feature_schema: List[str]) -> str:
+    """Stable hash of an ordered feature list"""
+    return hashlib.sha256(json.dumps(list(feature_schema)).encode()).hexdigest()[:16]
+
+
+class ModelRegistry:
+    """Stores each model as <root>/<name>/v<version>/{model.pkl, meta.json} with a LATEST pointer"""
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+        self._cache: Dict[Tuple[str, int], Tuple[Any, Dict]] = {}
+        # Reentrant so load_or_train can save while holding it
+        self._lock = threading.RLock()
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def latest_version(self, name: str) -> Optional[int]:
+        pointer = os.path.join(self._model_dir(name), "LATEST")
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            return int(f.read().strip())
+
+    def save(self, name: str, model: Any, feature_schema: List[str], metadata: Optional[Dict] = None) -> Dict:
+        """Persist a fitted model as the next version and point LATEST at it"""
+        with self._lock:
+            version = (self.latest_version(name) or 0) + 1
+            version_dir = os.path.join(self._model_dir(name), f"v{version}")
+            os.makedirs(version_dir, exist_ok=True)
+
+            meta = {
+                "name": name,
+                "version": version,
+                "feature_schema": list(feature_schema),
+                "schema_hash": schema_hash(feature_schema),
+                "model_class": type(model).__name__,
+                "created_at": datetime.now().isoformat(),
+                **(metadata or {})
+            }
+            with open(os.path.join(version_dir, "model.pkl"), "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(version_dir, "meta.json"), "w") as f:
+                json.dump(meta, f, indent=2)
+
+            pointer = os.path.join(self._model_dir(name), "LATEST")
+            with open(pointer + ".tmp", "w") as f:
+                f.write(str(version))
+            os.replace(pointer + ".tmp", pointer)
+
+            self._cache[(name, version)] = (model, meta)
+            return meta
+
+    def load(self, name: str, feature_schema: List[str], version: Optional[int] = None,
+             expected_metadata: Optional[Dict] = None) -> Optional[Tuple[Any, Dict]]:
+        """Load a model version (LATEST by default); None if missing or trained on a different schema.
+
+        Metadata recorded at save time that differs from expected_metadata
+        (e.g. the library version that pickled the model) is logged as a
+        warning before the model is unpickled.
+        """
+        version = version or self.latest_version(name)
+        if version is None:
+            return None
+
+        cached = self._cache.get((name, version))
+        if cached is not None:
+            CACHE_HITS.labels("model_registry").inc()
+        else:
+            CACHE_MISSES.labels("model_registry").inc()
+            version_dir = os.path.join(self._model_dir(name), f"v{version}")
+            meta_path = os.path.join(version_dir, "meta.json")
+            if not os.path.exists(meta_path):
+                return None
+            with open(meta_path) as f:
+                meta = json.load(f)
+            for key, expected in (expected_metadata or {}).items():
+                if key in meta and meta[key] != expected:
+                    logger.warning("%s v%d was saved with %s=%s, running %s; predictions may differ",
+                                   name, version, key, meta[key], expected)
+            with open(os.path.join(version_dir, "model.pkl"), "rb") as f:
+                model = pickle.load(f)
+            cached = self._cache[(name, version)] = (model, meta)
+
+        if cached[1].get("schema_hash") != schema_hash(feature_schema):
+            return None
+        return cached
+
+    def load_or_train(self, name: str, feature_schema: List[str], train: Callable[[], Any],
+                      metadata: Optional[Dict] = None) -> Tuple[Any, Dict]:
+        """Load the latest compatible model, or train and save one; concurrent callers train at most once"""
+        with self._lock:
+            loaded = self.load(name, feature_schema, expected_metadata=metadata)
+            if loaded is not None:
+                return loaded
+            model = train()
+            return model, self.save(name, model, feature_schema, metadata)
+
+    def list_versions(self, name: str) -> List[Dict]:
+        """Metadata for every stored version of a model"""
+        versions = []
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return versions
+        for entry in sorted(os.listdir(model_dir)):
+            meta_path = os.path.join(model_dir, entry, "meta.json")
+            if entry.startswith("v") and os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    versions.append(json.load(f))
+        return sorted(versions, key=lambda m: m["version"])
+
+
+# Global model registry
+model_registry = ModelRegistry()
@@ -0,0 +1,87 @@
+"""
+Orchestration - Runs a dependency graph of agent steps concurrently with per-step timings
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+ORCHESTRATION_THREADS = int(os.environ.get("ORCHESTRATION_THREADS", "8"))
+
+_step_executor = ThreadPoolExecutor(max_workers=ORCHESTRATION_THREADS, thread_name_prefix="orchestration")
+
+
+class Step:
+    """One unit of work in an orchestration graph.
+
+    `fn` receives the results of its dependencies as keyword arguments named
+    after them. Coroutine functions are awaited on the event loop; plain
+    functions run on the step executor.
+    """
+
+    __slots__ = ("name", "fn", "depends_on")
+
+    def __init__(self, name: str, fn: Callable[..., Any], depends_on: Sequence[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+
+
+def _check_graph(steps: List[Step]):
+    """Reject unknown dependencies and cycles before anything runs"""
+    names = {step.name for step in steps}
+    if len(names) != len(steps):
+        raise ValueError("Duplicate step names")
+    graph = {step.name: step.depends_on for step in steps}
+    for step in steps:
+        missing = set(step.depends_on) - names
+        if missing:
+            raise ValueError(f"Step {step.name} depends on unknown steps: {sorted(missing)}")
+
+    done, visiting = set(), set()
+
+    def visit(name: str):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through step {name}")
+        visiting.add(name)
+        for dependency in graph[name]:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in graph:
+        visit(name)
+
+
+async def run_step_graph(steps: List[Step], executor: Optional[Executor] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Run every step as soon as its dependencies finish; returns results and wall time per step in ms"""
+    _check_graph(steps)
+    loop = asyncio.get_running_loop()
+    executor = executor or _step_executor
+    tasks: Dict[str, asyncio.Task] = {}
+    timings: Dict[str, float] = {}
+
+    async def run(step: Step):
+        inputs = {}
+        for dependency in step.depends_on:
+            inputs[dependency] = await tasks[dependency]
+        start = time.perf_counter()
+        if asyncio.iscoroutinefunction(step.fn):
+            result = await step.fn(**inputs)
+        else:
+            result = await loop.run_in_executor(executor, lambda: step.fn(**inputs))
+        timings[step.name] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    for step in steps:
+        tasks[step.name] = asyncio.ensure_future(run(step))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return dict(zip(tasks, results)), timings
@@ -0,0 +1,125 @@
+"""
+Prediction Service - Dynamic micro-batching of concurrent model requests on a worker thread
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+DEFAULT_MAX_BATCH = int(os.environ.get("PREDICTION_MAX_BATCH", "64"))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("PREDICTION_MAX_WAIT_MS", "2"))
+
+
+class BatchPredictionService:
+    """Collects feature rows from concurrent callers and evaluates them in one model call.
+
+    The worker thread blocks for the first request, then keeps collecting until
+    `max_batch` rows are queued or `max_wait_ms` has passed since that first
+    request. `predict_fn` maps an (n x features) array to n outputs; each caller
+    gets its own row of the result through a Future.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, name: str = "prediction-service"):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    def start(self):
+        """Start the worker thread if it is not running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker after it drains already queued requests"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopping.set()
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def submit(self, features) -> Future:
+        """Queue one feature row; the Future resolves to that row's model output"""
+        if self._thread is None:
+            self.start()
+        future = Future()
+        self._queue.put((np.asarray(features, dtype=np.float64).ravel(), future))
+        return future
+
+    def predict(self, features):
+        """Blocking single-row prediction through the batcher"""
+        return self.submit(features).result()
+
+    async def predict_async(self, features):
+        """Awaitable single-row prediction; the event loop is never blocked on the model"""
+        return await asyncio.wrap_future(self.submit(features))
+
+    def _collect(self, first) -> List[Tuple[np.ndarray, Future]]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopping.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            if self._stopping.is_set() and self._queue.empty():
+                return
+            first = self._queue.get()
+            if first is None:
+                self._stopping.set()
+                continue
+            batch = self._collect(first)
+            # Callers that gave up (cancelled futures) are dropped before the model call
+            batch = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                outputs = self.predict_fn(np.vstack([row for row, _ in batch]))
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+            self.batches += 1
+            self.rows += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def get_stats(self) -> Dict:
+        """Batching counters since start"""
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "queue_depth": self._queue.qsize(),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000
+        }
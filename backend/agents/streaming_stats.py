@@ -0,0 +1,137 @@
+"""
+Streaming Sensor Statistics - O(1) per-reading accumulators for sensor trend queries
+"""
+import threading
+from typing import Dict, Optional
+import numpy as np
+
+
+class SensorStatsBank:
+    """Per-vehicle, per-sensor online statistics stored in slot-indexed arrays.
+
+    Tracks Welford mean/variance and running min/max over the full history, plus
+    a least-squares slope over a sliding window of the last `window` samples.
+    Every update touches a fixed number of array cells regardless of history length.
+    """
+
+    # Recompute window sums from the raw window every this many updates to bound float drift
+    RESYNC_EVERY = 4096
+
+    def __init__(self, n_sensors: int, window: int = 32, initial_slots: int = 16):
+        self.n_sensors = n_sensors
+        self.window = window
+        self._slots: Dict[str, int] = {}
+        self._capacity = 0
+        self._lock = threading.Lock()
+        self._allocate(initial_slots)
+
+    def _allocate(self, capacity: int):
+        shape = (capacity, self.n_sensors)
+        fresh = {
+            "count": np.zeros(shape, dtype=np.int64),
+            "mean": np.zeros(shape),
+            "m2": np.zeros(shape),
+            "min": np.full(shape, np.nan),
+            "max": np.full(shape, np.nan),
+            "last": np.full(shape, np.nan),
+            "win": np.zeros(shape + (self.window,)),
+            "win_head": np.zeros(shape, dtype=np.int64),
+            "win_n": np.zeros(shape, dtype=np.int64),
+            "win_sy": np.zeros(shape),
+            "win_sxy": np.zeros(shape),
+            "updates": np.zeros(capacity, dtype=np.int64),
+        }
+        for name, array in fresh.items():
+            if self._capacity:
+                array[:self._capacity] = getattr(self, "_" + name)
+            setattr(self, "_" + name, array)
+        self._capacity = capacity
+
+    def _slot(self, vehicle_id: str) -> int:
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= self._capacity:
+                self._allocate(self._capacity * 2)
+            self._slots[vehicle_id] = slot
+        return slot
+
+    def __contains__(self, vehicle_id: str) -> bool:
+        return vehicle_id in self._slots
+
+    def update(self, vehicle_id: str, values: np.ndarray):
+        """Fold one reading (NaN = sensor missing) into the accumulators"""
+        x = np.asarray(values, dtype=np.float64)
+        present = np.isfinite(x)
+        with self._lock:
+            s = self._slot(vehicle_id)
+
+            # Welford mean / variance and running extrema
+            count = self._count[s] + present
+            delta = np.where(present, x - self._mean[s], 0.0)
+            safe_count = np.maximum(count, 1)
+            self._mean[s] += delta / safe_count
+            self._m2[s] += np.where(present, delta * (x - self._mean[s]), 0.0)
+            self._count[s] = count
+            self._min[s] = np.fmin(self._min[s], x)
+            self._max[s] = np.fmax(self._max[s], x)
+            self._last[s] = np.where(present, x, self._last[s])
+
+            # Sliding-window regression sums with x = position in window
+            sensors = np.flatnonzero(present)
+            heads = self._win_head[s, sensors]
+            n = self._win_n[s, sensors]
+            full = n == self.window
+            evicted = np.where(full, self._win[s, sensors, heads], 0.0)
+            sy = self._win_sy[s, sensors] - evicted
+            sxy = np.where(full, self._win_sxy[s, sensors] - sy, self._win_sxy[s, sensors])
+            n = n - full
+
+            new = x[sensors]
+            self._win_sxy[s, sensors] = sxy + n * new
+            self._win_sy[s, sensors] = sy + new
+            self._win_n[s, sensors] = n + 1
+            self._win[s, sensors, heads] = new
+            self._win_head[s, sensors] = (heads + 1) % self.window
+
+            self._updates[s] += 1
+            if self._updates[s] % self.RESYNC_EVERY == 0:
+                self._resync(s)
+
+    def _resync(self, s: int):
+        """Recompute window sums for one slot directly from its window"""
+        positions = np.arange(self.window)
+        n = self._win_n[s][:, None]
+        oldest = (self._win_head[s][:, None] - n) % self.window
+        ordered = np.take_along_axis(self._win[s], (oldest + positions) % self.window, axis=1)
+        ordered = np.where(positions < n, ordered, 0.0)
+        self._win_sy[s] = ordered.sum(axis=1)
+        self._win_sxy[s] = (ordered * positions).sum(axis=1)
+
+    def _slopes(self, s: int) -> np.ndarray:
+        n = self._win_n[s].astype(np.float64)
+        sx = n * (n - 1) / 2
+        sxx = (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * sxx - sx * sx
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slopes = (n * self._win_sxy[s] - sx * self._win_sy[s]) / denominator
+        return np.where(n >= 2, slopes, 0.0)
+
+    def snapshot(self, vehicle_id: str) -> Optional[Dict[str, np.ndarray]]:
+        """Current statistics for every sensor of a vehicle as (sensors,) arrays"""
+        with self._lock:
+            s = self._slots.get(vehicle_id)
+            if s is None:
+                return None
+            count = self._count[s].copy()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                std = np.sqrt(self._m2[s] / count)
+            return {
+                "count": count,
+                "current": self._last[s].copy(),
+                "mean": np.where(count > 0, self._mean[s], np.nan),
+                "std": std,
+                "min": self._min[s].copy(),
+                "max": self._max[s].copy(),
+                "slope": self._slopes(s)
+            }
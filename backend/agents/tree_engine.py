@@ -0,0 +1,113 @@
+"""
+Tree Engine - Dependency-free inference for fitted sklearn tree ensembles using flat NumPy arrays
+"""
+from typing import Any
+import numpy as np
+import sklearn
+
+# sklearn >= 1.4 stores per-node class fractions in tree_.value; older versions store
+# weighted counts and normalize inside DecisionTreeClassifier.predict_proba
+_SKLEARN_NORMALIZES_AT_PREDICT = tuple(int(p) for p in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+
+class CompiledForest:
+    """A random forest classifier flattened into per-node arrays.
+
+    All trees share one node table (feature, threshold, left, right, missing-value
+    side, value). Leaves point at themselves with an infinite threshold, so every
+    tree can be walked for max_depth steps in lockstep for a whole batch. Inputs are cast to float32 and
+    per-tree probabilities are summed in tree order, matching sklearn's arithmetic
+    so results are bit-identical to RandomForestClassifier.predict_proba.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, classes: np.ndarray, n_features: int,
+                 missing_left: np.ndarray = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # Interleaved children: node * 2 + go_left, NaN goes right unless missing_left says otherwise
+        self.children = np.stack([right, left], axis=1).ravel().astype(np.intp)
+        self.missing_left = missing_left if missing_left is not None else np.zeros(len(feature), dtype=bool)
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, forest: Any) -> "CompiledForest":
+        """Flatten a fitted single-output RandomForestClassifier"""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            index = np.arange(offset, offset + n, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, index, tree.children_left + offset))
+            rights.append(np.where(is_leaf, index, tree.children_right + offset))
+            # Older sklearn trees have no missing-value routing: NaN never compares <= and goes right
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            missing.append(np.zeros(n, dtype=bool) if missing_go_to_left is None
+                           else (missing_go_to_left != 0) & ~is_leaf)
+
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            if _SKLEARN_NORMALIZES_AT_PREDICT:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int64),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            n_features=forest.n_features_in_,
+            missing_left=np.concatenate(missing)
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index per (row, tree)"""
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        flat_X = X.ravel()
+        row_offsets = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        nodes = np.repeat(self.roots.astype(np.intp)[None, :], len(X), axis=0)
+        has_missing = np.isnan(flat_X).any()
+        for _ in range(self.max_depth):
+            x = flat_X[row_offsets + self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = self.children[2 * nodes + go_left]
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities for one row or a batch"""
+        per_tree = self.value[self.apply(X)]
+        # cumsum accumulates strictly in tree order, like sklearn's running sum
+        total = np.cumsum(per_tree, axis=1)[:, -1, :]
+        return total / self.n_trees
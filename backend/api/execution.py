@@ -0,0 +1,127 @@
+"""
+Execution Layer - Runs CPU-bound route work on a worker pool so the event loop stays responsive
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+
+# "thread" (default) or "process"
+EXECUTION_MODE = os.environ.get("EXECUTION_MODE", "thread")
+EXECUTION_WORKERS = int(os.environ.get("EXECUTION_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Run fn and report when it actually started (CLOCK_MONOTONIC is shared across processes)"""
+    return time.monotonic(), fn(*args, **kwargs)
+
+
+class LaneStats:
+    """Counters and recent wait/run times for one executor"""
+
+    def __init__(self, workers: int, samples: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.waits = deque(maxlen=samples)
+        self.runs = deque(maxlen=samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        waits = np.array(self.waits) * 1000
+        runs = np.array(self.runs) * 1000
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            # Submitted calls beyond the worker count are waiting for a free worker
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_ms": _summary(waits),
+            "run_ms": _summary(runs)
+        }
+
+
+def _summary(values: np.ndarray) -> Dict[str, float]:
+    if not len(values):
+        return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"mean": round(float(values.mean()), 3), "p50": round(float(p50), 3),
+            "p99": round(float(p99), 3), "max": round(float(values.max()), 3)}
+
+
+class ExecutionLayer:
+    """Thread pool for agent calls, plus an optional process pool for stateless work.
+
+    run() always uses the thread pool because agent methods read and update
+    in-process state. run_stateless() is for module-level functions whose result
+    depends only on their arguments and static data; in "process" mode those go
+    to a process pool and sidestep the GIL.
+    """
+
+    def __init__(self, mode: str = EXECUTION_MODE, workers: int = EXECUTION_WORKERS, samples: int = 1024):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown execution mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self._executors: Dict[str, Executor] = {}
+        self._stats = {"thread": LaneStats(workers, samples)}
+        if mode == "process":
+            self._stats["process"] = LaneStats(workers, samples)
+        self._lock = threading.Lock()
+
+    def _executor(self, lane: str) -> Executor:
+        executor = self._executors.get(lane)
+        if executor is None:
+            with self._lock:
+                executor = self._executors.get(lane)
+                if executor is None:
+                    if lane == "process":
+                        executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    else:
+                        executor = ThreadPoolExecutor(self.workers, thread_name_prefix="execution")
+                    self._executors[lane] = executor
+        return executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound call on the thread pool and await its result"""
+        return await self._submit("thread", fn, args, kwargs)
+
+    async def run_stateless(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a picklable, state-free call on the process pool when configured, else the thread pool"""
+        return await self._submit("process" if self.mode == "process" else "thread", fn, args, kwargs)
+
+    async def _submit(self, lane: str, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        stats = self._stats[lane]
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        stats.in_flight += 1
+        try:
+            started, result = await loop.run_in_executor(self._executor(lane), _timed_call, fn, args, kwargs)
+        except BaseException:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+        stats.completed += 1
+        stats.waits.append(started - submitted)
+        stats.runs.append(time.monotonic() - started)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "lanes": {lane: stats.snapshot() for lane, stats in self._stats.items()}}
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Global execution layer
+execution = ExecutionLayer()
@@ -1,21 +1,34 @@
 """
 API Routes - REST API endpoints for the Predictive Maintenance System
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-import sys, os
+from typing import Dict, List, Optional, Union
+from datetime import datetime
+import sys, os, time, json
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data.vehicles import get_all_vehicles, get_vehicle_by_id, generate_sensor_reading
+from data.geo import vehicle_location
+from data.vehicles import get_vehicle_by_id, fleet_store
+from data.telemetry import telemetry_store, get_current_reading, get_current_vehicles
+from data.timeseries import history_store
 from data.maintenance import get_vehicle_maintenance_history, get_pending_maintenance, get_all_maintenance_summary
 from data.service_centers import get_all_service_centers, get_available_slots, book_appointment
 from data.rca_capa import get_rca_records, get_manufacturing_insights, get_feedback_summary
 from agents.master_agent import MasterAgent
+from api.execution import execution
 from security.ueba import ueba_monitor
+from security.pipeline import ueba_pipeline
 
 router = APIRouter()
 master_agent = MasterAgent()
+telemetry_store.subscribe(history_store.append)
+telemetry_store.subscribe(master_agent.workers["data_analysis"].observe_reading)
+
+# Target number of points per trend query when reading from history rollups
+TREND_POINTS = 500
 
 # Pydantic models
 class ChatMessage(BaseModel):
@@ -29,12 +42,45 @@ class BookingRequest(BaseModel):
     time: str
     service_type: str = "regular"
 
+class PlanVehicle(BaseModel):
+    vehicle_id: str
+    priority: str = "P4"
+    max_delay_days: Optional[int] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    service_type: str = "regular"
+
+class FleetPlanRequest(BaseModel):
+    vehicles: List[PlanVehicle]
+    commit: bool = False
+
+class TelemetryReading(BaseModel):
+    vehicle_id: str
+    sensors: Dict[str, float]
+    timestamp: Optional[datetime] = None
+    active_dtcs: Optional[List[str]] = None
+
+class TelemetryBatch(BaseModel):
+    readings: List[TelemetryReading]
+
+class FleetCheckRequest(BaseModel):
+    vehicle_ids: Union[List[str], str] = "all"
+
+def _telemetry_kwargs(reading: TelemetryReading) -> Dict:
+    return {
+        "vehicle_id": reading.vehicle_id,
+        "sensors": reading.sensors,
+        "timestamp": reading.timestamp.timestamp() if reading.timestamp else None,
+        "active_dtcs": reading.active_dtcs
+    }
+
 # Vehicle endpoints
 @router.get("/vehicles")
-async def list_vehicles():
+async def list_vehicles(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
     """Get all vehicles with health status"""
-    vehicles = get_all_vehicles()
-    return {"vehicles": vehicles, "total": len(vehicles)}
+    # Reads in-process telemetry, so it stays on the thread pool
+    vehicles = await execution.run(get_current_vehicles, offset=offset, limit=limit)
+    return {"vehicles": vehicles, "total": len(fleet_store)}
 
 @router.get("/vehicles/{vehicle_id}")
 async def get_vehicle(vehicle_id: str):
@@ -43,10 +89,10 @@ async def get_vehicle(vehicle_id: str):
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    reading = generate_sensor_reading(vehicle_id)
+    reading = get_current_reading(vehicle_id)
     history = get_vehicle_maintenance_history(vehicle_id)
     
-    result = master_agent.orchestrate_vehicle_check(vehicle, reading, history)
+    result = await master_agent.orchestrate_vehicle_check_async(vehicle, reading, history)
     return {"vehicle": vehicle, **result}
 
 @router.get("/vehicles/{vehicle_id}/alerts")
@@ -56,10 +102,65 @@ async def get_vehicle_alerts(vehicle_id: str):
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    reading = generate_sensor_reading(vehicle_id)
+    reading = get_current_reading(vehicle_id)
     anomalies = master_agent.workers["data_analysis"].detect_anomalies(reading)
     return {"vehicle_id": vehicle_id, "alerts": anomalies}
 
+@router.get("/vehicles/{vehicle_id}/telemetry")
+async def get_vehicle_telemetry(vehicle_id: str, n: int = 50):
+    """Get the last n buffered telemetry readings for a vehicle"""
+    if not get_vehicle_by_id(vehicle_id):
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return {"vehicle_id": vehicle_id, "readings": telemetry_store.readings(vehicle_id, n)}
+
+@router.get("/vehicles/{vehicle_id}/trends")
+async def get_vehicle_trends(vehicle_id: str, n: Optional[int] = None, hours: Optional[float] = None):
+    """Sensor trends from streaming statistics, the last n buffered readings, or on-disk history when hours is given"""
+    if not get_vehicle_by_id(vehicle_id):
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    analysis = master_agent.workers["data_analysis"]
+    if hours:
+        end = time.time()
+        history = await execution.run(history_store.query, vehicle_id, end - hours * 3600, end,
+                                      resolution=hours * 3600 / TREND_POINTS)
+        trends = await execution.run(analysis.analyze_sensor_window, history["timestamps"], history["mean"],
+                                     history_store.sensor_names)
+        return {"vehicle_id": vehicle_id, "resolution_seconds": history["resolution"], "trends": trends}
+
+    if n is None:
+        return {"vehicle_id": vehicle_id, "trends": analysis.get_vehicle_trends(vehicle_id)}
+
+    window = telemetry_store.window(vehicle_id, n)
+    if window is None:
+        return {"vehicle_id": vehicle_id, "trends": {"status": "no_data"}}
+    timestamps, values = window
+    trends = analysis.analyze_sensor_window(timestamps, values, telemetry_store.sensor_names)
+    return {"vehicle_id": vehicle_id, "trends": trends}
+
+@router.get("/vehicles/{vehicle_id}/history")
+async def get_vehicle_history(vehicle_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                              resolution: Optional[float] = None):
+    """Get sensor history (epoch seconds) served from the coarsest rollup that fits the resolution"""
+    if not get_vehicle_by_id(vehicle_id):
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    end = end or time.time()
+    start = start or end - 86400
+    history = await execution.run(history_store.query, vehicle_id, start, end, resolution)
+    return history_store.to_json(history)
+
+# Telemetry ingest endpoints
+@router.post("/telemetry")
+async def ingest_telemetry(reading: TelemetryReading):
+    """Ingest a single telemetry reading"""
+    if not telemetry_store.ingest(**_telemetry_kwargs(reading)):
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    return {"accepted": 1, "rejected": 0}
+
+@router.post("/telemetry/bulk")
+async def ingest_telemetry_bulk(batch: TelemetryBatch):
+    """Ingest a batch of telemetry readings"""
+    return await execution.run(telemetry_store.ingest_many, [_telemetry_kwargs(r) for r in batch.readings])
+
 # Chat endpoints
 @router.post("/chat/start/{vehicle_id}")
 async def start_chat(vehicle_id: str):
@@ -68,9 +169,9 @@ async def start_chat(vehicle_id: str):
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    reading = generate_sensor_reading(vehicle_id)
+    reading = get_current_reading(vehicle_id)
     history = get_vehicle_maintenance_history(vehicle_id)
-    check_result = master_agent.orchestrate_vehicle_check(vehicle, reading, history)
+    check_result = await master_agent.orchestrate_vehicle_check_async(vehicle, reading, history)
     
     workflow = master_agent.initiate_customer_workflow(vehicle, check_result["diagnosis"], vehicle["owner"])
     return workflow
@@ -89,27 +190,48 @@ async def get_slots(vehicle_id: str):
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    reading = generate_sensor_reading(vehicle_id)
-    diagnosis = master_agent.workers["diagnosis"].predict_failure(vehicle, reading)
+    reading = get_current_reading(vehicle_id)
+    diagnosis = await master_agent.workers["diagnosis"].predict_failure_async(vehicle, reading)
     slots = master_agent.schedule_service(vehicle, diagnosis)
     return slots
 
 @router.post("/schedule/book")
-async def book_slot(booking: BookingRequest):
-    """Book an appointment"""
+async def book_slot(booking: BookingRequest, idempotency_key: Optional[str] = Header(None)):
+    """Book an appointment; clients retrying a request should resend the same Idempotency-Key header"""
     vehicle = get_vehicle_by_id(booking.vehicle_id)
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
-    reading = generate_sensor_reading(booking.vehicle_id)
-    diagnosis = master_agent.workers["diagnosis"].predict_failure(vehicle, reading)
+    reading = get_current_reading(booking.vehicle_id)
+    diagnosis = await master_agent.workers["diagnosis"].predict_failure_async(vehicle, reading)
     
     result = master_agent.complete_booking(
         booking.vehicle_id, booking.center_id, booking.date, 
-        booking.time, booking.service_type, diagnosis
+        booking.time, booking.service_type, diagnosis, idempotency_key
     )
     return result
 
+@router.post("/schedule/plan")
+async def plan_schedule(request: FleetPlanRequest):
+    """Assign many vehicles (e.g. a fleet scan's P1/P2 results) to centers and slots in one pass"""
+    requests, unknown = [], []
+    for item in request.vehicles:
+        vehicle = get_vehicle_by_id(item.vehicle_id)
+        if item.lat is not None and item.lon is not None:
+            location = (item.lat, item.lon)
+        elif vehicle:
+            location = vehicle_location(vehicle)
+        else:
+            unknown.append(item.vehicle_id)
+            continue
+        requests.append({"vehicle_id": item.vehicle_id, "priority": item.priority, "max_delay_days": item.max_delay_days,
+                         "location": location, "service_type": item.service_type})
+    
+    start = time.perf_counter()
+    result = await execution.run(master_agent.plan_fleet_service, requests, request.commit)
+    result["summary"].update(unknown_vehicle_ids=unknown, elapsed_ms=round((time.perf_counter() - start) * 1000, 1))
+    return result
+
 @router.get("/service-centers")
 async def list_service_centers():
     """Get all service centers"""
@@ -119,7 +241,7 @@ async def list_service_centers():
 @router.get("/insights")
 async def get_insights():
     """Get manufacturing insights"""
-    return master_agent.get_manufacturing_report()
+    return await execution.run(master_agent.get_manufacturing_report)
 
 @router.get("/insights/rca")
 async def get_rca():
@@ -138,21 +260,60 @@ async def ueba_status():
     return ueba_monitor.get_security_dashboard()
 
 @router.get("/ueba/anomalies")
-async def get_anomalies(severity: Optional[str] = None):
-    """Get detected anomalies"""
-    return {"anomalies": ueba_monitor.get_anomalies(severity=severity)}
+async def get_anomalies(severity: Optional[str] = None, agent_id: Optional[str] = None,
+                        limit: int = 50, cursor: Optional[int] = None):
+    """Get detected anomalies, newest first; pass next_cursor back as cursor for the next page"""
+    return ueba_monitor.query_anomalies(severity=severity, agent_id=agent_id, limit=limit, cursor=cursor)
 
 @router.post("/ueba/simulate/{anomaly_type}")
 async def simulate_anomaly(anomaly_type: str):
     """Simulate an anomaly for demo"""
     return ueba_monitor.simulate_anomaly(anomaly_type)
 
+@router.get("/ueba/profiles")
+async def ueba_profiles():
+    """Get learned per-agent behavior profiles and their latest drift scores"""
+    return ueba_monitor.get_behavior_profiles()
+
+@router.get("/ueba/pipeline")
+async def ueba_pipeline_stats():
+    """Get UEBA event queue depth, throughput and dropped events"""
+    return ueba_pipeline.get_stats()
+
 # Fleet and dashboard endpoints
 @router.get("/fleet/overview")
 async def fleet_overview():
     """Get fleet overview with demand forecast"""
-    vehicles = get_all_vehicles()
-    return master_agent.get_fleet_overview(vehicles)
+    readings = await execution.run(telemetry_store.fleet_readings)
+    return await execution.run(master_agent.get_fleet_overview_from_readings, readings)
+
+@router.get("/fleet/anomalies")
+async def fleet_anomalies():
+    """Get streaming detector anomalies across the fleet"""
+    return await execution.run(master_agent.workers["data_analysis"].detect_fleet_anomalies)
+
+@router.post("/fleet/check")
+async def fleet_check(request: FleetCheckRequest):
+    """Check many vehicles (or "all") in parallel chunks, streaming NDJSON results as chunks finish"""
+    readings = await execution.run(telemetry_store.fleet_readings)
+    unknown = []
+    if request.vehicle_ids == "all":
+        rows = np.arange(len(readings))
+    elif isinstance(request.vehicle_ids, str):
+        raise HTTPException(status_code=400, detail='vehicle_ids must be a list of ids or "all"')
+    else:
+        rows = fleet_store.rows_of(request.vehicle_ids)
+        unknown = [v for v in request.vehicle_ids if v not in fleet_store]
+    
+    async def stream():
+        start = time.perf_counter()
+        async for chunk in master_agent.check_fleet(readings, rows):
+            yield "".join(json.dumps(result) + "\n" for result in chunk)
+        summary = {"checked": len(rows), "unknown_vehicle_ids": unknown,
+                   "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+        yield json.dumps({"summary": summary}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 @router.get("/maintenance/summary")
 async def maintenance_summary():
@@ -163,3 +324,8 @@ async def maintenance_summary():
 async def agent_status():
     """Get status of all agents"""
     return master_agent.get_agent_status()
+
+@router.get("/execution/stats")
+async def execution_stats():
+    """Get worker pool queue depth and wait/run times"""
+    return execution.get_stats()
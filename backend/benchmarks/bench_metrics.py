@@ -0,0 +1,93 @@
+"""
+Metrics Benchmark - Per-call overhead of the instrumentation surface
+
+Run from the backend directory:
+    python -m benchmarks.bench_metrics
+Exits non-zero if the decorator or middleware adds more than OVERHEAD_LIMIT_US per call.
+"""
+import asyncio
+import sys
+import time
+from monitoring.metrics import MetricsRegistry, timed
+from monitoring.middleware import MetricsMiddleware
+
+OVERHEAD_LIMIT_US = 5.0
+CALLS = 200000
+
+
+def per_call_us(fn, calls: int = CALLS) -> float:
+    """Best of three runs, microseconds per call"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best * 1e6
+
+
+def plain():
+    return None
+
+
+@timed(component="bench", method="decorated")
+def decorated():
+    return None
+
+
+class _Route:
+    path = "/bench/{item_id}"
+
+    class path_regex:
+        @staticmethod
+        def match(path):
+            return path == "/bench/1"
+
+
+async def _asgi_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def asgi_us(app, calls: int = CALLS // 4) -> float:
+    scope_template = {"type": "http", "method": "GET", "path": "/bench/1"}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(calls):
+            await app(dict(scope_template), receive, send)
+        return (time.perf_counter() - start) / calls
+
+    return min(asyncio.run(run()) for _ in range(3)) * 1e6
+
+
+def main() -> int:
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "bench", ["kind"]).labels("x")
+    histogram = registry.histogram("bench_seconds", "bench", ["kind"]).labels("x")
+
+    base = per_call_us(plain)
+    decorator = per_call_us(decorated) - base
+    counter_us = per_call_us(counter.inc) - base
+    histogram_us = per_call_us(lambda: histogram.observe(0.003)) - base
+    middleware = asgi_us(MetricsMiddleware(_asgi_app)) - asgi_us(_asgi_app)
+
+    print(f"{'operation':<28} {'overhead (us/call)':>18}")
+    for name, value in [("Counter.inc", counter_us), ("Histogram.observe", histogram_us),
+                        ("@timed decorator", decorator), ("MetricsMiddleware", middleware)]:
+        print(f"{name:<28} {value:>18.3f}")
+
+    ok = decorator < OVERHEAD_LIMIT_US and middleware < OVERHEAD_LIMIT_US
+    print(f"Within {OVERHEAD_LIMIT_US}us budget: {'yes' if ok else 'NO'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Prediction Service Benchmark - Throughput of micro-batched failure predictions under concurrency
+
+Run from the backend directory:
+    python -m benchmarks.bench_prediction_service
+"""
+import asyncio
+import sys
+import time
+import numpy as np
+from agents.diagnosis import DiagnosisAgent
+from agents.prediction_service import BatchPredictionService
+from benchmarks.bench_tree_engine import parity_inputs
+
+CONCURRENT_REQUESTS = 2000
+
+
+async def run_batched(service: BatchPredictionService, rows: np.ndarray) -> np.ndarray:
+    return np.array(await asyncio.gather(*(service.predict_async(row) for row in rows)))
+
+
+def main() -> int:
+    agent = DiagnosisAgent()
+    rows = parity_inputs(agent.engine, CONCURRENT_REQUESTS)[:CONCURRENT_REQUESTS]
+    expected = agent.engine.predict_proba(rows)[:, 1]
+
+    start = time.perf_counter()
+    for row in rows:
+        agent.engine.predict_proba(row[None, :])
+    unbatched = time.perf_counter() - start
+    print(f"{'max_batch':>9} {'req/s':>10} {'mean batch':>11}")
+    print(f"{'none':>9} {len(rows) / unbatched:>10.0f} {1:>11.1f}")
+
+    ok = True
+    for max_batch in (1, 8, 64, 256):
+        service = BatchPredictionService(agent._predict_failure_probabilities, max_batch=max_batch, max_wait_ms=2)
+        start = time.perf_counter()
+        results = asyncio.run(run_batched(service, rows))
+        elapsed = time.perf_counter() - start
+        service.stop()
+        ok &= np.array_equal(results, expected)
+        stats = service.get_stats()
+        print(f"{max_batch:>9} {len(rows) / elapsed:>10.0f} {stats['mean_batch_size']:>11.1f}")
+
+    print(f"Results match direct evaluation: {'yes' if ok else 'NO'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
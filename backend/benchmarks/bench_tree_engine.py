@@ -0,0 +1,72 @@
+"""
+Tree Engine Benchmark - Parity and latency of CompiledForest against sklearn predict_proba
+
+Run from the backend directory:
+    python -m benchmarks.bench_tree_engine
+Exits non-zero if any probability differs from sklearn by even one bit.
+"""
+import sys
+import time
+import numpy as np
+from agents.diagnosis import DiagnosisAgent
+from agents.tree_engine import CompiledForest
+
+# Feature ranges slightly wider than the training data: [engine_temp, oil_pressure, battery_voltage, brake_wear, mileage]
+FEATURE_LOW = np.array([75, 10, 11, 0, 0])
+FEATURE_SPAN = np.array([40, 60, 4, 120, 150000])
+
+
+def parity_inputs(engine: CompiledForest, n_rows: int, seed: int = 0) -> np.ndarray:
+    """Random rows, rows sitting exactly on split thresholds, and rows with missing values"""
+    rng = np.random.default_rng(seed)
+    random_rows = rng.random((n_rows, engine.n_features)) * FEATURE_SPAN + FEATURE_LOW
+
+    splits = np.isfinite(engine.threshold)
+    thresholds, features = engine.threshold[splits], engine.feature[splits]
+    edge_rows = random_rows[rng.integers(0, n_rows, len(thresholds))].copy()
+    edge_rows[np.arange(len(thresholds)), features] = thresholds
+    missing_rows = random_rows.copy()
+    missing_rows[rng.random(missing_rows.shape) < 0.2] = np.nan
+    return np.vstack([random_rows, edge_rows, missing_rows])
+
+
+def check_parity(model, engine: CompiledForest, n_rows: int = 5000) -> bool:
+    X = parity_inputs(engine, n_rows)
+    expected = model.predict_proba(X)
+    batched = engine.predict_proba(X)
+    single = np.vstack([engine.predict_proba(X[i:i + 1]) for i in range(0, len(X), 97)])
+    return np.array_equal(expected, batched) and np.array_equal(expected[::97], single)
+
+
+def time_call(fn, repeat: int) -> float:
+    """Mean seconds per call"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> int:
+    model = DiagnosisAgent().model
+    engine = CompiledForest.from_sklearn(model)
+    print(f"Forest: {engine.n_trees} trees, {len(engine.feature)} nodes, max depth {engine.max_depth}")
+
+    parity = check_parity(model, engine)
+    print(f"Parity with sklearn predict_proba: {'bit-identical' if parity else 'MISMATCH'}")
+
+    rows = parity_inputs(engine, 1024)
+    rows = rows[np.isfinite(rows).all(axis=1)]
+    print(f"{'batch':>6} {'sklearn (us)':>14} {'compiled (us)':>14} {'speedup':>8}")
+    for batch in (1, 8, 64, 1024):
+        X = rows[:batch]
+        repeat = 20 if batch >= 64 else 50
+        sk = time_call(lambda: model.predict_proba(X), repeat)
+        compiled = time_call(lambda: engine.predict_proba(X), repeat * 10)
+        print(f"{batch:>6} {sk * 1e6:>14.1f} {compiled * 1e6:>14.1f} {sk / compiled:>7.1f}x")
+
+    return 0 if parity else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Fleet Check Parity - The batch fleet check must give the same result per vehicle as orchestrate_vehicle_check
+
+Run from the backend directory:
+    python -m benchmarks.check_fleet_parity
+Exits non-zero if any vehicle's batch result differs from its single-vehicle orchestration.
+"""
+import asyncio
+import sys
+import numpy as np
+from agents.fleet_check import fleet_check_pool
+from agents.master_agent import MasterAgent
+from data.maintenance import get_vehicle_maintenance_history
+from data.vehicles import generate_fleet_readings
+from benchmarks.synthetic import synthetic_fleet
+
+VEHICLES = 200
+# Vehicles whose streaming detectors see a steady history and then a jump, so they report drift
+DRIFTING = 5
+HISTORY = 40
+
+
+def _strip_volatile(result: dict) -> dict:
+    """Drop timestamps and the randomized prediction confidence before comparing"""
+    result = {**result, "diagnosis": {**result["diagnosis"]}}
+    result.pop("orchestration_timestamp", None)
+    result["diagnosis"].pop("timestamp", None)
+    result["diagnosis"].pop("prediction_confidence", None)
+    return result
+
+
+async def _check_fleet(master: MasterAgent, readings, rows: np.ndarray) -> dict:
+    results = {}
+    async for chunk in master.check_fleet(readings, rows, chunk_size=64):
+        results.update((r["vehicle_id"], r) for r in chunk)
+    return results
+
+
+def _compare(master: MasterAgent, readings) -> tuple:
+    """Batch-check every vehicle of a fleet and compare each result with its single-vehicle orchestration"""
+    ids = readings.store.ids()
+    rows = np.arange(len(ids))
+
+    detectors = master.workers["data_analysis"].detectors
+    for r in rows[:DRIFTING]:
+        values = np.nan_to_num(readings.values[r])
+        for _ in range(HISTORY):
+            detectors.update(ids[r], values)
+        detectors.update(ids[r], values * 1.5)
+
+    batch = asyncio.run(_check_fleet(master, readings, rows))
+    failures = []
+    for r in rows.tolist():
+        vehicle = readings.vehicle(r)
+        single = master.orchestrate_vehicle_check(vehicle, vehicle["current_reading"],
+                                                  get_vehicle_maintenance_history(vehicle["id"]))
+        if vehicle["id"] not in batch:
+            failures.append(f"{vehicle['id']}: missing from the batch results")
+        elif _strip_volatile(batch[vehicle["id"]]) != _strip_volatile(single):
+            failures.append(f"{vehicle['id']}: batch result differs from orchestrate_vehicle_check")
+    return batch, failures
+
+
+def main() -> int:
+    master = MasterAgent()
+    batch, failures = {}, []
+    try:
+        # The demo fleet carries DTCs and maintenance history; the synthetic one covers many sensor states
+        for readings in (generate_fleet_readings(), generate_fleet_readings(synthetic_fleet(VEHICLES), anomaly_chance=0.5)):
+            results, mismatches = _compare(master, readings)
+            batch.update(results)
+            failures.extend(mismatches)
+    finally:
+        fleet_check_pool.shutdown()
+
+    critical = sum(1 for r in batch.values() if any(a.get("severity") == "critical" for a in r["anomalies"]))
+    drifted = sum(1 for r in batch.values() if any("detectors" in a for a in r["anomalies"]))
+    dtcs = sum(1 for r in batch.values() if "dtc_diagnosis" in r["diagnosis"])
+    print(f"{len(batch)} vehicles compared, {drifted} with detector drift, {critical} with critical sensors, "
+          f"{dtcs} with DTC diagnoses")
+    for failure in failures:
+        print("FAIL", failure)
+    print("OK" if not failures else f"{len(failures)} mismatch(es)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Benchmark Runner - Times the suite, writes JSON results and compares them with the committed baseline
+
+Run from the backend directory:
+    python -m benchmarks.run                       # full suite, compare with baseline.json
+    python -m benchmarks.run get_all_vehicles      # only benchmarks whose name contains a pattern
+    python -m benchmarks.run --update-baseline     # record the current numbers as the new baseline
+Exits non-zero when a benchmark's median and best round are both more than --threshold times its baseline.
+
+Agent calls publish to the action-log sinks (the UEBA pipeline, the optional
+file sink), whose background threads would compete with the timed code, so
+they are detached and stopped first. A fixed calibration workload is timed
+alongside the suite and baseline numbers are scaled by how much faster or
+slower it ran than when the baseline was recorded, so a baseline from
+another machine still gives meaningful ratios.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime
+from typing import Callable, Dict
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+DEFAULT_THRESHOLD = 1.5
+CALIBRATION_ROUNDS = 9
+
+
+def measure(fn: Callable[[], object], rounds: int = 5, round_seconds: float = 0.1, max_calls: int = None) -> Dict:
+    """Median and best time per call over `rounds` rounds of a calibrated number of calls"""
+    # Warm up first (lazy imports, caches, model loads), then size rounds from warm calls
+    fn()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= round_seconds / 10 or (max_calls and calls >= max_calls):
+            break
+        calls *= 2
+    calls = max(1, int(round_seconds * calls / max(elapsed, 1e-7)))
+    if max_calls:
+        calls = min(calls, max_calls)
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        per_call.append((time.perf_counter() - start) / calls)
+    return {
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "min_us": round(min(per_call) * 1e6, 3),
+        "rounds": rounds,
+        "calls_per_round": calls
+    }
+
+
+def calibration_workload() -> Callable[[], object]:
+    """Fixed mix of interpreter, dict and NumPy work whose time tracks this machine's speed"""
+    data = np.random.default_rng(0).random(20_000)
+
+    def run():
+        total = 0
+        for i in range(2000):
+            total += i * i % 7
+        index = {f"V{i:05d}": i for i in range(1000)}
+        return total, len(index), np.sort(data)[-1], float(np.sqrt(data).sum())
+    return run
+
+
+def quiesce_background_work():
+    """Detach and stop the action-log sinks, so their worker threads don't run during timing"""
+    import security.pipeline  # noqa: F401  (registers the global UEBA pipeline sink)
+    from agents.action_log import registered_sinks, unregister_sink
+
+    for sink in registered_sinks():
+        unregister_sink(sink)
+        stop = getattr(sink, "stop", None)
+        if stop is not None:
+            stop()
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, scale: float = 1.0) -> Dict[str, Dict]:
+    """Ratio to the scaled baseline per benchmark and whether it regressed.
+
+    A real slowdown moves both the median and the best round, while a burst
+    of outside load mostly moves the median, so both must exceed the threshold.
+    """
+    comparison = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            comparison[name] = {"ratio": None, "min_ratio": None, "status": "new"}
+            continue
+        ratio, min_ratio = (result[key] / (base[key] * scale) if base[key] else float("inf")
+                            for key in ("median_us", "min_us"))
+        regressed = ratio > threshold and min_ratio > threshold
+        comparison[name] = {"ratio": round(ratio, 3), "min_ratio": round(min_ratio, 3),
+                            "status": "REGRESSED" if regressed else "ok"}
+    return comparison
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backend hot-path benchmarks")
+    parser.add_argument("patterns", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when median exceeds baseline by this factor")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--update-baseline", action="store_true", help="write results into the baseline file")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    from benchmarks.suite import BENCHMARKS, MAX_CALLS, select
+
+    names = select(args.patterns)
+    if not names:
+        print("No benchmarks match", args.patterns)
+        return 1
+    quiesce_background_work()
+
+    # Best round of the calibration workload, before and after the suite, as this machine's speed
+    calibration = calibration_workload()
+    calibration_us = measure(calibration, rounds=CALIBRATION_ROUNDS)["min_us"]
+    results = {}
+    for name in names:
+        fn = BENCHMARKS[name]()
+        results[name] = measure(fn, rounds=args.rounds, max_calls=MAX_CALLS.get(name))
+        print(f"  {name:<45} {results[name]['median_us']:>14.1f} us", flush=True)
+    calibration_us = min(calibration_us, measure(calibration, rounds=CALIBRATION_ROUNDS)["min_us"])
+    print(f"  {'calibration':<45} {calibration_us:>14.1f} us", flush=True)
+
+    baseline, baseline_meta = {}, {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline, baseline_meta = stored.get("results", {}), stored.get("meta", {})
+    baseline_calibration = baseline_meta.get("calibration_us")
+    scale = calibration_us / baseline_calibration if baseline_calibration else 1.0
+    comparison = compare(results, baseline, args.threshold, scale)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "threshold": args.threshold,
+            "calibration_us": calibration_us,
+            "calibration_scale": round(scale, 3)
+        },
+        "results": results,
+        "comparison": comparison
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nBaseline scaled by {scale:.3f} for this machine's calibration run")
+    print(f"\n{'benchmark':<45} {'median (us)':>14} {'baseline (us)':>14} {'ratio':>7} {'min ratio':>9}  status")
+    for name in names:
+        base = baseline.get(name, {}).get("median_us")
+        ratio, min_ratio = comparison[name]["ratio"], comparison[name]["min_ratio"]
+        print(f"{name:<45} {results[name]['median_us']:>14.1f} {base if base is not None else '-':>14} "
+              f"{ratio if ratio is not None else '-':>7} {min_ratio if min_ratio is not None else '-':>9}  "
+              f"{comparison[name]['status']}")
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        # Rescale entries that were not re-run to the new calibration
+        merged = {name: {**base, "median_us": round(base["median_us"] * scale, 3), "min_us": round(base["min_us"] * scale, 3)}
+                  for name, base in baseline.items()}
+        merged.update(results)
+        meta = {key: value for key, value in report["meta"].items() if key != "calibration_scale"}
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": meta, "results": merged}, f, indent=2, sort_keys=True)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressed = [name for name, c in comparison.items() if c["status"] == "REGRESSED"]
+    if regressed:
+        print(f"{len(regressed)} benchmark(s) regressed beyond {args.threshold}x: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Booking Stress Test - Thousands of parallel bookings and retries must never oversell or double-book
+
+Run from the backend directory:
+    python -m benchmarks.stress_booking
+Exits non-zero if any invariant is violated.
+"""
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from data.booking_service import BookingService
+from data.service_centers import SERVICE_CENTERS
+from data.slot_inventory import SlotInventory
+
+THREADS = 64
+REQUESTS = 5000
+# Share of requests sent twice with the same idempotency key, as a client retry would
+RETRY_SHARE = 0.2
+CENTERS = ("SC001", "SC005", "SC008")
+DAYS = 2
+
+
+def main() -> int:
+    centers = {c["id"]: c for c in SERVICE_CENTERS}
+    inventory = SlotInventory(SERVICE_CENTERS, horizon_days=DAYS + 1)
+    service = BookingService(inventory, centers.get)
+    dates = inventory.dates[1:DAYS + 1]
+
+    rng = random.Random(7)
+    requests = []
+    for i in range(REQUESTS):
+        center_id = rng.choice(CENTERS)
+        request = (f"SV{i:07d}", center_id, rng.choice(dates), rng.choice(inventory.slot_times[inventory._rows[center_id]]),
+                   "regular", "", f"key-{i}")
+        requests.append(request)
+        if rng.random() < RETRY_SHARE:
+            requests.append(request)
+    rng.shuffle(requests)
+
+    # Switch threads as often as possible to surface races
+    sys.setswitchinterval(1e-6)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(lambda r: (r, service.book(*r)), requests))
+    elapsed = time.perf_counter() - start
+    sys.setswitchinterval(0.005)
+
+    failures = []
+    booked = [result["appointment"] for _, result in results if result["success"] and not result.get("replayed")]
+    ids = Counter(a["id"] for a in booked)
+    if len(ids) != len(booked):
+        failures.append(f"duplicate appointment ids: {[i for i, n in ids.items() if n > 1][:5]}")
+    if len(service.appointments) != len(booked):
+        failures.append(f"{len(service.appointments)} appointments stored for {len(booked)} bookings")
+
+    per_vehicle = Counter(a["vehicle_id"] for a in booked)
+    if any(n > 1 for n in per_vehicle.values()):
+        failures.append("a retried request booked twice")
+    first_result = {}
+    for request, result in results:
+        key = request[-1]
+        if key in first_result and result.get("appointment", {}).get("id") != first_result[key]:
+            failures.append(f"retry of {key} returned a different result")
+            break
+        first_result.setdefault(key, result.get("appointment", {}).get("id"))
+
+    per_slot = Counter((a["center_id"], a["date"], a["time"]) for a in booked)
+    per_day = Counter((a["center_id"], a["date"]) for a in booked)
+    for (center_id, date, time_str), count in per_slot.items():
+        if count > centers[center_id]["capacity"]["bays"]:
+            failures.append(f"overbooked slot {center_id} {date} {time_str}: {count}")
+    for (center_id, date), count in per_day.items():
+        row, day = inventory._rows[center_id], inventory.dates.index(date)
+        if count > centers[center_id]["capacity"]["daily_capacity"]:
+            failures.append(f"overbooked day {center_id} {date}: {count}")
+        if count + inventory.day_remaining[row, day] != inventory.daily_capacity[row]:
+            failures.append(f"lost update on {center_id} {date}: {count} booked, {inventory.day_remaining[row, day]} left")
+
+    capacity = sum(centers[c]["capacity"]["daily_capacity"] for c in CENTERS) * DAYS
+    print(f"{len(requests)} requests ({len(requests) - REQUESTS} retries) on {THREADS} threads in {elapsed:.2f}s")
+    print(f"{len(booked)} booked of {capacity} capacity, "
+          f"{sum(1 for _, r in results if r.get('replayed'))} retries answered from the idempotency cache")
+    for failure in failures:
+        print("FAIL", failure)
+    print("OK" if not failures else f"{len(failures)} invariant(s) violated")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+UEBA Stress Test - Profiler growth, pipeline worker failures and anomaly log bounds
+
+Run from the backend directory:
+    python -m benchmarks.stress_ueba
+Exits non-zero if any invariant is violated.
+"""
+import logging
+import random
+import sys
+import time
+from agents.action_log import ActionRecord
+from security.behavior_profiles import BehaviorProfiler
+from security.pipeline import UEBAPipeline
+from security.policy import RATE_WINDOWS
+from security.ueba import UEBAMonitor
+
+AGENTS = 12
+ACTIONS = 40
+PERIODS = 6
+EVENTS_PER_PERIOD = 2000
+
+
+def check_profiler_growth(failures: list):
+    """Push more agents and actions than the initial matrices hold through observe/update"""
+    now = [0.0]
+    profiler = BehaviorProfiler(interval=60, min_profile_events=10, min_period_events=5, warmup_periods=1,
+                                clock=lambda: now[0])
+    rng = random.Random(3)
+    agents = [f"agent_{i}" for i in range(AGENTS)]
+    actions = [f"action_{i}" for i in range(ACTIONS)]
+    counts = {}
+    try:
+        for _ in range(PERIODS):
+            for _ in range(EVENTS_PER_PERIOD):
+                agent, action = rng.choice(agents), rng.choice(actions)
+                now[0] += rng.random()
+                profiler.observe(agent, action, now[0], int(now[0] // 3600) % 24)
+                counts[agent] = counts.get(agent, 0) + 1
+            profiler.update()
+    except Exception as e:
+        failures.append(f"profiler raised {type(e).__name__}: {e}")
+        return
+
+    profiles = profiler.get_profiles()["agents"]
+    if sorted(profiles) != sorted(counts):
+        failures.append(f"profiled agents {sorted(profiles)} != observed {sorted(counts)}")
+    seen = {action for profile in profiles.values() for action in profile["top_actions"]}
+    if not seen <= set(actions):
+        failures.append(f"unknown actions in profiles: {sorted(seen - set(actions))[:5]}")
+    if len(profiler._actions) != ACTIONS:
+        failures.append(f"{len(profiler._actions)} action columns for {ACTIONS} actions")
+    print(f"profiler: {AGENTS} agents, {ACTIONS} actions, {PERIODS} periods, {profiler.updates} updates")
+
+
+class FlakyMonitor(UEBAMonitor):
+    """Raises on any batch holding a "poison" record"""
+
+    def record_batch(self, records) -> int:
+        records = list(records)
+        if any(record.action == "poison" for record in records):
+            raise RuntimeError("poison record")
+        return super().record_batch(records)
+
+
+def check_pipeline_survives_failures(failures: list):
+    """A failing batch is counted and skipped; the worker keeps draining and stop() does not raise"""
+    monitor = FlakyMonitor()
+    pipeline = UEBAPipeline(monitor, batch_size=1)
+    logging.disable(logging.ERROR)
+    try:
+        pipeline(ActionRecord("diagnosis_agent", "poison", None, time.monotonic_ns()))
+        pipeline(ActionRecord("diagnosis_agent", "read_secrets", None, time.monotonic_ns(), ("customer_pii",)))
+        for _ in range(20):
+            pipeline(ActionRecord("diagnosis_agent", "predict_failure", None, time.monotonic_ns()))
+        deadline = time.monotonic() + 5
+        while pipeline.processed + pipeline.failed_records < pipeline.published and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = pipeline.get_stats()
+        if not stats["running"]:
+            failures.append("pipeline worker died after a failed batch")
+        if stats["failed_batches"] != 1 or stats["processed"] != 21:
+            failures.append(f"expected 1 failed batch and 21 processed, got {stats}")
+        try:
+            pipeline.stop()
+        except Exception as e:
+            failures.append(f"stop() raised {type(e).__name__}: {e}")
+    finally:
+        logging.disable(logging.NOTSET)
+    if not any(entry["anomaly"]["type"] == "unauthorized_data_access" for entry in monitor.anomaly_log):
+        failures.append("data_accessed on a piped record did not reach the access check")
+    print(f"pipeline: {stats['processed']} processed, {stats['failed_batches']} failed batch(es)")
+
+
+def check_anomaly_log_bounded(failures: list):
+    """Floods of critical and repeating anomalies keep the log and its indexes bounded and pageable"""
+    monitor = UEBAMonitor(anomaly_log_size=100)
+    for _ in range(5000):
+        # Unauthorized data access is critical, so every one is logged
+        monitor.record_action("feedback_agent", "modify_vehicle_data", ["telematics"])
+        # Over the rate limit every time after the first few: repeats fold into one entry per window
+        monitor.record_action("diagnosis_agent", "predict_failure")
+    if len(monitor.anomaly_log) > monitor.anomaly_log_size:
+        failures.append(f"anomaly log holds {len(monitor.anomaly_log)} entries, limit {monitor.anomaly_log_size}")
+    stale = [key for key, seqs in monitor._anomaly_index.items() if seqs[0] < monitor._anomaly_base]
+    if stale:
+        failures.append(f"index entries point below the retained log: {stale[:3]}")
+    frequency = monitor.query_anomalies(agent_id="diagnosis_agent", limit=500)["anomalies"]
+    if len(frequency) > len(RATE_WINDOWS):
+        failures.append(f"{len(frequency)} high_frequency entries for {len(RATE_WINDOWS)} windows")
+    seen, cursor = 0, None
+    while True:
+        page = monitor.query_anomalies(severity="critical", limit=30, cursor=cursor)
+        seen += len(page["anomalies"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    if seen != page["total"]:
+        failures.append(f"paged {seen} critical anomalies of {page['total']}")
+    print(f"anomaly log: {len(monitor.anomaly_log)} retained of "
+          f"{sum(monitor.anomaly_counts['severity'].values())} detected, "
+          f"{sum(entry['occurrences'] for entry in frequency)} rate detections in {len(frequency)} entries")
+
+
+def check_dashboard_counts(failures: list):
+    """Dashboard totals count every detection, including folded repeats, and its entries are copies"""
+    monitor = UEBAMonitor()
+    for _ in range(500):
+        monitor.record_action("diagnosis_agent", "predict_failure")
+    dashboard = monitor.get_security_dashboard()
+    detections = sum(entry["occurrences"] for entry in monitor.anomaly_log)
+    if dashboard["total_anomalies"] != detections:
+        failures.append(f"dashboard counts {dashboard['total_anomalies']} anomalies for {detections} detections")
+    if dashboard["by_agent"].get("diagnosis_agent", 0) != detections:
+        failures.append(f"dashboard counts {dashboard['by_agent'].get('diagnosis_agent', 0)} for diagnosis_agent, "
+                        f"expected {detections}")
+    recent = dashboard["recent_anomalies"][-1]
+    occurrences = recent["occurrences"]
+    monitor.record_action("diagnosis_agent", "predict_failure")
+    recent["anomaly"]["severity"] = "changed"
+    if recent["occurrences"] != occurrences:
+        failures.append("dashboard returned a live anomaly entry that later detections update")
+    if any(entry["anomaly"]["severity"] == "changed" for entry in monitor.anomaly_log):
+        failures.append("editing a dashboard anomaly changed the monitor's log")
+    print(f"dashboard: {dashboard['total_anomalies']} anomalies counted in {len(monitor.anomaly_log)} entries")
+
+
+def main() -> int:
+    failures = []
+    check_profiler_growth(failures)
+    check_pipeline_survives_failures(failures)
+    check_anomaly_log_bounded(failures)
+    check_dashboard_counts(failures)
+    for failure in failures:
+        print("FAIL", failure)
+    print("OK" if not failures else f"{len(failures)} invariant(s) violated")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Benchmark Suite - Hot paths of the backend, each registered as a setup returning the call to time
+"""
+from typing import Callable, Dict, List
+from benchmarks.synthetic import synthetic_fleet
+
+# name -> setup; setup() prepares state and returns a zero-argument callable
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+# name -> cap on timed calls per round, for benchmarks whose calls change the state being measured
+MAX_CALLS: Dict[str, int] = {}
+
+FLEET_SIZES = {"10": 10, "10k": 10_000, "100k": 100_000}
+UEBA_HISTORY_SIZES = (10, 1000, 100_000)
+PREDICTION_BATCHES = (64, 1024)
+
+
+def benchmark(name: str, max_calls: int = None):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        if max_calls:
+            MAX_CALLS[name] = max_calls
+        return setup
+    return register
+
+
+def _demo_inputs():
+    from data.vehicles import VEHICLES, generate_sensor_reading
+    from data.maintenance import get_vehicle_maintenance_history
+    vehicle = VEHICLES[1]
+    return vehicle, generate_sensor_reading(vehicle["id"]), get_vehicle_maintenance_history(vehicle["id"])
+
+
+def _register_fleet_benchmarks():
+    from data.vehicles import generate_sensor_reading, get_all_vehicles
+
+    for label, size in FLEET_SIZES.items():
+        def sensor_readings(size=size):
+            ids = synthetic_fleet(size).ids()
+            return lambda: [generate_sensor_reading(vehicle_id) for vehicle_id in ids]
+
+        def all_vehicles(size=size):
+            store = synthetic_fleet(size)
+            return lambda: get_all_vehicles(store=store)
+
+        benchmark(f"generate_sensor_reading/fleet_{label}")(sensor_readings)
+        benchmark(f"get_all_vehicles/fleet_{label}")(all_vehicles)
+
+
+_register_fleet_benchmarks()
+
+
+@benchmark("predict_failure/single")
+def predict_failure_single():
+    from agents.diagnosis import DiagnosisAgent
+    agent = DiagnosisAgent()
+    vehicle, reading, _ = _demo_inputs()
+    return lambda: agent.predict_failure(vehicle, reading)
+
+
+def _register_prediction_batches():
+    for batch in PREDICTION_BATCHES:
+        def predict_batch(batch=batch):
+            from agents.diagnosis import DiagnosisAgent
+            from data.vehicles import generate_sensor_reading
+            agent = DiagnosisAgent()
+            vehicles = synthetic_fleet(batch).vehicles
+            readings = [generate_sensor_reading(v["id"]) for v in vehicles]
+            return lambda: agent.predict_failure_batch(vehicles, readings)
+
+        benchmark(f"predict_failure/batch_{batch}")(predict_batch)
+
+
+_register_prediction_batches()
+
+
+@benchmark("orchestrate_vehicle_check")
+def orchestrate_vehicle_check():
+    from agents.master_agent import MasterAgent
+    master = MasterAgent()
+    vehicle, reading, history = _demo_inputs()
+    return lambda: master.orchestrate_vehicle_check(vehicle, reading, history)
+
+
+def _register_ueba_benchmarks():
+    for size in UEBA_HISTORY_SIZES:
+        def record_action(size=size):
+            from security.ueba import UEBAMonitor
+            monitor = UEBAMonitor()
+            for i in range(size):
+                monitor.record_action("diagnosis_agent", "predict_failure", ["vehicles"], {"i": i})
+            return lambda: monitor.record_action("diagnosis_agent", "predict_failure", ["vehicles"])
+
+        benchmark(f"ueba_record_action/history_{size}")(record_action)
+
+
+_register_ueba_benchmarks()
+
+
+def _monitor_with_anomalies(count: int):
+    from security.ueba import UEBAMonitor
+    monitor = UEBAMonitor()
+    while len(monitor.anomaly_log) < count:
+        monitor.record_action("feedback_agent", "modify_vehicle_data", ["telematics"])
+    return monitor
+
+
+@benchmark("ueba_security_dashboard/anomalies_10k")
+def security_dashboard():
+    monitor = _monitor_with_anomalies(10_000)
+    return monitor.get_security_dashboard
+
+
+@benchmark("ueba_query_anomalies/anomalies_10k")
+def query_anomalies():
+    monitor = _monitor_with_anomalies(10_000)
+    cursor = monitor.query_anomalies(severity="critical", limit=50)["next_cursor"]
+    return lambda: monitor.query_anomalies(severity="critical", agent_id="feedback_agent", limit=50, cursor=cursor)
+
+
+@benchmark("get_recommended_center")
+def recommended_center():
+    from data.service_centers import get_recommended_center
+    return lambda: get_recommended_center("Mumbai", "regular")
+
+
+@benchmark("get_recommended_center/centers_5k")
+def recommended_center_5k():
+    from data.geo import CenterIndex
+    from data.service_centers import get_recommended_center
+    from data.slot_inventory import SlotInventory
+    from benchmarks.synthetic import synthetic_centers
+    centers = synthetic_centers(5000)
+    index, inventory = CenterIndex(centers), SlotInventory(centers, horizon_days=2)
+    return lambda: get_recommended_center("Pune", "ev", index=index, inventory=inventory)
+
+
+@benchmark("find_top_slots/centers_50_days_30")
+def top_slots_50_centers():
+    from data.geo import CenterIndex
+    from data.slot_inventory import SlotInventory
+    from data.slot_search import SlotSearch
+    from benchmarks.synthetic import synthetic_centers
+    centers = synthetic_centers(5000)
+    search = SlotSearch(CenterIndex(centers), SlotInventory(centers, horizon_days=31), centers=50)
+    return lambda: search.search((18.5204, 73.8567), "regular", days_ahead=30, priority="P4", preferred_time="afternoon")
+
+
+def _plan_requests(n: int):
+    import random
+    from data.geo import vehicle_location
+    from benchmarks.synthetic import synthetic_vehicles
+    rng = random.Random(0)
+    return [{"vehicle_id": v["id"], "priority": rng.choice(["P1", "P2", "P2", "P3", "P4"]), "location": vehicle_location(v)}
+            for v in synthetic_vehicles(n)]
+
+
+@benchmark("plan_service_batch/vehicles_1k")
+def plan_service_batch_1k():
+    from data.batch_scheduler import BatchScheduler
+    from data.geo import CenterIndex
+    from data.service_centers import SERVICE_CENTERS
+    from data.slot_inventory import SlotInventory
+    requests = _plan_requests(1000)
+    scheduler = BatchScheduler(CenterIndex(SERVICE_CENTERS), SlotInventory(SERVICE_CENTERS))
+    return lambda: scheduler.plan(requests)
+
+
+@benchmark("plan_service_batch/vehicles_5k_centers_500")
+def plan_service_batch_5k():
+    from data.batch_scheduler import BatchScheduler
+    from data.geo import CenterIndex
+    from data.slot_inventory import SlotInventory
+    from benchmarks.synthetic import synthetic_centers
+    requests, centers = _plan_requests(5000), synthetic_centers(500)
+    scheduler = BatchScheduler(CenterIndex(centers), SlotInventory(centers))
+    return lambda: scheduler.plan(requests)
+
+
+@benchmark("get_available_slots/14_days")
+def available_slots():
+    from data.service_centers import get_available_slots
+    return lambda: get_available_slots("SC001", days_ahead=14)
+
+
+@benchmark("get_component_defect_pattern")
+def component_defect_pattern():
+    from data.rca_capa import get_component_defect_pattern
+    return lambda: get_component_defect_pattern("Brakes")
+
+
+@benchmark("customer_engagement/process_response")
+def process_response():
+    from agents.customer_engagement import CustomerEngagementAgent
+    from agents.diagnosis import DiagnosisAgent
+    agent = CustomerEngagementAgent()
+    vehicle, reading, _ = _demo_inputs()
+    diagnosis = DiagnosisAgent().predict_failure(vehicle, reading)
+    conversation_id = agent.initiate_conversation(vehicle, diagnosis, vehicle["owner"])["conversation_id"]
+    return lambda: agent.process_response(conversation_id, "What is wrong with my car?")
+
+
+def select(patterns: List[str]) -> List[str]:
+    """Benchmark names containing any of the patterns (all when none given)"""
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(p in name for p in patterns)]
@@ -0,0 +1,47 @@
+"""
+Synthetic Fleet - Deterministic fleets and service-center networks of any size modelled on the demo data
+"""
+import random
+from data.fleet_store import FleetStore
+from data.vehicles import VEHICLES
+
+
+def synthetic_vehicles(n: int, seed: int = 0):
+    """n vehicles cycling through the demo makes, models and cities with unique ids and VINs"""
+    rng = random.Random(seed)
+    vehicles = []
+    for i in range(n):
+        template = VEHICLES[i % len(VEHICLES)]
+        vehicles.append({
+            **template,
+            "id": f"SV{i:07d}",
+            "vin": f"SYN{i:014d}",
+            "year": rng.randint(2018, 2024),
+            "odometer": rng.randint(1000, 120000)
+        })
+    return vehicles
+
+
+def synthetic_fleet(n: int, seed: int = 0) -> FleetStore:
+    """FleetStore holding n synthetic vehicles"""
+    return FleetStore(synthetic_vehicles(n, seed), initial_capacity=n)
+
+
+def synthetic_centers(n: int, seed: int = 0):
+    """n service centers scattered across India with demo-like capacity, hours and services"""
+    rng = random.Random(seed)
+    centers = []
+    for i in range(n):
+        bays = rng.randint(4, 12)
+        centers.append({
+            "id": f"SYC{i:05d}",
+            "name": f"Synthetic Center {i}",
+            "city": "Synthetic",
+            "address": "",
+            "location": {"lat": rng.uniform(8.5, 32.0), "lon": rng.uniform(69.0, 91.0)},
+            "capacity": {"bays": bays, "daily_capacity": bays * 3},
+            "operating_hours": {"open": "08:00", "close": "20:00"},
+            "services": ["regular"] + rng.sample(["major", "ev", "hybrid", "body", "offroad"], 2),
+            "rating": round(rng.uniform(3.5, 5.0), 1)
+        })
+    return centers
@@ -0,0 +1,150 @@
+"""
+Batch Scheduler - Fleet-wide assignment of vehicles to service slots by priority and cost
+"""
+import heapq
+import os
+from typing import Dict, List, Tuple
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from data.geo import CenterIndex
+from data.slot_inventory import SlotInventory
+
+# Nearest centers considered for each vehicle
+PLAN_CANDIDATE_CENTERS = int(os.environ.get("PLAN_CANDIDATE_CENTERS", "5"))
+# Vehicles of one priority solved together; the assignment costs O(n^2) per vehicle
+PLAN_BATCH_SIZE = int(os.environ.get("PLAN_BATCH_SIZE", "256"))
+PRIORITY_RANK = {"P1": 0, "P2": 1, "P3": 2, "P4": 3}
+DEFAULT_MAX_DELAY_DAYS = {"P1": 1, "P2": 3, "P3": 7, "P4": 30}
+# Cost of a day's wait, a km of travel and a slot later in the day; a day outweighs any slot
+DAY_COST = 50.0
+KM_COST = 1.0
+SLOT_COST = 1.0
+INFEASIBLE = 1e9
+
+
+class BatchScheduler:
+    """Plans slots for many vehicles at once against a snapshot of the slot inventory.
+
+    Vehicles come off a heap by priority, then tightest deadline, in batches
+    of one priority. Each batch is a single min-cost assignment of vehicles to
+    open bookable units at their nearest centers within their deadline,
+    costed by wait, travel and time of day. A batch takes its capacity from
+    the snapshot before the next is solved, so urgent vehicles get first pick
+    and no slot or day is oversold. Nothing is booked here.
+    """
+
+    def __init__(self, index: CenterIndex, inventory: SlotInventory,
+                 candidate_centers: int = PLAN_CANDIDATE_CENTERS, batch_size: int = PLAN_BATCH_SIZE):
+        self.index = index
+        self.inventory = inventory
+        self.candidate_centers = candidate_centers
+        self.batch_size = batch_size
+
+    def plan(self, requests: List[Dict]) -> Dict:
+        """Assign each {"vehicle_id", "priority", "max_delay_days", "location", "service_type"} a center and slot"""
+        slots, days = self.inventory.snapshot()
+        heap = []
+        for seq, request in enumerate(requests):
+            priority = request.get("priority") or "P4"
+            max_delay = request.get("max_delay_days") or DEFAULT_MAX_DELAY_DAYS.get(priority, 7)
+            heap.append((PRIORITY_RANK.get(priority, len(PRIORITY_RANK)), max_delay, seq))
+        heapq.heapify(heap)
+
+        plan, unassignable = [], []
+        while heap:
+            rank = heap[0][0]
+            batch = []
+            while heap and heap[0][0] == rank and len(batch) < self.batch_size:
+                batch.append(heapq.heappop(heap))
+            self._solve([requests[seq] for _, _, seq in batch], [delay for _, delay, _ in batch],
+                        slots, days, plan, unassignable)
+        return {"plan": plan, "unassignable": unassignable,
+                "summary": {"requested": len(requests), "planned": len(plan), "unassignable": len(unassignable)}}
+
+    def _open_units(self, slots: np.ndarray, days: np.ndarray, row: int, last_day: int,
+                    limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The first `limit` bookable units at a center from tomorrow to last_day, as (day, slot) arrays.
+
+        Units are ordered by day then slot, and a day yields no more units
+        than its remaining daily capacity.
+        """
+        available = slots[row, 1:last_day + 1]
+        # Fill each day slot by slot until its daily capacity runs out
+        filled = np.minimum(np.cumsum(available, axis=1), days[row, 1:last_day + 1, None])
+        units = np.diff(filled, axis=1, prepend=0)
+        day, slot = np.nonzero(units)
+        counts = units[day, slot]
+        return np.repeat(day + 1, counts)[:limit], np.repeat(slot, counts)[:limit]
+
+    def _solve(self, requests: List[Dict], max_delays: List[int], slots: np.ndarray, days: np.ndarray,
+               plan: List[Dict], unassignable: List[Dict]):
+        last_days, candidates = [], []
+        for request, max_delay in zip(requests, max_delays):
+            last_days.append(max(1, min(max_delay, self.inventory.horizon_days - 1)))
+            location = request.get("location")
+            if location is None:
+                candidates.append((np.empty(0, dtype=np.int64), np.empty(0)))
+            else:
+                candidates.append(self.index.nearest(location, self.candidate_centers,
+                                                     request.get("service_type") or "regular"))
+
+        # Every vehicle considering a center prefers its units in the same (day, slot) order, so the
+        # batch never needs more of a center's units than there are vehicles considering it
+        wanted: Dict[int, List[int]] = {}
+        for last_day, (rows, _) in zip(last_days, candidates):
+            for row in rows.tolist():
+                entry = wanted.setdefault(row, [0, 0])
+                entry[0] += 1
+                entry[1] = max(entry[1], last_day)
+        column_rows, column_days, column_slots, spans = [], [], [], {}
+        start = 0
+        for row, (count, last_day) in wanted.items():
+            unit_days, unit_slots = self._open_units(slots, days, row, last_day, count)
+            spans[row] = (start, start + len(unit_days))
+            start += len(unit_days)
+            column_rows.append(np.full(len(unit_days), row))
+            column_days.append(unit_days)
+            column_slots.append(unit_slots)
+        if start == 0:
+            column_rows = column_days = column_slots = [np.empty(0, dtype=np.int64)]
+        column_rows, column_days, column_slots = (np.concatenate(column_rows), np.concatenate(column_days),
+                                                  np.concatenate(column_slots))
+        base_cost = column_days * DAY_COST + column_slots * SLOT_COST
+
+        cost = np.full((len(requests), start), INFEASIBLE)
+        for i, (last_day, (rows, distances)) in enumerate(zip(last_days, candidates)):
+            for row, distance in zip(rows.tolist(), distances.tolist()):
+                first, end = spans[row]
+                # Units are in day order, so those within the deadline are a prefix
+                end = first + int(np.searchsorted(column_days[first:end], last_day, side="right"))
+                cost[i, first:end] = base_cost[first:end] + distance * KM_COST
+
+        assigned = {}
+        if start:
+            for i, j in zip(*linear_sum_assignment(cost)):
+                if cost[i, j] < INFEASIBLE:
+                    assigned[i] = j
+
+        for i, request in enumerate(requests):
+            entry = {"vehicle_id": request.get("vehicle_id"), "priority": request.get("priority") or "P4"}
+            j = assigned.get(i)
+            if j is None:
+                reason = ("Location unknown" if request.get("location") is None
+                          else f"No open slot within {last_days[i]} day(s) at the nearest centers")
+                unassignable.append({**entry, "reason": reason})
+                continue
+            row, day, slot = int(column_rows[j]), int(column_days[j]), int(column_slots[j])
+            slots[row, day, slot] -= 1
+            days[row, day] -= 1
+            center = self.index.centers[row]
+            rows, distances = candidates[i]
+            plan.append({
+                **entry,
+                "center_id": center["id"],
+                "center_name": center["name"],
+                "date": self.inventory.dates[day],
+                "day": self.inventory.weekdays[day],
+                "time": self.inventory.slot_times[row][slot],
+                "distance_km": round(float(distances[rows == row][0]), 1),
+                "wait_days": day
+            })
@@ -0,0 +1,99 @@
+"""
+Booking Service - Thread-safe, idempotent appointment booking on top of the slot inventory
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from monitoring.metrics import CACHE_HITS, CACHE_MISSES
+from data.slot_inventory import SlotInventory
+
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("BOOKING_IDEMPOTENCY_CACHE", "10000"))
+
+
+class BookingService:
+    """Books appointments against a SlotInventory.
+
+    Capacity is taken by the inventory's per-center lock stripes, so
+    concurrent bookings can never oversell a slot. Ids come from a monotonic
+    counter. A booking made with an idempotency key is remembered in a bounded
+    LRU: a retry with the same key gets the original result and books nothing.
+    Concurrent requests sharing a key wait for the first one to finish.
+    """
+
+    def __init__(self, inventory: SlotInventory, get_center: Callable[[str], Optional[Dict]],
+                 appointments: List[Dict] = None, first_id: int = 1001,
+                 idempotency_cache_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.inventory = inventory
+        self.get_center = get_center
+        self.appointments = appointments if appointments is not None else []
+        self._ids = itertools.count(first_id)
+        self.idempotency_cache_size = idempotency_cache_size
+        self._results: "OrderedDict[str, Tuple[Tuple, Future]]" = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._cache_hits = CACHE_HITS.labels("booking_idempotency")
+        self._cache_misses = CACHE_MISSES.labels("booking_idempotency")
+
+    def book(self, vehicle_id: str, center_id: str, date: str, time: str, service_type: str,
+             notes: str = "", idempotency_key: str = None) -> Dict:
+        """Book an appointment; {"success": False, "error": ...} when it cannot be booked"""
+        if idempotency_key is None:
+            return self._book(vehicle_id, center_id, date, time, service_type, notes)
+
+        request = (vehicle_id, center_id, date, time, service_type)
+        with self._results_lock:
+            entry = self._results.get(idempotency_key)
+            if entry is None:
+                future = Future()
+                self._results[idempotency_key] = (request, future)
+                if len(self._results) > self.idempotency_cache_size:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(idempotency_key)
+        if entry is not None:
+            self._cache_hits.inc()
+            original_request, original = entry
+            if original_request != request:
+                return {"success": False, "error": "Idempotency key was already used for a different booking"}
+            return {**original.result(), "replayed": True}
+
+        self._cache_misses.inc()
+        try:
+            result = self._book(vehicle_id, center_id, date, time, service_type, notes)
+        except BaseException as e:
+            future.set_exception(e)
+            with self._results_lock:
+                self._results.pop(idempotency_key, None)
+            raise
+        future.set_result(result)
+        return result
+
+    def _book(self, vehicle_id: str, center_id: str, date: str, time: str, service_type: str, notes: str) -> Dict:
+        center = self.get_center(center_id)
+        if not center:
+            return {"success": False, "error": "Service center not found"}
+
+        try:
+            slot_time = self.inventory.book(center_id, date, time)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        if slot_time is None:
+            return {"success": False, "error": f"No capacity left at {center['name']} on {date} at {time}"}
+
+        appointment = {
+            "id": f"APT{next(self._ids)}",
+            "vehicle_id": vehicle_id,
+            "center_id": center_id,
+            "center_name": center["name"],
+            "date": date,
+            "time": slot_time,
+            "service_type": service_type,
+            "notes": notes,
+            "status": "confirmed",
+            "created_at": datetime.now().isoformat()
+        }
+        self.appointments.append(appointment)
+        return {"success": True, "appointment": appointment}
@@ -0,0 +1,153 @@
+"""
+Fleet Store - Columnar, NumPy-backed vehicle store with hash indexes on id and VIN
+"""
+from typing import Dict, List, Iterable, Optional
+import numpy as np
+
+
+class FleetStore:
+    """Row dicts for the agents plus columnar arrays for fleet-wide analytics"""
+
+    def __init__(self, vehicles: Iterable[Dict] = (), initial_capacity: int = 16):
+        self.vehicles: List[Dict] = []
+        self._id_index: Dict[str, int] = {}
+        self._vin_index: Dict[str, int] = {}
+        self.cities: List[str] = []
+        self.makes: List[str] = []
+        self._city_codes: Dict[str, int] = {}
+        self._make_codes: Dict[str, int] = {}
+
+        self._capacity = max(1, initial_capacity)
+        self._odometer = np.zeros(self._capacity, dtype=np.int64)
+        self._year = np.zeros(self._capacity, dtype=np.int16)
+        self._city = np.zeros(self._capacity, dtype=np.int32)
+        self._make = np.zeros(self._capacity, dtype=np.int32)
+
+        self.extend(vehicles)
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def __contains__(self, vehicle_id: str) -> bool:
+        return vehicle_id in self._id_index
+
+    def _grow(self, needed: int):
+        """Grow columnar arrays geometrically so appends stay amortized O(1)"""
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_odometer", "_year", "_city", "_make"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._capacity] = old
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    @staticmethod
+    def _encode(value: str, codes: Dict[str, int], table: List[str]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = len(table)
+            codes[value] = code
+            table.append(value)
+        return code
+
+    def add(self, vehicle: Dict) -> int:
+        """Add a vehicle and return its row index"""
+        vehicle_id = vehicle["id"]
+        if vehicle_id in self._id_index:
+            raise ValueError(f"Duplicate vehicle id: {vehicle_id}")
+
+        row = len(self.vehicles)
+        self._grow(row + 1)
+        self.vehicles.append(vehicle)
+        self._id_index[vehicle_id] = row
+        if vehicle.get("vin"):
+            self._vin_index[vehicle["vin"]] = row
+
+        self._odometer[row] = vehicle.get("odometer", 0)
+        self._year[row] = vehicle.get("year", 0)
+        self._city[row] = self._encode(vehicle.get("city", ""), self._city_codes, self.cities)
+        self._make[row] = self._encode(vehicle.get("make", ""), self._make_codes, self.makes)
+        return row
+
+    def extend(self, vehicles: Iterable[Dict]):
+        """Add many vehicles"""
+        for vehicle in vehicles:
+            self.add(vehicle)
+
+    # Row lookups (dict-returning API used by routes and agents)
+    def get(self, vehicle_id: str) -> Optional[Dict]:
+        """Get vehicle by ID"""
+        row = self._id_index.get(vehicle_id)
+        return self.vehicles[row] if row is not None else None
+
+    def get_by_vin(self, vin: str) -> Optional[Dict]:
+        """Get vehicle by VIN"""
+        row = self._vin_index.get(vin)
+        return self.vehicles[row] if row is not None else None
+
+    def row_of(self, vehicle_id: str) -> Optional[int]:
+        """Get the row index of a vehicle"""
+        return self._id_index.get(vehicle_id)
+
+    def rows_of(self, vehicle_ids: Iterable[str]) -> np.ndarray:
+        """Get row indexes for many vehicles, skipping unknown ids"""
+        index = self._id_index
+        return np.fromiter((index[v] for v in vehicle_ids if v in index), dtype=np.int64)
+
+    def set_odometer(self, vehicle_id: str, odometer: int) -> bool:
+        """Update odometer in both the row dict and the column"""
+        row = self._id_index.get(vehicle_id)
+        if row is None:
+            return False
+        self.vehicles[row]["odometer"] = odometer
+        self._odometer[row] = odometer
+        return True
+
+    # Bulk accessors (read-only views over the live rows)
+    def ids(self) -> List[str]:
+        return [v["id"] for v in self.vehicles]
+
+    def odometers(self) -> np.ndarray:
+        return self._view(self._odometer)
+
+    def years(self) -> np.ndarray:
+        return self._view(self._year)
+
+    def city_codes(self) -> np.ndarray:
+        return self._view(self._city)
+
+    def make_codes(self) -> np.ndarray:
+        return self._view(self._make)
+
+    def _view(self, column: np.ndarray) -> np.ndarray:
+        view = column[:len(self.vehicles)]
+        view.flags.writeable = False
+        return view
+
+    def city_mask(self, city: str) -> np.ndarray:
+        """Boolean mask of vehicles registered in a city"""
+        code = self._city_codes.get(city)
+        if code is None:
+            return np.zeros(len(self.vehicles), dtype=bool)
+        return self.city_codes() == code
+
+    def make_mask(self, make: str) -> np.ndarray:
+        """Boolean mask of vehicles of a make"""
+        code = self._make_codes.get(make)
+        if code is None:
+            return np.zeros(len(self.vehicles), dtype=bool)
+        return self.make_codes() == code
+
+    def city_counts(self) -> Dict[str, int]:
+        """Vehicle count per city"""
+        counts = np.bincount(self.city_codes(), minlength=len(self.cities))
+        return {city: int(n) for city, n in zip(self.cities, counts)}
+
+    def make_counts(self) -> Dict[str, int]:
+        """Vehicle count per make"""
+        counts = np.bincount(self.make_codes(), minlength=len(self.makes))
+        return {make: int(n) for make, n in zip(self.makes, counts)}
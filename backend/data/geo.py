@@ -0,0 +1,107 @@
+"""
+Geo - City coordinates and a great-circle nearest-center index
+"""
+import math
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+# Below this many centers a brute-force scan beats a tree query
+BRUTE_FORCE_MAX = 64
+
+# City centre coordinates (lat, lon) used when a vehicle has no location of its own
+CITY_COORDINATES = {
+    "mumbai": (19.0760, 72.8777),
+    "delhi": (28.6139, 77.2090),
+    "bangalore": (12.9716, 77.5946),
+    "hyderabad": (17.3850, 78.4867),
+    "chennai": (13.0827, 80.2707),
+    "pune": (18.5204, 73.8567),
+    "kochi": (9.9312, 76.2673),
+    "ahmedabad": (23.0225, 72.5714),
+    "jaipur": (26.9124, 75.7873),
+    "kolkata": (22.5726, 88.3639),
+}
+
+
+def city_location(city: str) -> Optional[Tuple[float, float]]:
+    return CITY_COORDINATES.get((city or "").lower())
+
+
+def vehicle_location(vehicle: Dict) -> Optional[Tuple[float, float]]:
+    """A vehicle's own coordinates, else its city's"""
+    location = vehicle.get("location")
+    if location:
+        return location["lat"], location["lon"]
+    return city_location(vehicle.get("city"))
+
+
+def unit_vectors(latlon: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere; straight-line (chord) distance between them orders like great-circle distance"""
+    lat, lon = np.radians(latlon[:, 0]), np.radians(latlon[:, 1])
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+class CenterIndex:
+    """KD-trees over service-center positions on the unit sphere, one per offered service, built once.
+
+    Row numbers follow the order of `centers`, so they line up with a
+    SlotInventory built from the same list.
+    """
+
+    def __init__(self, centers: Iterable[Dict]):
+        self.centers = list(centers)
+        self._rows = {center["id"]: row for row, center in enumerate(self.centers)}
+        points = unit_vectors(np.array([[c["location"]["lat"], c["location"]["lon"]] for c in self.centers],
+                                       dtype=np.float64).reshape(-1, 2))
+        self.ratings = np.array([c["rating"] for c in self.centers], dtype=np.float64)
+
+        services = {service for c in self.centers for service in c["services"]}
+        # service (None = any) -> (tree or None for a brute-force scan, rows, points)
+        self._trees: Dict[Optional[str], Tuple[Optional[cKDTree], np.ndarray, np.ndarray]] = {}
+        for service in [None, *sorted(services)]:
+            rows = np.array([row for row, c in enumerate(self.centers) if service is None or service in c["services"]],
+                            dtype=np.int64)
+            if len(rows):
+                tree = cKDTree(points[rows]) if len(rows) > BRUTE_FORCE_MAX else None
+                self._trees[service] = (tree, rows, points[rows])
+
+    def __len__(self) -> int:
+        return len(self.centers)
+
+    def get(self, center_id: str) -> Optional[Dict]:
+        row = self._rows.get(center_id)
+        return self.centers[row] if row is not None else None
+
+    def row(self, center_id: str) -> Optional[int]:
+        return self._rows.get(center_id)
+
+    def offering(self, service_type: str = None) -> np.ndarray:
+        """Rows of every center offering service_type"""
+        entry = self._trees.get(service_type)
+        return entry[1] if entry is not None else np.empty(0, dtype=np.int64)
+
+    def nearest(self, location: Tuple[float, float], k: int = 5,
+                service_type: str = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and distances (km) of the k nearest centers offering service_type, nearest first"""
+        entry = self._trees.get(service_type)
+        if entry is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        tree, rows, points = entry
+        k = min(k, len(rows))
+        lat, lon = math.radians(location[0]), math.radians(location[1])
+        target = (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+        if tree is None:
+            # The dot product of unit vectors is the cosine of their great-circle angle, so the largest are the
+            # nearest; on a handful of points each NumPy call costs more than its arithmetic, so keep them few
+            dots = points @ target
+            indices = np.argsort(dots)[::-1][:k]
+            return rows[indices], EARTH_RADIUS_KM * np.arccos(np.minimum(dots[indices], 1.0))
+        chords, indices = tree.query(target, k=k)
+        chords, indices = np.atleast_1d(chords), np.atleast_1d(indices)
+        return rows[indices], chord_to_km(chords)
@@ -1,8 +1,16 @@
 """
 Service Centers - Locations, capacity, and scheduling availability
 """
-from datetime import datetime, timedelta
-import random
+import os
+from datetime import datetime
+from typing import Dict, Tuple
+import numpy as np
+from monitoring.metrics import timed
+from data.geo import CenterIndex, city_location
+from data.slot_inventory import SlotInventory
+from data.booking_service import BookingService
+from data.batch_scheduler import BatchScheduler
+from data.slot_search import SlotSearch
 
 # Service Centers across India
 SERVICE_CENTERS = [
@@ -11,6 +19,7 @@ SERVICE_CENTERS = [
         "name": "AutoCare Mumbai Central",
         "city": "Mumbai",
         "address": "123 Andheri West, Mumbai 400058",
+        "location": {"lat": 19.1364, "lon": 72.8296},
         "phone": "+91-22-12345678",
         "capacity": {"bays": 8, "daily_capacity": 24},
         "operating_hours": {"open": "08:00", "close": "20:00"},
@@ -22,6 +31,7 @@ SERVICE_CENTERS = [
         "name": "Mahindra Service Hub Delhi",
         "city": "Delhi",
         "address": "456 Connaught Place, New Delhi 110001",
+        "location": {"lat": 28.6315, "lon": 77.2167},
         "phone": "+91-11-23456789",
         "capacity": {"bays": 10, "daily_capacity": 30},
         "operating_hours": {"open": "08:00", "close": "21:00"},
@@ -33,6 +43,7 @@ SERVICE_CENTERS = [
         "name": "Maruti Arena Bangalore",
         "city": "Bangalore",
         "address": "789 MG Road, Bangalore 560001",
+        "location": {"lat": 12.9756, "lon": 77.605},
         "phone": "+91-80-34567890",
         "capacity": {"bays": 12, "daily_capacity": 36},
         "operating_hours": {"open": "07:30", "close": "20:30"},
@@ -44,6 +55,7 @@ SERVICE_CENTERS = [
         "name": "Hyundai Prime Hyderabad",
         "city": "Hyderabad",
         "address": "321 Banjara Hills, Hyderabad 500034",
+        "location": {"lat": 17.4156, "lon": 78.4347},
         "phone": "+91-40-45678901",
         "capacity": {"bays": 8, "daily_capacity": 24},
         "operating_hours": {"open": "08:00", "close": "20:00"},
@@ -55,6 +67,7 @@ SERVICE_CENTERS = [
         "name": "Kia Service Chennai",
         "city": "Chennai",
         "address": "654 Anna Nagar, Chennai 600040",
+        "location": {"lat": 13.085, "lon": 80.2101},
         "phone": "+91-44-56789012",
         "capacity": {"bays": 6, "daily_capacity": 18},
         "operating_hours": {"open": "08:30", "close": "19:30"},
@@ -66,6 +79,7 @@ SERVICE_CENTERS = [
         "name": "Toyota Platinum Kochi",
         "city": "Kochi",
         "address": "987 MG Road, Kochi 682011",
+        "location": {"lat": 9.9667, "lon": 76.2833},
         "phone": "+91-484-67890123",
         "capacity": {"bays": 6, "daily_capacity": 18},
         "operating_hours": {"open": "09:00", "close": "19:00"},
@@ -77,6 +91,7 @@ SERVICE_CENTERS = [
         "name": "Honda Express Ahmedabad",
         "city": "Ahmedabad",
         "address": "147 CG Road, Ahmedabad 380006",
+        "location": {"lat": 23.03, "lon": 72.56},
         "phone": "+91-79-78901234",
         "capacity": {"bays": 8, "daily_capacity": 24},
         "operating_hours": {"open": "08:00", "close": "20:00"},
@@ -88,6 +103,7 @@ SERVICE_CENTERS = [
         "name": "Skoda Volkswagen Kolkata",
         "city": "Kolkata",
         "address": "258 Park Street, Kolkata 700016",
+        "location": {"lat": 22.553, "lon": 88.352},
         "phone": "+91-33-89012345",
         "capacity": {"bays": 6, "daily_capacity": 18},
         "operating_hours": {"open": "09:00", "close": "19:00"},
@@ -107,13 +123,18 @@ EXISTING_BOOKINGS = {
 # Confirmed appointments
 APPOINTMENTS = []
 
+# Nearest centers considered for a recommendation
+RECOMMEND_CANDIDATES = 5
+# Candidate sets kept for repeat recommendations at the same place
+RECOMMEND_CACHE_SIZE = int(os.environ.get("RECOMMEND_CACHE_SIZE", "4096"))
+
+# (index, inventory, location, service_type, k) -> (rows, fixed score, score per remaining unit of capacity)
+_recommend_candidates: Dict[Tuple, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
 
 def get_service_center(center_id: str) -> dict:
     """Get service center by ID"""
-    for center in SERVICE_CENTERS:
-        if center["id"] == center_id:
-            return center
-    return None
+    return center_index.get(center_id)
 
 
 def get_service_centers_by_city(city: str) -> list:
@@ -126,79 +147,53 @@ def get_all_service_centers() -> list:
     return SERVICE_CENTERS
 
 
+@timed
 def get_available_slots(center_id: str, date: str = None, days_ahead: int = 7) -> list:
     """Get available appointment slots for a service center"""
     center = get_service_center(center_id)
     if not center:
         return []
     
-    slots = []
-    start_date = datetime.now() + timedelta(days=1)  # Start from tomorrow
+    # Start from tomorrow
+    window = slot_inventory.window(center_id, 1, days_ahead)
+    # A slot is only as available as the day's remaining capacity
+    available = np.minimum(window["slots"], window["day_totals"][:, None])
     
-    for day_offset in range(days_ahead):
-        slot_date = start_date + timedelta(days=day_offset)
-        date_str = slot_date.strftime("%Y-%m-%d")
-        
+    slots = []
+    for i, date_str in enumerate(window["dates"]):
         if date and date_str != date:
             continue
         
-        # Get current bookings for this date
-        booked = EXISTING_BOOKINGS.get(center_id, {}).get(date_str, 0)
-        available = center["capacity"]["daily_capacity"] - booked
-        
-        if available > 0:
-            # Generate time slots
-            time_slots = []
-            open_hour = int(center["operating_hours"]["open"].split(":")[0])
-            close_hour = int(center["operating_hours"]["close"].split(":")[0])
-            
-            for hour in range(open_hour, close_hour - 1, 2):  # 2-hour slots
-                time_str = f"{hour:02d}:00"
-                time_slots.append({
-                    "time": time_str,
-                    "available": random.randint(1, 3)  # Random availability per slot
-                })
-            
+        total_available = int(window["day_totals"][i])
+        if total_available > 0:
             slots.append({
                 "date": date_str,
-                "day": slot_date.strftime("%A"),
-                "total_available": available,
-                "time_slots": time_slots
+                "day": window["weekdays"][i],
+                "total_available": total_available,
+                "time_slots": [{"time": time_str, "available": int(count)}
+                               for time_str, count in zip(window["times"], available[i]) if count > 0]
             })
     
     return slots
 
 
+@timed
 def book_appointment(vehicle_id: str, center_id: str, date: str, time: str, 
-                    service_type: str, notes: str = "") -> dict:
-    """Book a service appointment"""
-    center = get_service_center(center_id)
-    if not center:
-        return {"success": False, "error": "Service center not found"}
-    
-    appointment = {
-        "id": f"APT{len(APPOINTMENTS) + 1001}",
-        "vehicle_id": vehicle_id,
-        "center_id": center_id,
-        "center_name": center["name"],
-        "date": date,
-        "time": time,
-        "service_type": service_type,
-        "notes": notes,
-        "status": "confirmed",
-        "created_at": datetime.now().isoformat()
-    }
-    
-    APPOINTMENTS.append(appointment)
-    
-    # Update bookings count
-    if center_id not in EXISTING_BOOKINGS:
-        EXISTING_BOOKINGS[center_id] = {}
-    if date not in EXISTING_BOOKINGS[center_id]:
-        EXISTING_BOOKINGS[center_id][date] = 0
-    EXISTING_BOOKINGS[center_id][date] += 1
-    
-    return {"success": True, "appointment": appointment}
+                    service_type: str, notes: str = "", idempotency_key: str = None) -> dict:
+    """Book a service appointment; retries with the same idempotency key return the original result"""
+    return booking_service.book(vehicle_id, center_id, date, time, service_type, notes, idempotency_key)
+
+
+def find_top_slots(location: Tuple[float, float], service_type: str = "regular", days_ahead: int = 7,
+                   priority: str = "P3", preferred_time: str = "any", k: int = 5) -> list:
+    """Best open slots across the nearest centers offering the service, best first"""
+    return slot_search.search(location, service_type, days_ahead, priority, preferred_time, k)
+
+
+@timed
+def plan_service_batch(requests: list) -> dict:
+    """Plan slots for many vehicles at once, most urgent first, without booking them"""
+    return batch_scheduler.plan(requests)
 
 
 def get_vehicle_appointments(vehicle_id: str) -> list:
@@ -213,7 +208,7 @@ def get_center_load(center_id: str) -> dict:
         return {}
     
     today = datetime.now().strftime("%Y-%m-%d")
-    current_bookings = EXISTING_BOOKINGS.get(center_id, {}).get(today, 0)
+    current_bookings = slot_inventory.booked(center_id, today)
     
     return {
         "center_id": center_id,
@@ -225,29 +220,60 @@ def get_center_load(center_id: str) -> dict:
     }
 
 
-def get_recommended_center(city: str, service_type: str = "regular") -> dict:
-    """Get recommended service center based on city and availability"""
-    centers = get_service_centers_by_city(city)
-    if not centers:
-        # Return nearest center from any city
-        centers = SERVICE_CENTERS
-    
-    # Score centers based on rating and availability
-    best_center = None
-    best_score = 0
-    
-    for center in centers:
-        if service_type not in center["services"]:
-            continue
-        
-        load = get_center_load(center["id"])
-        availability_score = (100 - load.get("utilization", 100)) / 100
-        rating_score = center["rating"] / 5
-        
-        score = (availability_score * 0.6) + (rating_score * 0.4)
-        
-        if score > best_score:
-            best_score = score
-            best_center = center
+def _scored_candidates(index: CenterIndex, inventory: SlotInventory, location: Tuple[float, float],
+                       service_type: str, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Candidate rows with the parts of their score that do not change between calls"""
+    key = (index, inventory, location, service_type, k)
+    cached = _recommend_candidates.get(key)
+    if cached is not None:
+        return cached
+
+    if location is None:
+        # Unknown place: consider every center offering the service
+        rows = index.offering(service_type)
+        fixed, availability_weight = index.ratings[rows] / 5 * 0.4, 0.6
+    else:
+        rows, distances = index.nearest(location, k, service_type)
+        fixed, availability_weight = index.ratings[rows] / 5 * 0.3 + 1 / (1 + distances / 50) * 0.2, 0.5
+    cached = (rows, fixed, availability_weight / inventory.daily_capacity[rows])
+    if len(_recommend_candidates) >= RECOMMEND_CACHE_SIZE:
+        _recommend_candidates.clear()
+    _recommend_candidates[key] = cached
+    return cached
+
+
+@timed
+def get_recommended_center(city: str, service_type: str = "regular", location: Tuple[float, float] = None,
+                           k: int = RECOMMEND_CANDIDATES, index: CenterIndex = None,
+                           inventory: SlotInventory = None) -> dict:
+    """Get recommended service center among the k nearest offering the service, by availability, rating and distance"""
+    index = center_index if index is None else index
+    inventory = slot_inventory if inventory is None else inventory
+    location = location or city_location(city)
+    rows, fixed, per_unit = _scored_candidates(index, inventory, location and tuple(location), service_type, k)
+    if not len(rows):
+        return None
     
-    return best_center
+    # Score centers based on availability (share of today's capacity left), rating and proximity;
+    # only availability changes between calls
+    scores = fixed + inventory.remaining(rows) * per_unit
+    return index.centers[rows[int(np.argmax(scores))]]
+
+
+# Global slot inventory, the source of truth for remaining capacity
+slot_inventory = SlotInventory(SERVICE_CENTERS)
+for _center_id, _days in EXISTING_BOOKINGS.items():
+    for _date, _count in _days.items():
+        slot_inventory.reserve_day(_center_id, _date, _count)
+
+# Global nearest-center index, rows aligned with the slot inventory
+center_index = CenterIndex(SERVICE_CENTERS)
+
+# Global booking service
+booking_service = BookingService(slot_inventory, get_service_center, APPOINTMENTS)
+
+# Global fleet batch scheduler
+batch_scheduler = BatchScheduler(center_index, slot_inventory)
+
+# Global multi-center slot search
+slot_search = SlotSearch(center_index, slot_inventory)
@@ -0,0 +1,198 @@
+"""
+Slot Inventory - Preallocated per-center, per-day, per-slot booking capacity
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+SLOT_INVENTORY_DAYS = int(os.environ.get("SLOT_INVENTORY_DAYS", "60"))
+SLOT_HOURS = 2
+# Centers share this many locks, so bookings at different centers rarely contend
+SLOT_INVENTORY_LOCK_STRIPES = int(os.environ.get("SLOT_INVENTORY_LOCK_STRIPES", "16"))
+# Seconds between checks of whether the date has changed
+ROLL_CHECK_SECONDS = 1.0
+
+
+def center_slot_times(center: Dict) -> List[str]:
+    """Start times of a center's 2-hour slots within its operating hours"""
+    open_hour = int(center["operating_hours"]["open"].split(":")[0])
+    close_hour = int(center["operating_hours"]["close"].split(":")[0])
+    return [f"{hour:02d}:00" for hour in range(open_hour, close_hour - 1, SLOT_HOURS)]
+
+
+class SlotInventory:
+    """Remaining capacity per center x day x slot, from today over a rolling horizon.
+
+    A slot holds one vehicle per service bay, and a day is further capped at
+    the center's daily capacity. Booking is a bounds check and two decrements
+    under the center's lock stripe. Availability queries return views of the
+    arrays, so nothing is rebuilt per call. The horizon rolls forward when the
+    date changes, checked at most once every ROLL_CHECK_SECONDS.
+    """
+
+    def __init__(self, centers: Iterable[Dict], horizon_days: int = SLOT_INVENTORY_DAYS,
+                 today: Callable[[], date] = date.today, lock_stripes: int = SLOT_INVENTORY_LOCK_STRIPES):
+        centers = list(centers)
+        self.horizon_days = horizon_days
+        self._today = today
+        self.center_ids = [c["id"] for c in centers]
+        self._rows = {center_id: row for row, center_id in enumerate(self.center_ids)}
+        self.slot_times = [center_slot_times(c) for c in centers]
+        self._open_hours = [int(c["operating_hours"]["open"].split(":")[0]) for c in centers]
+        self.max_slots = max((len(times) for times in self.slot_times), default=0)
+
+        # Fresh capacity for one day of every center; slots past a center's closing time stay at zero
+        self._fresh_slots = np.zeros((len(centers), self.max_slots), dtype=np.int32)
+        for row, center in enumerate(centers):
+            self._fresh_slots[row, :len(self.slot_times[row])] = center["capacity"]["bays"]
+        self.daily_capacity = np.array([c["capacity"]["daily_capacity"] for c in centers], dtype=np.int32)
+
+        self.slot_remaining = np.repeat(self._fresh_slots[:, None, :], horizon_days, axis=1)
+        self.day_remaining = np.repeat(self.daily_capacity[:, None], horizon_days, axis=1)
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(max(1, min(lock_stripes, len(centers))))]
+        self._set_start(self._today())
+        self._next_roll_check = time.monotonic() + ROLL_CHECK_SECONDS
+
+    def _set_start(self, start: date):
+        self.start = start
+        days = [start + timedelta(days=i) for i in range(self.horizon_days)]
+        self.dates = [d.strftime("%Y-%m-%d") for d in days]
+        self.weekdays = [d.strftime("%A") for d in days]
+        self._day_index = {date_str: i for i, date_str in enumerate(self.dates)}
+
+    def _roll(self):
+        """Drop past days and open fresh ones at the end of the horizon"""
+        # Every read calls this, so the date itself is only looked up once per check interval
+        now = time.monotonic()
+        if now < self._next_roll_check:
+            return
+        self._next_roll_check = now + ROLL_CHECK_SECONDS
+        today = self._today()
+        shift = (today - self.start).days
+        if shift <= 0:
+            return
+        with self._lock, ExitStack() as stack:
+            # Shifting touches every center, so hold every stripe
+            for stripe in self._stripes:
+                stack.enter_context(stripe)
+            shift = (today - self.start).days
+            if shift <= 0:
+                return
+            shift = min(shift, self.horizon_days)
+            keep = self.horizon_days - shift
+            self.slot_remaining[:, :keep] = self.slot_remaining[:, shift:]
+            self.slot_remaining[:, keep:] = self._fresh_slots[:, None, :]
+            self.day_remaining[:, :keep] = self.day_remaining[:, shift:]
+            self.day_remaining[:, keep:] = self.daily_capacity[:, None]
+            self._set_start(today)
+
+    def _stripe(self, center_id: str) -> threading.Lock:
+        row = self._rows.get(center_id)
+        if row is None:
+            raise ValueError("Service center not found")
+        return self._stripes[row % len(self._stripes)]
+
+    def _locate(self, center_id: str, date_str: str, time_str: str = None) -> Tuple[int, int, Optional[int]]:
+        """Array indices for a booking; raises ValueError when it falls outside the inventory"""
+        row = self._rows.get(center_id)
+        if row is None:
+            raise ValueError("Service center not found")
+        day = self._day_index.get(date_str)
+        if day is None:
+            raise ValueError(f"Date {date_str} is outside the {self.horizon_days}-day booking horizon")
+        if time_str is None:
+            return row, day, None
+        try:
+            hour = int(time_str.split(":")[0])
+        except ValueError:
+            raise ValueError(f"Invalid time: {time_str}")
+        # Any time inside a slot books that slot
+        slot = (hour - self._open_hours[row]) // SLOT_HOURS
+        if hour < self._open_hours[row] or slot >= len(self.slot_times[row]):
+            raise ValueError(f"{time_str} is outside operating hours")
+        return row, day, slot
+
+    def book(self, center_id: str, date_str: str, time_str: str) -> Optional[str]:
+        """Take one unit of slot and day capacity; returns the slot start time, or None when full"""
+        self._roll()
+        with self._stripe(center_id):
+            row, day, slot = self._locate(center_id, date_str, time_str)
+            if self.slot_remaining[row, day, slot] <= 0 or self.day_remaining[row, day] <= 0:
+                return None
+            self.slot_remaining[row, day, slot] -= 1
+            self.day_remaining[row, day] -= 1
+        return self.slot_times[row][slot]
+
+    def release(self, center_id: str, date_str: str, time_str: str) -> bool:
+        """Return one unit of capacity taken by book()"""
+        self._roll()
+        try:
+            with self._stripe(center_id):
+                row, day, slot = self._locate(center_id, date_str, time_str)
+                if self.slot_remaining[row, day, slot] >= self._fresh_slots[row, slot]:
+                    return False
+                self.slot_remaining[row, day, slot] += 1
+                self.day_remaining[row, day] += 1
+        except ValueError:
+            return False
+        return True
+
+    def reserve_day(self, center_id: str, date_str: str, count: int):
+        """Take day capacity without a slot, for bookings known only by date"""
+        self._roll()
+        try:
+            with self._stripe(center_id):
+                row, day, _ = self._locate(center_id, date_str)
+                self.day_remaining[row, day] = max(0, self.day_remaining[row, day] - count)
+        except ValueError:
+            return
+
+    def booked(self, center_id: str, date_str: str) -> int:
+        """Bookings taken on a day"""
+        self._roll()
+        row, day, _ = self._locate(center_id, date_str)
+        return int(self.daily_capacity[row] - self.day_remaining[row, day])
+
+    def remaining(self, rows: np.ndarray, day: int = 0) -> np.ndarray:
+        """Remaining daily capacity for centers by row, `day` days from today"""
+        self._roll()
+        return self.day_remaining[rows, day]
+
+    def availability(self, rows: np.ndarray, day: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Bookable units per slot and remaining day capacity for centers by row, `day` days from today"""
+        self._roll()
+        day_remaining = self.day_remaining[rows, day]
+        # A slot is only as available as the day's remaining capacity
+        return np.minimum(self.slot_remaining[rows, day], day_remaining[:, None]), day_remaining
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of remaining slot and day capacity, for planning without booking"""
+        self._roll()
+        with self._lock:
+            return self.slot_remaining.copy(), self.day_remaining.copy()
+
+    def window(self, center_id: str, first_day: int, days: int) -> Dict:
+        """Read-only views of a center's availability for days [first_day, first_day + days) from today"""
+        self._roll()
+        row = self._rows.get(center_id)
+        if row is None:
+            raise ValueError("Service center not found")
+        first_day = max(0, first_day)
+        last_day = min(self.horizon_days, first_day + days)
+        slot_count = len(self.slot_times[row])
+        slots = self.slot_remaining[row, first_day:last_day, :slot_count]
+        day_totals = self.day_remaining[row, first_day:last_day]
+        slots.flags.writeable = False
+        day_totals.flags.writeable = False
+        return {
+            "dates": self.dates[first_day:last_day],
+            "weekdays": self.weekdays[first_day:last_day],
+            "times": self.slot_times[row],
+            "slots": slots,
+            "day_totals": day_totals
+        }
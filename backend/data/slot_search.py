@@ -0,0 +1,110 @@
+"""
+Slot Search - Lazy top-k appointment slot search across nearby centers and days
+"""
+import heapq
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from data.geo import CenterIndex
+from data.slot_inventory import SlotInventory
+
+# Nearest centers searched for each vehicle
+SLOT_SEARCH_CENTERS = int(os.environ.get("SLOT_SEARCH_CENTERS", "10"))
+SLOT_SEARCH_TOP_K = 5
+BASE_SCORE = 100.0
+PREFERENCE_BONUS = 15.0
+# Penalties per km travelled and for a fully booked day
+KM_PENALTY = 0.1
+LOAD_PENALTY = 10.0
+# Penalty per day of waiting; urgent vehicles lose more for each day
+DAY_PENALTY = {"P1": 10.0, "P2": 5.0, "P3": 2.0, "P4": 0.5}
+PREFERRED_HOURS = {"morning": (0, 12), "afternoon": (12, 24)}
+
+
+class SlotSearch:
+    """Top-k slots over several centers and days, scored by preference, distance, load and deadline.
+
+    Days are scored lazily, one vectorized pass over every candidate center
+    per day, and the best k slots are kept in a bounded min-heap. Scores only
+    fall as days pass, so the search stops once no later day can beat the
+    heap's worst slot.
+    """
+
+    def __init__(self, index: CenterIndex, inventory: SlotInventory, centers: int = SLOT_SEARCH_CENTERS):
+        self.index = index
+        self.inventory = inventory
+        self.centers = centers
+        # Start hour of every center's slots; columns past closing time never have capacity
+        self._hours = np.zeros((len(inventory.slot_times), inventory.max_slots))
+        for row, times in enumerate(inventory.slot_times):
+            self._hours[row, :len(times)] = [int(t.split(":")[0]) for t in times]
+
+    def _candidates(self, location: Optional[Tuple[float, float]], service_type: str) -> Tuple[np.ndarray, np.ndarray]:
+        if location is None:
+            rows = self.index.offering(service_type)
+            return rows, np.zeros(len(rows))
+        return self.index.nearest(location, self.centers, service_type)
+
+    def _scored_days(self, rows: np.ndarray, distances: np.ndarray, last_day: int, priority: str,
+                     preferred_time: str) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """Per day from tomorrow: (day, best score any slot that day or later could get, scores, availability)"""
+        hours = self._hours[rows]
+        preference = np.zeros_like(hours)
+        preferred = PREFERRED_HOURS.get(preferred_time)
+        if preferred is not None:
+            preference[(hours >= preferred[0]) & (hours < preferred[1])] = PREFERENCE_BONUS
+        fixed = BASE_SCORE - distances[:, None] * KM_PENALTY + preference
+        ceiling = float(fixed.max())
+        day_penalty = DAY_PENALTY.get(priority, DAY_PENALTY["P3"])
+        capacity = self.inventory.daily_capacity[rows]
+
+        for day in range(1, last_day + 1):
+            best_possible = ceiling - day * day_penalty
+            available, day_remaining = self.inventory.availability(rows, day)
+            load = 1.0 - day_remaining / capacity
+            yield day, best_possible, fixed - (load * LOAD_PENALTY)[:, None] - day * day_penalty, available
+
+    def search(self, location: Optional[Tuple[float, float]], service_type: str = "regular", days_ahead: int = 7,
+               priority: str = "P3", preferred_time: str = "any", k: int = SLOT_SEARCH_TOP_K) -> List[Dict]:
+        """The k best open slots from tomorrow through days_ahead, best first"""
+        rows, distances = self._candidates(location, service_type)
+        if not len(rows) or k <= 0:
+            return []
+        last_day = max(1, min(days_ahead, self.inventory.horizon_days - 1))
+
+        # Min-heap ordered by score, then earlier day, slot and nearer center: its head is the worst slot kept
+        heap = []
+        for day, best_possible, scores, available in self._scored_days(rows, distances, last_day, priority,
+                                                                      preferred_time):
+            if len(heap) == k and best_possible <= heap[0][0]:
+                break
+            centers, slots = np.nonzero(available > 0)
+            if not len(centers):
+                continue
+            day_scores = scores[centers, slots]
+            # Only this day's k best can enter the heap; ties go to the earlier slot, then the nearer center
+            top = np.lexsort((centers, slots, -day_scores))[:k]
+            for position, slot, score, spots in zip(centers[top].tolist(), slots[top].tolist(), day_scores[top].tolist(),
+                                                    available[centers[top], slots[top]].tolist()):
+                item = (score, -day, -slot, -position, slot, day, spots)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        results = []
+        for score, _, _, neg_position, slot, day, spots in sorted(heap, reverse=True):
+            position = -neg_position
+            row = int(rows[position])
+            center = self.index.centers[row]
+            results.append({
+                "date": self.inventory.dates[day],
+                "day": self.inventory.weekdays[day],
+                "time": self.inventory.slot_times[row][slot],
+                "spots_available": spots,
+                "score": round(score, 1),
+                "center_id": center["id"],
+                "center_name": center["name"],
+                "distance_km": round(float(distances[position]), 1)
+            })
+        return results
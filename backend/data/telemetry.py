@@ -0,0 +1,203 @@
+"""
+Telemetry Store - Preallocated per-vehicle ring buffers for ingested sensor readings
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from data.vehicles import (
+    SENSOR_NAMES, SENSOR_UNITS, STATUS_LABELS, DTC_CODES, ISSUE_DTCS,
+    FleetReadings, classify_sensor_matrix, fleet_dtc_arrays, generate_fleet_readings, generate_sensor_reading,
+    get_all_vehicles, fleet_store
+)
+from data.fleet_store import FleetStore
+
+DEFAULT_CAPACITY = 256
+
+
+class TelemetryBuffer:
+    """Fixed-size ring buffer of float32 sensor columns plus timestamps.
+
+    Every sample is written twice (at i and i + capacity), so the last N samples
+    are always one contiguous slice and reads never copy.
+    """
+
+    def __init__(self, capacity: int, n_sensors: int):
+        self.capacity = capacity
+        self.values = np.full((n_sensors, 2 * capacity), np.nan, dtype=np.float32)
+        self.timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.active_dtcs: List[str] = []
+
+    def append(self, values: np.ndarray, timestamp: float):
+        i = self.head
+        j = i + self.capacity
+        self.values[:, i] = values
+        self.values[:, j] = values
+        self.timestamps[i] = timestamp
+        self.timestamps[j] = timestamp
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.total += 1
+
+    def window(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Read-only views of the last n timestamps and (sensors x n) values, oldest first"""
+        n = self.count if n is None else max(0, min(n, self.count))
+        end = self.head + self.capacity
+        timestamps = self.timestamps[end - n:end]
+        values = self.values[:, end - n:end]
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+
+class TelemetryStore:
+    """Per-vehicle telemetry buffers, allocated on first ingest"""
+
+    def __init__(self, store: FleetStore, capacity: int = DEFAULT_CAPACITY, sensor_names: List[str] = None):
+        self.store = store
+        self.capacity = capacity
+        self.sensor_names = list(sensor_names or SENSOR_NAMES)
+        self._sensor_index = {name: i for i, name in enumerate(self.sensor_names)}
+        self._buffers: Dict[str, TelemetryBuffer] = {}
+        self._listeners: List[Callable[[str, float, np.ndarray], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: Callable[[str, float, np.ndarray], None]):
+        """Register a callback invoked with (vehicle_id, timestamp, values) after each append"""
+        self._listeners.append(listener)
+
+    def _to_row(self, sensors: Dict[str, float]) -> np.ndarray:
+        row = np.full(len(self.sensor_names), np.nan, dtype=np.float32)
+        index = self._sensor_index
+        for name, value in sensors.items():
+            i = index.get(name)
+            if i is not None and value is not None:
+                row[i] = value
+        return row
+
+    def ingest(self, vehicle_id: str, sensors: Dict[str, float], timestamp: Optional[float] = None,
+               active_dtcs: Optional[List[str]] = None) -> bool:
+        """Append one reading; returns False for unknown vehicles"""
+        if vehicle_id not in self.store:
+            return False
+
+        row = self._to_row(sensors)
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            buffer = self._buffers.get(vehicle_id)
+            if buffer is None:
+                buffer = self._buffers[vehicle_id] = TelemetryBuffer(self.capacity, len(self.sensor_names))
+            buffer.append(row, timestamp)
+            if active_dtcs is not None:
+                buffer.active_dtcs = [code for code in active_dtcs if code in DTC_CODES]
+
+        for listener in self._listeners:
+            listener(vehicle_id, timestamp, row)
+        return True
+
+    def ingest_many(self, readings: List[Dict]) -> Dict[str, int]:
+        """Append a batch of readings shaped like ingest() keyword arguments"""
+        accepted = 0
+        for reading in readings:
+            if self.ingest(reading["vehicle_id"], reading.get("sensors", {}),
+                           reading.get("timestamp"), reading.get("active_dtcs")):
+                accepted += 1
+        return {"accepted": accepted, "rejected": len(readings) - accepted}
+
+    def has_data(self, vehicle_id: str) -> bool:
+        buffer = self._buffers.get(vehicle_id)
+        return buffer is not None and buffer.count > 0
+
+    def window(self, vehicle_id: str, n: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Zero-copy views of the last n samples for a vehicle"""
+        buffer = self._buffers.get(vehicle_id)
+        if buffer is None or buffer.count == 0:
+            return None
+        return buffer.window(n)
+
+    def latest(self, vehicle_id: str) -> Optional[Tuple[float, np.ndarray]]:
+        """Latest (timestamp, values) for a vehicle"""
+        window = self.window(vehicle_id, 1)
+        if window is None:
+            return None
+        timestamps, values = window
+        return float(timestamps[0]), values[:, 0]
+
+    def _reading_dict(self, vehicle_id: str, timestamp: float, values: np.ndarray, dtcs: List[str]) -> Dict:
+        status = classify_sensor_matrix(values[None, :].astype(np.float64))[0].tolist()
+        rounded = values.astype(np.float64).round(2).tolist()
+        return {
+            "vehicle_id": vehicle_id,
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+            "sensors": {
+                name: {"value": rounded[i], "unit": SENSOR_UNITS[i], "status": STATUS_LABELS[status[i]]}
+                for i, name in enumerate(self.sensor_names) if not np.isnan(values[i])
+            },
+            "active_dtcs": [{"code": code, **DTC_CODES[code]} for code in dtcs]
+        }
+
+    def latest_reading(self, vehicle_id: str) -> Optional[Dict]:
+        """Latest reading in the generate_sensor_reading format"""
+        latest = self.latest(vehicle_id)
+        if latest is None:
+            return None
+        timestamp, values = latest
+        return self._reading_dict(vehicle_id, timestamp, values, self._buffers[vehicle_id].active_dtcs)
+
+    def readings(self, vehicle_id: str, n: Optional[int] = None) -> List[Dict]:
+        """Last n readings as dicts, oldest first"""
+        window = self.window(vehicle_id, n)
+        if window is None:
+            return []
+        timestamps, values = window
+        dtcs = self._buffers[vehicle_id].active_dtcs
+        return [self._reading_dict(vehicle_id, float(timestamps[i]), values[:, i], dtcs) for i in range(len(timestamps))]
+
+    def fleet_readings(self, anomaly_chance: float = 0.15) -> FleetReadings:
+        """Fleet readings from each vehicle's latest ingested sample and DTCs, simulated for the rest.
+
+        Sensors a vehicle's latest sample did not report keep their simulated value.
+        """
+        readings = generate_fleet_readings(self.store, anomaly_chance)
+        latest = {}
+        with self._lock:
+            for vehicle_id, buffer in self._buffers.items():
+                if buffer.count:
+                    timestamps, samples = buffer.window(1)
+                    latest[vehicle_id] = (float(timestamps[0]), samples[:, 0].copy(), buffer.active_dtcs)
+        if not latest:
+            return readings
+
+        columns = np.array([SENSOR_NAMES.index(name) for name in self.sensor_names])
+        values = readings.values
+        dtc_codes = dict(ISSUE_DTCS)
+        reading_times = {}
+        for vehicle_id, (timestamp, sample, dtcs) in latest.items():
+            row = self.store.row_of(vehicle_id)
+            if row is None:
+                continue
+            reported = ~np.isnan(sample)
+            values[row, columns[reported]] = sample[reported]
+            dtc_codes[vehicle_id] = dtcs
+            reading_times[vehicle_id] = datetime.fromtimestamp(timestamp).isoformat()
+        _, dtc_alerts, dtc_penalty = fleet_dtc_arrays(self.store, dtc_codes)
+        return FleetReadings(self.store, values, dtc_alerts, dtc_penalty, readings.timestamp, dtc_codes, reading_times)
+
+
+def get_current_reading(vehicle_id: str) -> Dict:
+    """Latest ingested reading, falling back to a simulated one for vehicles without telemetry"""
+    return telemetry_store.latest_reading(vehicle_id) or generate_sensor_reading(vehicle_id)
+
+
+def get_current_vehicles(offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    """get_all_vehicles from the latest ingested telemetry, simulated for vehicles without any"""
+    return get_all_vehicles(offset, limit, readings=telemetry_store.fleet_readings())
+
+
+# Global telemetry store
+telemetry_store = TelemetryStore(fleet_store)
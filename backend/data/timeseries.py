@@ -0,0 +1,355 @@
+"""
+Time-Series History - Memory-mapped, segmented columnar sensor history with min/max/mean rollups
+
+Layout under the data directory:
+    timeseries/<vehicle_id>/<segment_start>/ts.f64          raw timestamps (append-only)
+    timeseries/<vehicle_id>/<segment_start>/<sensor>.f32    raw values, one file per sensor
+    timeseries/<vehicle_id>/<segment_start>/rollup_<res>.npy     (buckets x sensors x [min, max, mean, count])
+    timeseries/<vehicle_id>/<segment_start>/rollup_<res>_ts.npy  bucket start times
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from data.vehicles import SENSOR_NAMES
+from monitoring.metrics import timed
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeseries")
+SEGMENT_SECONDS = 86400
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)  # 1 minute, 1 hour, 1 day
+RAW_RESOLUTION = 0
+
+
+def _rollup_raw(timestamps: np.ndarray, values: np.ndarray, resolution: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Roll raw (samples,) timestamps and (sensors x samples) values into resolution-sized buckets"""
+    order = np.argsort(timestamps, kind="stable")
+    if not (order == np.arange(len(order))).all():
+        timestamps = timestamps[order]
+        values = values[:, order]
+    buckets = np.floor_divide(timestamps, resolution).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+
+    values = np.asarray(values, dtype=np.float64).T
+    finite = np.isfinite(values)
+    rollup = np.empty((len(starts), values.shape[1], 4), dtype=np.float64)
+    rollup[:, :, 0] = np.fmin.reduceat(values, starts, axis=0)
+    rollup[:, :, 1] = np.fmax.reduceat(values, starts, axis=0)
+    total = np.add.reduceat(np.where(finite, values, 0.0), starts, axis=0)
+    count = np.add.reduceat(finite, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rollup[:, :, 2] = total / count
+    rollup[:, :, 3] = count
+    return (buckets[starts] * resolution).astype(np.float64), rollup
+
+
+def _rollup_rollup(timestamps: np.ndarray, rollup: np.ndarray, resolution: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-bucket a finer rollup into a coarser one"""
+    buckets = np.floor_divide(timestamps, resolution).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    count = rollup[:, :, 3]
+    total = np.where(count > 0, rollup[:, :, 2] * count, 0.0)
+
+    coarse = np.empty((len(starts), rollup.shape[1], 4), dtype=np.float64)
+    coarse[:, :, 0] = np.fmin.reduceat(rollup[:, :, 0], starts, axis=0)
+    coarse[:, :, 1] = np.fmax.reduceat(rollup[:, :, 1], starts, axis=0)
+    coarse_count = np.add.reduceat(count, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coarse[:, :, 2] = np.add.reduceat(total, starts, axis=0) / coarse_count
+    coarse[:, :, 3] = coarse_count
+    return (buckets[starts] * resolution).astype(np.float64), coarse
+
+
+def _merge_rollups(timestamps_a: np.ndarray, rollup_a: np.ndarray, timestamps_b: np.ndarray, rollup_b: np.ndarray,
+                   resolution: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Combine two rollups of the same resolution, folding together the buckets they share"""
+    if len(timestamps_a) == 0:
+        return timestamps_b, rollup_b
+    if len(timestamps_b) == 0:
+        return timestamps_a, rollup_a
+    timestamps = np.concatenate([np.asarray(timestamps_a, dtype=np.float64), timestamps_b])
+    rollup = np.concatenate([np.asarray(rollup_a, dtype=np.float64), rollup_b])
+    order = np.argsort(timestamps, kind="stable")
+    return _rollup_rollup(timestamps[order], rollup[order], resolution)
+
+
+class Segment:
+    """One vehicle's samples for one time bucket, stored as one raw file per column"""
+
+    def __init__(self, path: str, sensor_names: List[str]):
+        self.path = path
+        self.sensor_names = sensor_names
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def count(self) -> int:
+        ts_path = self._file("ts.f64")
+        return os.path.getsize(ts_path) // 8 if os.path.exists(ts_path) else 0
+
+    def append(self, timestamps: np.ndarray, values: np.ndarray):
+        """Append (samples,) timestamps and (sensors x samples) values"""
+        os.makedirs(self.path, exist_ok=True)
+        # Sensor columns first and timestamps last, so count() never exceeds any column length
+        for i, name in enumerate(self.sensor_names):
+            with open(self._file(f"{name}.f32"), "ab") as f:
+                f.write(np.ascontiguousarray(values[i], dtype=np.float32).tobytes())
+        with open(self._file("ts.f64"), "ab") as f:
+            f.write(np.ascontiguousarray(timestamps, dtype=np.float64).tobytes())
+
+    def raw(self) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Memory-mapped raw timestamps and one memory-mapped column per sensor"""
+        n = self.count()
+        if n == 0:
+            return np.empty(0), [np.empty(0, dtype=np.float32) for _ in self.sensor_names]
+        timestamps = np.memmap(self._file("ts.f64"), dtype=np.float64, mode="r", shape=(n,))
+        columns = [np.memmap(self._file(f"{name}.f32"), dtype=np.float32, mode="r", shape=(n,))
+                   for name in self.sensor_names]
+        return timestamps, columns
+
+    def rolled_count(self) -> int:
+        meta_path = self._file("meta.json")
+        if not os.path.exists(meta_path):
+            return 0
+        with open(meta_path) as f:
+            return json.load(f).get("rolled_count", 0)
+
+    def is_dirty(self) -> bool:
+        return self.count() != self.rolled_count()
+
+    def tail(self) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Rows already in the rollups, then raw timestamps and (sensors x samples) values appended since"""
+        timestamps, columns = self.raw()
+        rolled = self.rolled_count()
+        if rolled > len(timestamps):
+            # Raw files no longer match the rollups: roll everything up again
+            rolled = 0
+        values = np.array([column[rolled:] for column in columns], dtype=np.float64).reshape(len(self.sensor_names), -1)
+        return rolled, np.asarray(timestamps[rolled:]), values
+
+    def compact(self):
+        """Fold raw samples appended since the last compaction into the 1-minute, 1-hour and 1-day rollups"""
+        rolled, timestamps, values = self.tail()
+        if len(timestamps) == 0:
+            return
+        tail_ts, tail = _rollup_raw(timestamps, values, ROLLUP_RESOLUTIONS[0])
+        for resolution in ROLLUP_RESOLUTIONS:
+            if resolution != ROLLUP_RESOLUTIONS[0]:
+                tail_ts, tail = _rollup_rollup(tail_ts, tail, resolution)
+            merged = _merge_rollups(*self.rollup(resolution), tail_ts, tail, resolution) if rolled else (tail_ts, tail)
+            self._save_rollup(resolution, *merged)
+
+        tmp_path = self._file("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"rolled_count": rolled + len(timestamps)}, f)
+        os.replace(tmp_path, self._file("meta.json"))
+
+    def _save_rollup(self, resolution: int, timestamps: np.ndarray, rollup: np.ndarray):
+        for suffix, array in (("", rollup.astype(np.float32)), ("_ts", timestamps)):
+            final_path = self._file(f"rollup_{resolution}{suffix}.npy")
+            tmp_path = final_path + ".tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, final_path)
+
+    def rollup(self, resolution: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-mapped rollup timestamps and (buckets x sensors x 4) values"""
+        path = self._file(f"rollup_{resolution}.npy")
+        if not os.path.exists(path):
+            return np.empty(0), np.empty((0, len(self.sensor_names), 4), dtype=np.float32)
+        return (np.load(self._file(f"rollup_{resolution}_ts.npy"), mmap_mode="r"),
+                np.load(path, mmap_mode="r"))
+
+
+class HistoryStore:
+    """Long-term per-vehicle sensor history on disk with background flushing and rollup compaction
+
+    append only stages rows in memory; the background thread writes them out
+    once flush_rows are staged and folds new rows into the rollups every
+    interval. Queries combine the on-disk data with whatever is not written
+    or rolled up yet, so they never wait for a flush or compaction of their own.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, sensor_names: List[str] = None, flush_rows: int = 4096):
+        self.root = root
+        self.sensor_names = list(sensor_names or SENSOR_NAMES)
+        self.flush_rows = flush_rows
+        self._staged: Dict[Tuple[str, int], List[Tuple[float, np.ndarray]]] = defaultdict(list)
+        self._staged_rows = 0
+        self._dirty = set()
+        self._lock = threading.RLock()
+        # Held while segment files are written or read, never by append
+        self._io_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _segment(self, vehicle_id: str, bucket: int) -> Segment:
+        return Segment(os.path.join(self.root, vehicle_id, str(bucket * SEGMENT_SECONDS)), self.sensor_names)
+
+    def _existing_buckets(self, vehicle_id: str) -> List[int]:
+        vehicle_dir = os.path.join(self.root, vehicle_id)
+        if not os.path.isdir(vehicle_dir):
+            return []
+        return sorted(int(name) // SEGMENT_SECONDS for name in os.listdir(vehicle_dir) if name.isdigit())
+
+    def append(self, vehicle_id: str, timestamp: float, values: np.ndarray):
+        """Stage one reading; matches the TelemetryStore listener signature"""
+        bucket = int(timestamp // SEGMENT_SECONDS)
+        with self._lock:
+            self._staged[(vehicle_id, bucket)].append((timestamp, np.array(values, dtype=np.float32)))
+            self._staged_rows += 1
+            full = self._staged_rows >= self.flush_rows
+        if full:
+            if self._thread and self._thread.is_alive():
+                self._wake.set()
+            else:
+                # No background thread (standalone use): bound memory by flushing here
+                self.flush()
+
+    @staticmethod
+    def _stack(rows: List[Tuple[float, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Staged rows as (samples,) timestamps and (sensors x samples) values"""
+        timestamps = np.fromiter((ts for ts, _ in rows), dtype=np.float64, count=len(rows))
+        return timestamps, np.stack([row for _, row in rows], axis=1).astype(np.float64)
+
+    @timed
+    def flush(self, keys: Optional[List[Tuple[str, int]]] = None):
+        """Write staged rows to their segments; appends only wait for the hand-over, not the disk writes"""
+        with self._io_lock:
+            with self._lock:
+                batches = [(key, self._staged.pop(key, None)) for key in (list(self._staged) if keys is None else keys)]
+                self._staged_rows -= sum(len(rows) for _, rows in batches if rows)
+            for key, rows in batches:
+                if rows:
+                    self._segment(*key).append(*self._stack(rows))
+                    self._dirty.add(key)
+
+    @timed
+    def compact(self, keys: Optional[List[Tuple[str, int]]] = None):
+        """Flush and fold new rows into the rollups of segments written since the last compaction"""
+        with self._io_lock:
+            self.flush(keys)
+            for key in list(self._dirty) if keys is None else keys:
+                segment = self._segment(*key)
+                if key in self._dirty or segment.is_dirty():
+                    segment.compact()
+                self._dirty.discard(key)
+
+    def _run(self, interval: float):
+        next_compaction = time.monotonic() + interval
+        while not self._stop.is_set():
+            self._wake.wait(max(0.0, next_compaction - time.monotonic()))
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if time.monotonic() >= next_compaction:
+                self.compact()
+                next_compaction = time.monotonic() + interval
+            else:
+                self.flush()
+
+    def start(self, interval: float = 60.0):
+        """Start background flushing and compaction"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="history-compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop background flushing and compaction and persist everything staged"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.compact()
+
+    @staticmethod
+    def select_resolution(resolution: Optional[float]) -> int:
+        """Coarsest rollup no coarser than the requested resolution (0 means raw samples)"""
+        if not resolution:
+            return RAW_RESOLUTION
+        eligible = [r for r in ROLLUP_RESOLUTIONS if r <= resolution]
+        return max(eligible) if eligible else RAW_RESOLUTION
+
+    @timed
+    def query(self, vehicle_id: str, start: float, end: float, resolution: Optional[float] = None) -> Dict:
+        """History in [start, end) as timestamps plus (sensors x points) min/max/mean arrays"""
+        chosen = self.select_resolution(resolution)
+        first, last = int(start // SEGMENT_SECONDS), int(end // SEGMENT_SECONDS)
+        n_sensors = len(self.sensor_names)
+        parts_ts, parts_min, parts_max, parts_mean = [], [], [], []
+
+        # The I/O lock keeps a background flush from moving rows between the staging area and disk mid-read
+        with self._io_lock:
+            buckets = [b for b in self._existing_buckets(vehicle_id) if first <= b <= last]
+            with self._lock:
+                staged = {(v, b): list(rows) for (v, b), rows in self._staged.items()
+                          if v == vehicle_id and first <= b <= last and rows}
+            keys = sorted(set((vehicle_id, b) for b in buckets) | set(staged))
+
+            for key in keys:
+                segment = self._segment(*key)
+                staged_ts, staged_values = self._stack(staged[key]) if key in staged else (np.empty(0), None)
+                if chosen == RAW_RESOLUTION:
+                    timestamps, columns = segment.raw()
+                    values = np.array(columns, dtype=np.float64).reshape(n_sensors, -1)
+                    if staged_values is not None:
+                        timestamps = np.concatenate([timestamps, staged_ts])
+                        values = np.concatenate([values, staged_values], axis=1)
+                    mask = (timestamps >= start) & (timestamps < end)
+                    selected = values[:, mask]
+                    parts_ts.append(np.asarray(timestamps[mask]))
+                    parts_min.append(selected)
+                    parts_max.append(selected)
+                    parts_mean.append(selected)
+                else:
+                    # Persisted rollups plus the rows not rolled up yet, bucketed here
+                    rolled, tail_ts, tail_values = segment.tail()
+                    if staged_values is not None:
+                        tail_ts = np.concatenate([tail_ts, staged_ts])
+                        tail_values = np.concatenate([tail_values, staged_values], axis=1)
+                    timestamps, rollup = segment.rollup(chosen) if rolled else (np.empty(0), np.empty((0, n_sensors, 4)))
+                    if len(tail_ts):
+                        timestamps, rollup = _merge_rollups(timestamps, rollup, *_rollup_raw(tail_ts, tail_values, chosen), chosen)
+                    lo = np.searchsorted(timestamps, start - chosen, side="right")
+                    hi = np.searchsorted(timestamps, end)
+                    window = np.asarray(rollup[lo:hi], dtype=np.float64)
+                    parts_ts.append(np.asarray(timestamps[lo:hi]))
+                    parts_min.append(window[:, :, 0].T)
+                    parts_max.append(window[:, :, 1].T)
+                    parts_mean.append(window[:, :, 2].T)
+
+        def join(parts):
+            return np.concatenate(parts, axis=1) if parts else np.empty((n_sensors, 0))
+
+        return {
+            "vehicle_id": vehicle_id,
+            "resolution": chosen,
+            "timestamps": np.concatenate(parts_ts) if parts_ts else np.empty(0),
+            "min": join(parts_min),
+            "max": join(parts_max),
+            "mean": join(parts_mean)
+        }
+
+    def to_json(self, result: Dict) -> Dict:
+        """Convert a query result to a JSON-friendly dict, one series per sensor"""
+        def series(values):
+            return [None if np.isnan(v) else round(v, 3) for v in values.tolist()]
+
+        return {
+            "vehicle_id": result["vehicle_id"],
+            "resolution_seconds": result["resolution"],
+            "timestamps": result["timestamps"].tolist(),
+            "sensors": {
+                name: {"min": series(result["min"][i]), "max": series(result["max"][i]), "mean": series(result["mean"][i])}
+                for i, name in enumerate(self.sensor_names)
+            }
+        }
+
+
+# Global history store
+history_store = HistoryStore()
@@ -3,6 +3,10 @@ Synthetic Vehicle Data - 10 vehicles with sensor readings, usage patterns, and D
 """
 import random
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from data.fleet_store import FleetStore
+from monitoring.metrics import timed
 
 # 10 Synthetic Vehicles
 VEHICLES = [
@@ -15,7 +19,8 @@ VEHICLES = [
         "owner": {"name": "Rahul Sharma", "phone": "+91-9876543210", "email": "rahul.sharma@email.com"},
         "odometer": 25420,
         "last_service": "2024-09-15",
-        "city": "Mumbai"
+        "city": "Mumbai",
+        "location": {"lat": 19.1197, "lon": 72.8468}
     },
     {
         "id": "VH002",
@@ -26,7 +31,8 @@ VEHICLES = [
         "owner": {"name": "Priya Patel", "phone": "+91-9876543211", "email": "priya.patel@email.com"},
         "odometer": 45780,
         "last_service": "2024-08-20",
-        "city": "Delhi"
+        "city": "Delhi",
+        "location": {"lat": 28.5672, "lon": 77.21}
     },
     {
         "id": "VH003",
@@ -37,7 +43,8 @@ VEHICLES = [
         "owner": {"name": "Amit Kumar", "phone": "+91-9876543212", "email": "amit.kumar@email.com"},
         "odometer": 18950,
         "last_service": "2024-10-01",
-        "city": "Bangalore"
+        "city": "Bangalore",
+        "location": {"lat": 12.9352, "lon": 77.6245}
     },
     {
         "id": "VH004",
@@ -48,7 +55,8 @@ VEHICLES = [
         "owner": {"name": "Sneha Reddy", "phone": "+91-9876543213", "email": "sneha.reddy@email.com"},
         "odometer": 62340,
         "last_service": "2024-07-10",
-        "city": "Hyderabad"
+        "city": "Hyderabad",
+        "location": {"lat": 17.4401, "lon": 78.3489}
     },
     {
         "id": "VH005",
@@ -59,7 +67,8 @@ VEHICLES = [
         "owner": {"name": "Vikram Singh", "phone": "+91-9876543214", "email": "vikram.singh@email.com"},
         "odometer": 38920,
         "last_service": "2024-09-25",
-        "city": "Chennai"
+        "city": "Chennai",
+        "location": {"lat": 13.0418, "lon": 80.2341}
     },
     {
         "id": "VH006",
@@ -70,7 +79,8 @@ VEHICLES = [
         "owner": {"name": "Neha Gupta", "phone": "+91-9876543215", "email": "neha.gupta@email.com"},
         "odometer": 21560,
         "last_service": "2024-10-15",
-        "city": "Pune"
+        "city": "Pune",
+        "location": {"lat": 18.559, "lon": 73.7868}
     },
     {
         "id": "VH007",
@@ -81,7 +91,8 @@ VEHICLES = [
         "owner": {"name": "Rajesh Menon", "phone": "+91-9876543216", "email": "rajesh.menon@email.com"},
         "odometer": 89450,
         "last_service": "2024-06-20",
-        "city": "Kochi"
+        "city": "Kochi",
+        "location": {"lat": 10.0159, "lon": 76.3419}
     },
     {
         "id": "VH008",
@@ -92,7 +103,8 @@ VEHICLES = [
         "owner": {"name": "Ananya Joshi", "phone": "+91-9876543217", "email": "ananya.joshi@email.com"},
         "odometer": 34120,
         "last_service": "2024-08-30",
-        "city": "Ahmedabad"
+        "city": "Ahmedabad",
+        "location": {"lat": 23.0395, "lon": 72.566}
     },
     {
         "id": "VH009",
@@ -103,7 +115,8 @@ VEHICLES = [
         "owner": {"name": "Arjun Nair", "phone": "+91-9876543218", "email": "arjun.nair@email.com"},
         "odometer": 15780,
         "last_service": "2024-11-01",
-        "city": "Jaipur"
+        "city": "Jaipur",
+        "location": {"lat": 26.9124, "lon": 75.7873}
     },
     {
         "id": "VH010",
@@ -114,10 +127,14 @@ VEHICLES = [
         "owner": {"name": "Meera Iyer", "phone": "+91-9876543219", "email": "meera.iyer@email.com"},
         "odometer": 42890,
         "last_service": "2024-07-25",
-        "city": "Kolkata"
+        "city": "Kolkata",
+        "location": {"lat": 22.5448, "lon": 88.3426}
     }
 ]
 
+# Indexed fleet store over the same vehicle dicts
+fleet_store = FleetStore(VEHICLES)
+
 # Sensor baseline values and thresholds
 SENSOR_CONFIG = {
     "engine_temp": {"min": 85, "max": 105, "critical": 110, "unit": "°C"},
@@ -134,6 +151,21 @@ SENSOR_CONFIG = {
     "air_filter_health": {"min": 0, "max": 100, "critical": 75, "unit": "% degraded"}
 }
 
+# Threshold vectors over SENSOR_CONFIG (column order = SENSOR_NAMES) for batched scoring
+SENSOR_NAMES = list(SENSOR_CONFIG.keys())
+SENSOR_UNITS = [config["unit"] for config in SENSOR_CONFIG.values()]
+SENSOR_MIN = np.array([config["min"] for config in SENSOR_CONFIG.values()], dtype=np.float64)
+SENSOR_MAX = np.array([config["max"] for config in SENSOR_CONFIG.values()], dtype=np.float64)
+SENSOR_CRITICAL = np.array([config.get("critical", np.inf) for config in SENSOR_CONFIG.values()])
+SENSOR_CRITICAL_LOW = np.array([config.get("critical_low", -np.inf) for config in SENSOR_CONFIG.values()])
+SENSOR_HAS_CRITICAL = np.isfinite(SENSOR_CRITICAL)
+SENSOR_HAS_CRITICAL_LOW = np.isfinite(SENSOR_CRITICAL_LOW) & ~SENSOR_HAS_CRITICAL
+
+# Status codes used in sensor status matrices
+STATUS_NORMAL, STATUS_WARNING, STATUS_CRITICAL = 0, 1, 2
+STATUS_LABELS = ("normal", "warning", "critical")
+STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+
 # Diagnostic Trouble Codes (DTCs)
 DTC_CODES = {
     "P0300": {"description": "Random/Multiple Cylinder Misfire Detected", "severity": "high", "component": "engine"},
@@ -148,6 +180,17 @@ DTC_CODES = {
     "P0562": {"description": "System Voltage Low", "severity": "medium", "component": "electrical"}
 }
 
+# Vehicles with persistent issues for demo
+ISSUE_DTCS = {
+    "VH004": ["P0171", "P0420"],  # Fuel and exhaust issues
+    "VH007": ["P0300", "P0128"],  # Engine and cooling issues
+    "VH002": ["C0035", "P0562"]   # ABS and electrical issues
+}
+
+DTC_SEVERITY_PENALTY = {"critical": 20, "high": 10, "medium": 5}
+
+_rng = np.random.default_rng()
+
 
 def generate_sensor_reading(vehicle_id: str, anomaly_chance: float = 0.15):
     """Generate real-time sensor readings for a vehicle with optional anomalies"""
@@ -158,7 +201,7 @@ def generate_sensor_reading(vehicle_id: str, anomaly_chance: float = 0.15):
     }
     
     # Add some vehicles with persistent issues for demo
-    has_issue = vehicle_id in ["VH004", "VH007", "VH002"]
+    has_issue = vehicle_id in ISSUE_DTCS
     
     for sensor, config in SENSOR_CONFIG.items():
         base_value = (config["min"] + config["max"]) / 2
@@ -202,14 +245,8 @@ def generate_active_dtcs(vehicle_id: str, has_issue: bool) -> list:
     dtcs = []
     
     # Vehicles with issues have persistent DTCs
-    issue_map = {
-        "VH004": ["P0171", "P0420"],  # Fuel and exhaust issues
-        "VH007": ["P0300", "P0128"],  # Engine and cooling issues
-        "VH002": ["C0035", "P0562"]   # ABS and electrical issues
-    }
-    
-    if vehicle_id in issue_map:
-        for code in issue_map[vehicle_id]:
+    if vehicle_id in ISSUE_DTCS:
+        for code in ISSUE_DTCS[vehicle_id]:
             dtcs.append({
                 "code": code,
                 **DTC_CODES[code],
@@ -228,25 +265,143 @@ def generate_active_dtcs(vehicle_id: str, has_issue: bool) -> list:
 
 def get_vehicle_by_id(vehicle_id: str):
     """Get vehicle by ID"""
-    for vehicle in VEHICLES:
-        if vehicle["id"] == vehicle_id:
-            return vehicle
-    return None
-
-
-def get_all_vehicles():
-    """Get all vehicles with current health status"""
-    vehicles_with_status = []
-    for vehicle in VEHICLES:
-        reading = generate_sensor_reading(vehicle["id"])
-        health_score = calculate_health_score(reading)
-        vehicles_with_status.append({
-            **vehicle,
-            "health_score": health_score,
-            "active_alerts": len(reading["active_dtcs"]),
-            "current_reading": reading
-        })
-    return vehicles_with_status
+    return fleet_store.get(vehicle_id)
+
+
+def get_vehicle_by_vin(vin: str):
+    """Get vehicle by VIN"""
+    return fleet_store.get_by_vin(vin)
+
+
+@timed
+def get_all_vehicles(offset: int = 0, limit: Optional[int] = None, store: FleetStore = None,
+                     readings: "FleetReadings" = None):
+    """Get all vehicles with current health status, from `readings` when given"""
+    readings = generate_fleet_readings(store) if readings is None else readings
+    offset = max(0, offset)
+    end = len(readings) if limit is None else min(len(readings), offset + max(0, limit))
+    return [readings.vehicle(i) for i in range(offset, end)]
+
+
+def generate_sensor_matrix(has_issue: np.ndarray, anomaly_chance: float = 0.15,
+                           rng: np.random.Generator = None) -> np.ndarray:
+    """Generate a (vehicles x sensors) reading matrix in one pass, same model as generate_sensor_reading"""
+    rng = rng or _rng
+    n = len(has_issue)
+    shape = (n, len(SENSOR_NAMES))
+
+    base = (SENSOR_MIN + SENSOR_MAX) / 2
+    variance = (SENSOR_MAX - SENSOR_MIN) / 4
+    values = base + rng.uniform(-1.0, 1.0, shape) * variance
+
+    # Inject anomalies
+    anomalous = has_issue[:, None] | (rng.random(shape) < anomaly_chance)
+    high = SENSOR_CRITICAL + rng.uniform(0, 10, shape)
+    low = SENSOR_CRITICAL_LOW - rng.uniform(0, 5, shape)
+    values = np.where(anomalous & SENSOR_HAS_CRITICAL, high, values)
+    values = np.where(anomalous & SENSOR_HAS_CRITICAL_LOW, low, values)
+    return values
+
+
+def classify_sensor_matrix(values: np.ndarray) -> np.ndarray:
+    """Vectorized get_sensor_status: map a reading matrix to status codes"""
+    status = np.zeros(values.shape, dtype=np.int8)
+    status[(values < SENSOR_MIN) | (values > SENSOR_MAX)] = STATUS_WARNING
+    status[(values >= SENSOR_CRITICAL) | (values <= SENSOR_CRITICAL_LOW)] = STATUS_CRITICAL
+    return status
+
+
+def sensor_arrays(sensors: Dict[str, Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """(values, status codes) in SENSOR_NAMES order from a reading's sensor dicts; missing sensors are NaN and normal"""
+    values = np.full(len(SENSOR_NAMES), np.nan)
+    status = np.zeros(len(SENSOR_NAMES), dtype=np.int8)
+    for i, name in enumerate(SENSOR_NAMES):
+        data = sensors.get(name)
+        if data is not None:
+            values[i] = data["value"]
+            status[i] = STATUS_CODES[data["status"]]
+    return values, status
+
+
+def calculate_health_scores(status: np.ndarray, dtc_penalty: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_health_score over a status matrix"""
+    critical = (status == STATUS_CRITICAL).sum(axis=1)
+    warning = (status == STATUS_WARNING).sum(axis=1)
+    scores = 100 - 15 * critical - 5 * warning - dtc_penalty
+    return np.clip(scores, 0, 100)
+
+
+class FleetReadings:
+    """Batched fleet readings; per-vehicle dicts are only built for rows that are requested"""
+
+    def __init__(self, store: FleetStore, values: np.ndarray, dtc_alerts: np.ndarray,
+                 dtc_penalty: np.ndarray, timestamp: str, dtc_codes: Dict[str, List[str]] = None,
+                 reading_times: Dict[str, str] = None):
+        self.store = store
+        self.values = values
+        self.status = classify_sensor_matrix(values)
+        self.dtc_alerts = dtc_alerts
+        # Active DTC codes per vehicle id behind dtc_alerts
+        self.dtc_codes = ISSUE_DTCS if dtc_codes is None else dtc_codes
+        self.health_scores = calculate_health_scores(self.status, dtc_penalty)
+        self.timestamp = timestamp
+        # Per-vehicle reading times where they differ from `timestamp`
+        self.reading_times = reading_times or {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def vehicle_id(self, row: int) -> str:
+        return self.store.vehicles[row]["id"]
+
+    def reading(self, row: int) -> Dict:
+        """Build the generate_sensor_reading dict for one row"""
+        vehicle_id = self.vehicle_id(row)
+        values = self.values[row].round(2).tolist()
+        status = self.status[row].tolist()
+        return {
+            "vehicle_id": vehicle_id,
+            "timestamp": self.reading_times.get(vehicle_id, self.timestamp),
+            "sensors": {
+                name: {"value": values[i], "unit": SENSOR_UNITS[i], "status": STATUS_LABELS[status[i]]}
+                for i, name in enumerate(SENSOR_NAMES)
+            },
+            "active_dtcs": [{"code": code, **DTC_CODES[code]} for code in self.dtc_codes.get(vehicle_id, ())]
+        }
+
+    def vehicle(self, row: int) -> Dict:
+        """Build the get_all_vehicles entry for one row"""
+        return {
+            **self.store.vehicles[row],
+            "health_score": int(self.health_scores[row]),
+            "active_alerts": int(self.dtc_alerts[row]),
+            "current_reading": self.reading(row)
+        }
+
+
+def fleet_dtc_arrays(store: FleetStore, dtc_codes: Dict[str, List[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-row (has codes, alert count, health penalty) for the active DTC codes of each vehicle id"""
+    n = len(store)
+    has_codes = np.zeros(n, dtype=bool)
+    dtc_alerts = np.zeros(n, dtype=np.int64)
+    dtc_penalty = np.zeros(n, dtype=np.int64)
+    for vehicle_id, codes in dtc_codes.items():
+        row = store.row_of(vehicle_id)
+        if row is None or not codes:
+            continue
+        has_codes[row] = True
+        dtc_alerts[row] = len(codes)
+        dtc_penalty[row] = sum(DTC_SEVERITY_PENALTY.get(DTC_CODES[c]["severity"], 0) for c in codes)
+    return has_codes, dtc_alerts, dtc_penalty
+
+
+@timed
+def generate_fleet_readings(store: FleetStore = None, anomaly_chance: float = 0.15) -> FleetReadings:
+    """Generate readings, statuses and health scores for the whole fleet in one NumPy pass"""
+    store = fleet_store if store is None else store
+    has_issue, dtc_alerts, dtc_penalty = fleet_dtc_arrays(store, ISSUE_DTCS)
+    values = generate_sensor_matrix(has_issue, anomaly_chance)
+    return FleetReadings(store, values, dtc_alerts, dtc_penalty, datetime.now().isoformat())
 
 
 def calculate_health_score(reading: dict) -> int:
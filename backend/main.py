@@ -6,7 +6,15 @@ customer engagement, service scheduling, and manufacturing quality improvement.
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router
+from fastapi.responses import PlainTextResponse
+from api.routes import router, master_agent
+from api.execution import execution
+from data.timeseries import history_store
+from agents.fleet_check import fleet_check_pool
+from agents.action_log import file_sink
+from security.pipeline import ueba_pipeline
+from monitoring.metrics import registry
+from monitoring.middleware import MetricsMiddleware
 
 app = FastAPI(
     title="Predictive Maintenance AI System",
@@ -23,8 +31,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(router, prefix="/api")
 
+@app.on_event("startup")
+async def startup():
+    history_store.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    history_store.stop()
+    master_agent.workers["diagnosis"].prediction_service.stop()
+    fleet_check_pool.shutdown()
+    execution.shutdown(wait=False)
+    ueba_pipeline.stop()
+    if file_sink is not None:
+        file_sink.stop()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,229 @@
+"""
+Metrics - Low-overhead counters and latency histograms rendered in Prometheus text format
+"""
+import asyncio
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, 50us .. 10s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus the +Inf overflow; cumulated only when rendered
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Metric(ABC):
+    """A named metric family; each label combination gets its own child"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """Fresh child for a new label combination"""
+
+    def labels(self, *values: str):
+        """Child for one label combination; bind it once and reuse it on hot paths"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Prometheus sample lines for every child"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        """Increment the unlabelled counter"""
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+                for key, child in list(self._children.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float):
+        """Record into the unlabelled histogram"""
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.upper_bounds + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families by name and renders them for scraping"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+# Global metrics registry
+registry = MetricsRegistry()
+
+CALL_DURATION = registry.histogram("call_duration_seconds", "Latency of instrumented agent and data-layer calls",
+                                   ["component", "method"])
+CALLS = registry.counter("calls_total", "Instrumented agent and data-layer calls", ["component", "method"])
+MODEL_INFERENCES = registry.counter("model_inferences_total", "Model evaluations (one per batch)", ["model"])
+MODEL_INFERENCE_ROWS = registry.counter("model_inference_rows_total", "Rows scored by model evaluations", ["model"])
+CACHE_HITS = registry.counter("cache_hits_total", "Cache lookups served from cache", ["cache"])
+CACHE_MISSES = registry.counter("cache_misses_total", "Cache lookups that missed", ["cache"])
+
+
+def timed(fn: Callable = None, *, component: str = None, method: str = None):
+    """Record latency and call count of a function or method.
+
+    Labels default to the owning class (or module) and the function name. They
+    are bound when the function is decorated, so each call costs two clock reads
+    and one histogram update.
+    """
+    if fn is None:
+        return functools.partial(timed, component=component, method=method)
+
+    qualname = fn.__qualname__.split(".")
+    component = component or (qualname[-2] if len(qualname) > 1 else fn.__module__.rsplit(".", 1)[-1])
+    method = method or fn.__name__
+    histogram = CALL_DURATION.labels(component, method)
+    calls = CALLS.labels(component, method)
+    clock = time.perf_counter
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                histogram.observe(clock() - start)
+                calls.inc()
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            histogram.observe(clock() - start)
+            calls.inc()
+    return wrapper
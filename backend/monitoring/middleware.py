@@ -0,0 +1,60 @@
+"""
+Metrics Middleware - Pure ASGI middleware recording per-route request latency and status
+"""
+import time
+from .metrics import registry
+
+REQUEST_DURATION = registry.histogram("http_request_duration_seconds", "HTTP request latency by route template",
+                                      ["method", "route", "status"])
+REQUESTS_STARTED = registry.counter("http_requests_started_total", "HTTP requests started", ["method"])
+
+# Label for requests that matched no route, so unknown paths cannot blow up label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Times each HTTP request until its response completes and labels it with the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self._children = {}
+        self._templates = {}
+
+    def _template(self, scope) -> str:
+        """Full path template of the matched route, including any router prefix"""
+        # The router stores the matched route in the shared scope
+        route = scope.get("route")
+        if route is None or not hasattr(route, "path_regex"):
+            return UNMATCHED_ROUTE
+        template = self._templates.get(id(route))
+        if template is None:
+            # Included routers may keep their prefix outside route.path; find the prefix the route matched under
+            path = scope["path"]
+            prefix = next((path[:i] for i in range(len(path)) if path[i] == "/" and route.path_regex.match(path[i:])), "")
+            template = self._templates[id(route)] = prefix + route.path
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        REQUESTS_STARTED.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (method, self._template(scope), status[0])
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = REQUEST_DURATION.labels(*key)
+            child.observe(elapsed)
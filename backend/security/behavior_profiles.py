@@ -0,0 +1,222 @@
+"""
+Behavior Profiles - Learned per-agent baselines of action mix, inter-arrival times and hour of day
+Recent activity is scored against every agent's profile at once with vectorized divergence measures
+"""
+import os
+import time
+from bisect import bisect_right
+from typing import Dict, List, Optional
+import numpy as np
+
+PROFILE_INTERVAL_SECONDS = float(os.environ.get("UEBA_PROFILE_INTERVAL", "60"))
+
+# Inter-arrival bin edges in seconds: 1ms .. 1h, log spaced
+INTER_ARRIVAL_EDGES = [0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0]
+FEATURES = ("action_mix", "inter_arrival", "hour_of_day")
+# Score that drives drift detection per feature. Hour of day uses likelihood, since one period covers
+# only a slice of the day and would always diverge from a full-day histogram
+SCORE_MEASURE = {"action_mix": "divergence", "inter_arrival": "divergence", "hour_of_day": "excess_surprise_bits"}
+# Floor under each learned threshold: JS divergence in bits, or bits per event of excess surprise
+MIN_SCORE = {"action_mix": 0.05, "inter_arrival": 0.05, "hour_of_day": 2.0}
+DRIFT_SEVERITY = {"action_mix": "medium", "inter_arrival": "medium", "hour_of_day": "low"}
+
+
+def js_divergence(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Row-wise Jensen-Shannon divergence in bits (0 = identical, 1 = disjoint) of two row-normalised matrices"""
+    m = 0.5 * (p + q)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kl_pm = np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=1)
+        kl_qm = np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=1)
+    return 0.5 * (kl_pm + kl_qm)
+
+
+def excess_surprise(baseline: np.ndarray, window: np.ndarray, alpha: float) -> np.ndarray:
+    """Row-wise bits per event by which window activity is less likely than typical baseline activity.
+
+    Mean negative log-likelihood of the window's events under the smoothed
+    baseline distribution, minus that distribution's entropy.
+    """
+    p = (baseline + alpha) / (baseline + alpha).sum(axis=1, keepdims=True)
+    log_p = np.log2(p)
+    events = window.sum(axis=1)
+    nll = -(window * log_p).sum(axis=1) / np.maximum(events, 1)
+    entropy = -(p * log_p).sum(axis=1)
+    return nll - entropy
+
+
+class BehaviorProfiler:
+    """Per-agent histograms of observed behavior and self-calibrating drift detection.
+
+    observe() is O(1) and only bumps counters for the current period. update()
+    runs once per interval: it scores every agent's period against its learned
+    profile, flags scores far above that agent's own score history, then folds
+    the period into the profile with exponential decay.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS, decay: float = 0.95, alpha: float = 0.5,
+                 min_profile_events: int = 200, min_period_events: int = 20, warmup_periods: int = 3,
+                 sensitivity: float = 3.0, score_weight: float = 0.1, clock=time.monotonic):
+        self.interval = interval
+        self.decay = decay
+        self.alpha = alpha
+        self.min_profile_events = min_profile_events
+        self.min_period_events = min_period_events
+        self.warmup_periods = warmup_periods
+        self.sensitivity = sensitivity
+        self.score_weight = score_weight
+        self._clock = clock
+        self._next_update = clock() + interval
+
+        self._agents: Dict[str, int] = {}
+        self._actions: Dict[str, int] = {}
+        self._last_seen: List[Optional[float]] = []
+        sizes = {"action_mix": 8, "inter_arrival": len(INTER_ARRIVAL_EDGES) + 1, "hour_of_day": 24}
+        # Learned (decayed) counts and counts for the current period, agents x bins per feature
+        self._profile = {feature: np.zeros((4, size)) for feature, size in sizes.items()}
+        self._period = {feature: np.zeros((4, size)) for feature, size in sizes.items()}
+        # Running mean and variance of each agent's own scores, the per-agent threshold
+        self._score_mean = {feature: np.zeros(4) for feature in FEATURES}
+        self._score_var = {feature: np.zeros(4) for feature in FEATURES}
+        self._periods_scored = np.zeros(4, dtype=np.int64)
+        self.last_scores: Dict[str, Dict] = {}
+        self.updates = 0
+
+    def _grow(self, rows: int = None, action_columns: int = None):
+        """Double the count matrices when a new agent or action no longer fits"""
+        for feature in FEATURES:
+            for counts in (self._profile, self._period):
+                old = counts[feature]
+                new_rows = rows or old.shape[0]
+                new_cols = action_columns if feature == "action_mix" and action_columns else old.shape[1]
+                grown = np.zeros((new_rows, new_cols))
+                grown[:old.shape[0], :old.shape[1]] = old
+                counts[feature] = grown
+            if rows:
+                for stats in (self._score_mean, self._score_var):
+                    stats[feature] = np.concatenate([stats[feature], np.zeros(rows - len(stats[feature]))])
+        if rows:
+            self._periods_scored = np.concatenate([self._periods_scored,
+                                                   np.zeros(rows - len(self._periods_scored), dtype=np.int64)])
+
+    def _agent_row(self, agent_id: str) -> int:
+        row = self._agents.get(agent_id)
+        if row is None:
+            row = self._agents[agent_id] = len(self._agents)
+            self._last_seen.append(None)
+            if row >= self._profile["hour_of_day"].shape[0]:
+                self._grow(rows=2 * self._profile["hour_of_day"].shape[0])
+        return row
+
+    def _action_column(self, action: str) -> int:
+        column = self._actions.get(action)
+        if column is None:
+            column = self._actions[action] = len(self._actions)
+            if column >= self._profile["action_mix"].shape[1]:
+                self._grow(action_columns=2 * self._profile["action_mix"].shape[1])
+        return column
+
+    def observe(self, agent_id: str, action: str, at: float, hour: int):
+        """Count one action; `at` is monotonic seconds"""
+        # Resolve both before indexing: either may grow the matrices and replace them
+        row = self._agent_row(agent_id)
+        column = self._action_column(action)
+        self._period["action_mix"][row, column] += 1
+        self._period["hour_of_day"][row, hour] += 1
+        last = self._last_seen[row]
+        if last is not None:
+            self._period["inter_arrival"][row, bisect_right(INTER_ARRIVAL_EDGES, max(at - last, 0.0))] += 1
+        self._last_seen[row] = at
+
+    def due(self) -> bool:
+        return self._clock() >= self._next_update
+
+    def update(self) -> List[Dict]:
+        """Score the finished period for every agent, fold it into the profiles and return drift findings"""
+        self._next_update = self._clock() + self.interval
+        n = len(self._agents)
+        if n == 0:
+            return []
+        agent_ids = list(self._agents)
+        profile_events = self._profile["action_mix"][:n].sum(axis=1)
+        period_events = self._period["action_mix"][:n].sum(axis=1)
+        scored = (profile_events >= self.min_profile_events) & (period_events >= self.min_period_events)
+        calibrated = scored & (self._periods_scored[:n] >= self.warmup_periods)
+        first = scored & (self._periods_scored[:n] == 0)
+
+        findings = []
+        scores = {}
+        for feature in FEATURES:
+            # Action columns beyond the known actions are spare capacity, not outcomes
+            columns = len(self._actions) if feature == "action_mix" else None
+            profile = self._profile[feature][:n, :columns]
+            period = self._period[feature][:n, :columns]
+            p = (profile + self.alpha) / (profile + self.alpha).sum(axis=1, keepdims=True)
+            q = period / np.maximum(period.sum(axis=1, keepdims=True), 1)
+            measures = {"divergence": js_divergence(p, q),
+                        "excess_surprise_bits": excess_surprise(profile, period, self.alpha)}
+            score = measures[SCORE_MEASURE[feature]]
+
+            mean, var = self._score_mean[feature][:n], self._score_var[feature][:n]
+            threshold = np.maximum(mean + self.sensitivity * np.sqrt(var), MIN_SCORE[feature])
+            drifted = calibrated & (score > threshold)
+            for row in np.flatnonzero(drifted):
+                findings.append({
+                    "agent_id": agent_ids[row],
+                    "feature": feature,
+                    "severity": DRIFT_SEVERITY[feature],
+                    "measure": SCORE_MEASURE[feature],
+                    "score": round(float(score[row]), 4),
+                    "threshold": round(float(threshold[row]), 4),
+                    "period_events": int(period_events[row])
+                })
+
+            # Exponentially weighted mean and variance of each agent's own scores, seeded by its first score
+            weight = self.score_weight
+            delta = np.where(scored, score - mean, 0.0)
+            mean += np.where(first, delta, weight * delta)
+            var[:] = np.where(scored & ~first, (1 - weight) * (var + weight * delta ** 2), var)
+            scores[feature] = {**measures, "threshold": threshold}
+
+        self._periods_scored[:n] += scored
+        for feature in FEATURES:
+            self._profile[feature] *= self.decay
+            self._profile[feature] += self._period[feature]
+            self._period[feature][:] = 0
+
+        self.last_scores = {
+            agent_id: {
+                "scored": bool(scored[row]),
+                "period_events": int(period_events[row]),
+                **{feature: {name: round(float(values[row]), 4) for name, values in scores[feature].items()}
+                   for feature in FEATURES}
+            }
+            for row, agent_id in enumerate(agent_ids)
+        }
+        self.updates += 1
+        return findings
+
+    def get_profile(self, agent_id: str, top: int = 5) -> Optional[Dict]:
+        """Learned distributions for one agent"""
+        row = self._agents.get(agent_id)
+        if row is None:
+            return None
+        actions = self._profile["action_mix"][row, :len(self._actions)]
+        total = actions.sum()
+        names = list(self._actions)
+        order = np.argsort(actions)[::-1][:top]
+        hours = self._profile["hour_of_day"][row]
+        return {
+            "agent_id": agent_id,
+            "profile_events": round(float(total), 1),
+            "periods_scored": int(self._periods_scored[row]),
+            "top_actions": {names[i]: round(float(actions[i] / total), 4) for i in order if actions[i] > 0} if total else {},
+            "active_hours": [int(h) for h in np.flatnonzero(hours >= 0.01 * hours.sum())] if hours.sum() else [],
+            "last_scores": self.last_scores.get(agent_id)
+        }
+
+    def get_profiles(self) -> Dict:
+        return {
+            "interval_seconds": self.interval,
+            "updates": self.updates,
+            "agents": {agent_id: self.get_profile(agent_id) for agent_id in self._agents}
+        }
@@ -0,0 +1,166 @@
+"""
+UEBA Pipeline - Feeds every agent action to the UEBA monitor off the request path
+Agents publish to a bounded queue; a background worker drains it in batches
+"""
+import logging
+import os
+import queue
+import sys
+import threading
+from typing import Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.action_log import ActionRecord, register_sink
+from monitoring.metrics import registry
+from .ueba import UEBAMonitor, ueba_monitor
+
+UEBA_QUEUE_SIZE = int(os.environ.get("UEBA_QUEUE_SIZE", "10000"))
+UEBA_BATCH_SIZE = int(os.environ.get("UEBA_BATCH_SIZE", "256"))
+
+EVENTS = registry.counter("ueba_pipeline_events_total", "Agent actions offered to the UEBA pipeline", ["outcome"])
+BATCHES = registry.counter("ueba_pipeline_batches_total", "Batches checked by the UEBA worker")
+FAILURES = registry.counter("ueba_pipeline_failures_total", "UEBA worker steps that raised", ["stage"])
+
+logger = logging.getLogger(__name__)
+
+
+class UEBAPipeline:
+    """Action-log sink that queues records for a background UEBA worker.
+
+    Publishing never blocks: when the queue is full the record is dropped and
+    counted, so a slow or stalled worker cannot add latency to agent calls.
+    A batch or profile update that raises is logged and counted, and the
+    worker carries on with the next one.
+    """
+
+    def __init__(self, monitor: UEBAMonitor, maxsize: int = UEBA_QUEUE_SIZE, batch_size: int = UEBA_BATCH_SIZE):
+        self.monitor = monitor
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[ActionRecord]" = queue.Queue(maxsize)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self.anomalies = 0
+        self.max_depth = 0
+        self.failed_batches = 0
+        self.failed_records = 0
+        self.failed_profile_updates = 0
+        self.last_error = None
+        self._published = EVENTS.labels("published")
+        self._dropped = EVENTS.labels("dropped")
+        self._batch_failures = FAILURES.labels("batch")
+        self._profile_failures = FAILURES.labels("profiles")
+
+    def __call__(self, record: ActionRecord):
+        """Queue one record for checking, or drop it if the queue is full"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._dropped.inc()
+            return
+        self.published += 1
+        self._published.inc()
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            self.start()
+
+    @property
+    def running(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ueba-pipeline", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the worker and check whatever is still queued"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        while self._drain():
+            pass
+
+    def _next_batch(self, timeout: float = None) -> List[ActionRecord]:
+        """Up to batch_size queued records, waiting up to `timeout` for the first (not at all when None)"""
+        try:
+            batch = [self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()]
+        except queue.Empty:
+            return []
+        depth = self._queue.qsize() + 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, timeout: float = None) -> int:
+        """Check one batch; returns its size"""
+        batch = self._next_batch(timeout)
+        if not batch:
+            return 0
+        try:
+            self.anomalies += self.monitor.record_batch(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            self.failed_records += len(batch)
+            self.last_error = f"batch: {type(e).__name__}: {e}"
+            self._batch_failures.inc()
+            logger.exception("UEBA pipeline failed to check a batch of %d records", len(batch))
+            return len(batch)
+        self.processed += len(batch)
+        self.batches += 1
+        BATCHES.inc()
+        return len(batch)
+
+    def _update_profiles(self):
+        try:
+            self.anomalies += self.monitor.update_profiles()
+        except Exception as e:
+            self.failed_profile_updates += 1
+            self.last_error = f"profiles: {type(e).__name__}: {e}"
+            self._profile_failures.inc()
+            logger.exception("UEBA pipeline failed to update behavior profiles")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(timeout=0.1)
+            self._update_profiles()
+
+    def get_stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.maxsize,
+            "max_depth": self.max_depth,
+            "published": self.published,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.processed / self.batches, 2) if self.batches else 0,
+            "anomalies_detected": self.anomalies,
+            "failed_batches": self.failed_batches,
+            "failed_records": self.failed_records,
+            "failed_profile_updates": self.failed_profile_updates,
+            "last_error": self.last_error
+        }
+
+
+# Global UEBA pipeline, subscribed to every agent's action log
+ueba_pipeline = UEBAPipeline(ueba_monitor)
+register_sink(ueba_pipeline)
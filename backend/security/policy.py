@@ -0,0 +1,158 @@
+"""
+UEBA Policy - Agent permissions compiled from a JSON policy file into constant-time lookups
+The file is re-read when its modification time changes, so permissions can be edited live
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+DEFAULT_POLICY_PATH = os.environ.get(
+    "UEBA_POLICY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "policies.json")
+)
+# Minimum seconds between modification-time checks of the policy file
+POLICY_RELOAD_SECONDS = float(os.environ.get("UEBA_POLICY_RELOAD_SECONDS", "2"))
+
+# Sliding windows for action-frequency checks, in seconds
+RATE_WINDOWS = {"1m": 60, "10m": 600, "1h": 3600}
+# Default limit per window as a multiple of the per-minute limit (sustained rates must stay lower than bursts)
+RATE_LIMIT_MULTIPLIERS = {"1m": 1, "10m": 5, "1h": 20}
+
+
+def default_rate_limits(per_minute: int) -> Dict[str, int]:
+    """Limit per sliding window, scaled from a per-minute limit"""
+    return {window: per_minute * RATE_LIMIT_MULTIPLIERS[window] for window in RATE_WINDOWS}
+
+
+class PrefixTrie:
+    """Character trie answering "does any stored prefix start this string" in O(len(string))"""
+
+    __slots__ = ("_root",)
+    _END = ""
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._END] = True
+
+    def matches(self, text: str) -> bool:
+        node = self._root
+        if self._END in node:
+            return True
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+
+class AgentPolicy:
+    """One agent's compiled permissions"""
+
+    __slots__ = ("agent_id", "actions", "action_prefixes", "data_access", "all_data", "rate_limits", "baseline")
+
+    def __init__(self, agent_id: str, spec: Dict, default_per_minute: int):
+        self.agent_id = agent_id
+        self.actions = frozenset(spec.get("allowed_actions", ()))
+        self.action_prefixes = PrefixTrie(spec.get("allowed_action_prefixes", ()))
+        data_access = frozenset(spec.get("allowed_data_access", ()))
+        self.all_data = "all" in data_access
+        self.data_access = data_access
+        per_minute = spec.get("max_actions_per_minute", default_per_minute)
+        self.rate_limits = {**default_rate_limits(per_minute), **spec.get("rate_limits", {})}
+        # Plain form for reports and the dashboard
+        self.baseline = {**spec, "max_actions_per_minute": per_minute, "rate_limits": self.rate_limits}
+
+    def allows_action(self, action: str) -> bool:
+        """An agent with no listed actions is unrestricted"""
+        if not self.actions and not self.action_prefixes:
+            return True
+        return action in self.actions or self.action_prefixes.matches(action)
+
+    def allows_data(self, data: str) -> bool:
+        return self.all_data or data in self.data_access
+
+
+class PolicyStore:
+    """Compiled policies for every agent, swapped atomically when the policy file changes"""
+
+    def __init__(self, path: str = DEFAULT_POLICY_PATH, reload_interval: float = POLICY_RELOAD_SECONDS,
+                 default_per_minute: int = 50):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.default_per_minute = default_per_minute
+        self.default_policy = AgentPolicy("default", {}, default_per_minute)
+        self.policies: Dict[str, AgentPolicy] = {}
+        self.version = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read and compile the policy file; raises if it is missing or invalid"""
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path) as f:
+            document = json.load(f)
+        policies = {agent_id: AgentPolicy(agent_id, spec, self.default_per_minute)
+                    for agent_id, spec in document["agents"].items()}
+        self.policies = policies
+        self.version = document.get("version")
+        self.loaded_at = time.time()
+        self._mtime = mtime
+        self.last_error = None
+
+    def maybe_reload(self) -> bool:
+        """Reload if the file changed since the last load; checks the file at most once per reload_interval.
+
+        A file that fails to parse is reported in last_error and the current policies stay in force.
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.reload_interval
+            try:
+                if os.stat(self.path).st_mtime_ns == self._mtime:
+                    return False
+                self.load()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self.reloads += 1
+            return True
+
+    def get(self, agent_id: str) -> AgentPolicy:
+        return self.policies.get(agent_id, self.default_policy)
+
+    @property
+    def baselines(self) -> Dict[str, Dict]:
+        return {agent_id: policy.baseline for agent_id, policy in self.policies.items()}
+
+    def get_status(self) -> Dict:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "agents": len(self.policies),
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,72 @@
+"""
+Rate Windows - Constant-time sliding-window action counters on a monotonic clock
+"""
+import time
+from typing import Callable, Dict
+
+
+class SlidingWindowCounter:
+    """Events in the trailing window, kept in a ring of fixed-width time buckets.
+
+    Recording and reading cost O(1) amortised (at most one pass over the ring
+    after a long idle gap), independent of how many events were ever recorded.
+    The count covers the current partial bucket plus the previous buckets - 1,
+    so it is exact to within one bucket width.
+    """
+
+    __slots__ = ("window_seconds", "buckets", "width", "_counts", "_head", "_total", "_clock")
+
+    def __init__(self, window_seconds: float, buckets: int = 60, clock: Callable[[], float] = time.monotonic):
+        if window_seconds <= 0 or buckets < 1:
+            raise ValueError("window_seconds and buckets must be positive")
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.width = window_seconds / buckets
+        self._counts = [0] * buckets
+        self._head = int(clock() / self.width)
+        self._total = 0
+        self._clock = clock
+
+    def _advance(self, now: float):
+        """Expire buckets that have slid out of the window"""
+        index = int(now / self.width)
+        elapsed = index - self._head
+        if elapsed <= 0:
+            return
+        if elapsed >= self.buckets:
+            self._counts = [0] * self.buckets
+            self._total = 0
+        else:
+            counts = self._counts
+            for i in range(self._head + 1, index + 1):
+                slot = i % self.buckets
+                self._total -= counts[slot]
+                counts[slot] = 0
+        self._head = index
+
+    def add(self, amount: int = 1, now: float = None) -> int:
+        """Record events and return the count now in the window"""
+        self._advance(self._clock() if now is None else now)
+        self._counts[self._head % self.buckets] += amount
+        self._total += amount
+        return self._total
+
+    def count(self, now: float = None) -> int:
+        self._advance(self._clock() if now is None else now)
+        return self._total
+
+
+class RateTracker:
+    """One sliding-window counter per named window, all advanced together"""
+
+    __slots__ = ("counters",)
+
+    def __init__(self, windows: Dict[str, float], buckets: int = 60, clock: Callable[[], float] = time.monotonic):
+        self.counters = {name: SlidingWindowCounter(seconds, buckets, clock) for name, seconds in windows.items()}
+
+    def add(self, amount: int = 1, now: float = None) -> Dict[str, int]:
+        """Record events and return the count in each window"""
+        return {name: counter.add(amount, now) for name, counter in self.counters.items()}
+
+    def counts(self) -> Dict[str, int]:
+        return {name: counter.count() for name, counter in self.counters.items()}
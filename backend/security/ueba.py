@@ -2,91 +2,144 @@
 UEBA Monitor - User and Entity Behavior Analytics for Agentic AI security
 Monitors agent behavior, detects anomalies, and prevents unauthorized actions
 """
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from collections import defaultdict
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional
+from collections import Counter, defaultdict, deque
+from .behavior_profiles import BehaviorProfiler
+from .policy import DEFAULT_POLICY_PATH, RATE_WINDOWS, PolicyStore
+from .rate_window import RateTracker
+
+# Most recent actions kept per agent; lifetime totals are counted separately
+ACTION_HISTORY_SIZE = int(os.environ.get("UEBA_ACTION_HISTORY", "1000"))
+# Most recent anomalies kept for queries; lifetime counts are kept separately
+ANOMALY_LOG_SIZE = int(os.environ.get("UEBA_ANOMALY_LOG_SIZE", "10000"))
+# A non-critical anomaly repeating within this many seconds updates the earlier entry instead of adding one
+ANOMALY_DEDUP_SECONDS = float(os.environ.get("UEBA_ANOMALY_DEDUP_SECONDS", "60"))
+SEVERITIES = ("critical", "high", "medium", "low")
+MAX_ANOMALY_PAGE = 500
 
 class UEBAMonitor:
-    def __init__(self):
+    def __init__(self, policy_path: str = DEFAULT_POLICY_PATH, history_size: int = ACTION_HISTORY_SIZE,
+                 anomaly_log_size: int = ANOMALY_LOG_SIZE, dedup_seconds: float = ANOMALY_DEDUP_SECONDS):
         self.agent_id = "ueba_monitor"
         self.name = "UEBA Security Monitor"
-        self.behavioral_baselines = {}
+        # Most recent anomalies in detection order; anomaly_log[i] has sequence number _anomaly_base + i
         self.anomaly_log = []
-        self.action_history = defaultdict(list)
+        self._anomaly_base = 0
+        self.anomaly_log_size = anomaly_log_size
+        self.dedup_seconds = dedup_seconds
+        # (agent, type, discriminator) -> (sequence number, monotonic time) of the last entry logged for it
+        self._last_anomaly: Dict[tuple, tuple] = {}
+        self.action_history = defaultdict(lambda: deque(maxlen=history_size))
+        # Running aggregates, updated as actions and anomalies are recorded
+        self.total_actions = 0
+        self.action_counts = Counter()
+        self.anomaly_counts = {"severity": Counter(), "agent": Counter(), "type": Counter()}
+        # Secondary indexes: ascending sequence numbers per severity, agent and (agent, severity)
+        self._anomaly_index = defaultdict(list)
+        self._clock = time.monotonic
+        self._rates: Dict[str, RateTracker] = {}
+        # Actions arrive from the UEBA pipeline worker as well as from request handlers
+        self._lock = threading.RLock()
         self.alert_thresholds = {
             "action_frequency": 50,  # Max actions per minute
             "unauthorized_access": 1,  # Any unauthorized access triggers alert
             "unusual_time": {"start": 0, "end": 5}  # Unusual hours (12am-5am)
         }
-        self._initialize_baselines()
+        # Agent permissions, compiled from the policy file and reloaded when it changes
+        self.policy = PolicyStore(policy_path, default_per_minute=self.alert_thresholds["action_frequency"])
+        # Learned per-agent behavior, scored once per profile interval
+        self.profiles = BehaviorProfiler()
     
-    def _initialize_baselines(self):
-        """Initialize behavioral baselines for each agent"""
-        self.behavioral_baselines = {
-            "data_analysis_agent": {
-                "allowed_actions": ["analyze_sensor_trends", "detect_anomalies", "forecast_service_demand", "risk_assessment"],
-                "allowed_data_access": ["telematics", "maintenance", "vehicles"],
-                "max_actions_per_minute": 30
-            },
-            "diagnosis_agent": {
-                "allowed_actions": ["predict_failure", "diagnose_dtc", "analyze_component_risks"],
-                "allowed_data_access": ["analysis_results", "maintenance", "vehicles"],
-                "max_actions_per_minute": 20
-            },
-            "customer_engagement_agent": {
-                "allowed_actions": ["initiate_conversation", "process_response", "generate_notification"],
-                "allowed_data_access": ["diagnosis", "customer", "vehicles"],
-                "max_actions_per_minute": 40
-            },
-            "scheduling_agent": {
-                "allowed_actions": ["find_best_slots", "create_booking", "check_capacity", "reschedule", "cancel"],
-                "allowed_data_access": ["service_centers", "appointments", "diagnosis"],
-                "max_actions_per_minute": 25
-            },
-            "feedback_agent": {
-                "allowed_actions": ["initiate_followup", "collect_feedback", "update_records"],
-                "allowed_data_access": ["appointments", "vehicles", "customer"],
-                "max_actions_per_minute": 15
-            },
-            "manufacturing_insights_agent": {
-                "allowed_actions": ["analyze_patterns", "generate_report", "link_to_rca"],
-                "allowed_data_access": ["rca_capa", "predictions", "maintenance"],
-                "max_actions_per_minute": 10
-            },
-            "master_agent": {
-                "allowed_actions": ["orchestrate", "initiate_workflow", "process_chat", "schedule_service"],
-                "allowed_data_access": ["all"],
-                "max_actions_per_minute": 100
-            }
-        }
+    @property
+    def behavioral_baselines(self) -> Dict[str, Dict]:
+        """Per-agent baselines as loaded from the policy file"""
+        return self.policy.baselines
+
+    def _rate_tracker(self, agent_id: str) -> RateTracker:
+        tracker = self._rates.get(agent_id)
+        if tracker is None:
+            tracker = self._rates[agent_id] = RateTracker(RATE_WINDOWS, clock=self._clock)
+        return tracker
     
     def record_action(self, agent_id: str, action: str, data_accessed: List[str] = None, details: dict = None):
         """Record an action for behavior analysis"""
+        self.policy.maybe_reload()
+        with self._lock:
+            anomalies = self._record(agent_id, action, data_accessed or [], details, datetime.now(), self._clock())
+        return {"recorded": True, "anomalies_detected": anomalies}
+
+    def record_batch(self, records: Iterable) -> int:
+        """Record a batch of agent action-log records under one lock; returns the number of anomalies"""
+        anomalies = 0
+        self.policy.maybe_reload()
+        with self._lock:
+            for record in records:
+                anomalies += self._record(record.agent_id, record.action, list(record.data_accessed), record.details,
+                                          datetime.fromtimestamp(record.wall_time), record.timestamp_ns / 1e9)
+        return anomalies
+
+    def _record(self, agent_id: str, action: str, data_accessed: List[str], details: dict,
+                timestamp: datetime, at: float) -> int:
+        """Store one action and log its anomalies; `at` is its monotonic time in seconds"""
         record = {
             "agent_id": agent_id,
             "action": action,
-            "data_accessed": data_accessed or [],
+            "data_accessed": data_accessed,
             "details": details,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp.isoformat()
         }
         self.action_history[agent_id].append(record)
+        self.total_actions += 1
+        self.action_counts[agent_id] += 1
+        self.profiles.observe(agent_id, action, at, timestamp.hour)
         
         # Check for anomalies
-        anomalies = self._check_anomalies(agent_id, action, data_accessed or [])
-        if anomalies:
-            for anomaly in anomalies:
-                self._log_anomaly(agent_id, anomaly, record)
-        
-        return {"recorded": True, "anomalies_detected": len(anomalies) if anomalies else 0}
+        anomalies = self._check_anomalies(agent_id, action, data_accessed, at, timestamp.hour)
+        for anomaly in anomalies:
+            self._log_anomaly(agent_id, anomaly, record)
+        return len(anomalies)
     
-    def _check_anomalies(self, agent_id: str, action: str, data_accessed: List[str]) -> List[Dict]:
+    def update_profiles(self, force: bool = False) -> int:
+        """Score recent activity against the learned profiles when the interval has elapsed; returns anomalies logged"""
+        if not force and not self.profiles.due():
+            return 0
+        with self._lock:
+            findings = self.profiles.update()
+            now = datetime.now()
+            for finding in findings:
+                record = {
+                    "agent_id": finding["agent_id"],
+                    "action": "behavior_profile_update",
+                    "data_accessed": [],
+                    "details": finding,
+                    "timestamp": now.isoformat()
+                }
+                self._log_anomaly(finding["agent_id"], {
+                    "type": "behavior_drift",
+                    "severity": finding["severity"],
+                    "feature": finding["feature"],
+                    "description": f"Agent {finding['feature'].replace('_', ' ')} drifted from its learned profile "
+                                   f"({finding['measure']} {finding['score']}, threshold {finding['threshold']})"
+                }, record)
+        return len(findings)
+
+    def get_behavior_profiles(self) -> Dict:
+        with self._lock:
+            return self.profiles.get_profiles()
+    
+    def _check_anomalies(self, agent_id: str, action: str, data_accessed: List[str], at: float = None,
+                         hour: int = None) -> List[Dict]:
         """Check for anomalous behavior"""
         anomalies = []
-        baseline = self.behavioral_baselines.get(agent_id, {})
+        policy = self.policy.get(agent_id)
         
         # Check 1: Unauthorized action
-        allowed_actions = baseline.get("allowed_actions", [])
-        if allowed_actions and not any(allowed in action for allowed in allowed_actions):
+        if not policy.allows_action(action):
             anomalies.append({
                 "type": "unauthorized_action",
                 "severity": "high",
@@ -94,29 +147,28 @@ class UEBAMonitor:
             })
         
         # Check 2: Unauthorized data access
-        allowed_data = baseline.get("allowed_data_access", [])
-        if "all" not in allowed_data:
-            for data in data_accessed:
-                if data not in allowed_data:
-                    anomalies.append({
-                        "type": "unauthorized_data_access",
-                        "severity": "critical",
-                        "description": f"Agent accessed unauthorized data: {data}"
-                    })
+        for data in data_accessed:
+            if not policy.allows_data(data):
+                anomalies.append({
+                    "type": "unauthorized_data_access",
+                    "severity": "critical",
+                    "description": f"Agent accessed unauthorized data: {data}"
+                })
         
-        # Check 3: Action frequency (rate limiting)
-        recent_actions = [a for a in self.action_history[agent_id] 
-                        if datetime.fromisoformat(a["timestamp"]) > datetime.now() - timedelta(minutes=1)]
-        max_actions = baseline.get("max_actions_per_minute", 50)
-        if len(recent_actions) > max_actions:
-            anomalies.append({
-                "type": "high_frequency",
-                "severity": "medium",
-                "description": f"Unusual action frequency: {len(recent_actions)} actions/min (limit: {max_actions})"
-            })
+        # Check 3: Action frequency (rate limiting) over each sliding window
+        rate_limits = policy.rate_limits
+        for window, count in self._rate_tracker(agent_id).add(now=at).items():
+            limit = rate_limits.get(window)
+            if limit is not None and count > limit:
+                anomalies.append({
+                    "type": "high_frequency",
+                    "severity": "medium",
+                    "window": window,
+                    "description": f"Unusual action frequency: {count} actions in {window} (limit: {limit})"
+                })
         
         # Check 4: Unusual time
-        hour = datetime.now().hour
+        hour = datetime.now().hour if hour is None else hour
         if self.alert_thresholds["unusual_time"]["start"] <= hour < self.alert_thresholds["unusual_time"]["end"]:
             anomalies.append({
                 "type": "unusual_time",
@@ -127,21 +179,59 @@ class UEBAMonitor:
         return anomalies
     
     def _log_anomaly(self, agent_id: str, anomaly: Dict, action_record: Dict):
-        """Log detected anomaly"""
+        """Log detected anomaly, folding quick non-critical repeats into the earlier entry"""
+        severity = anomaly["severity"]
+        now = self._clock()
+        # Counted per detection, so folded repeats still show up in the dashboard totals
+        self.anomaly_counts["severity"][severity] += 1
+        self.anomaly_counts["agent"][agent_id] += 1
+        self.anomaly_counts["type"][anomaly["type"]] += 1
+        # Rate and drift anomalies are told apart by window and feature, unauthorized actions by action
+        key = (agent_id, anomaly["type"],
+               anomaly.get("window") or anomaly.get("feature")
+               or (action_record["action"] if anomaly["type"] == "unauthorized_action" else None))
+        if severity != "critical":
+            last = self._last_anomaly.get(key)
+            if last is not None and now - last[1] < self.dedup_seconds and last[0] >= self._anomaly_base:
+                entry = self.anomaly_log[last[0] - self._anomaly_base]
+                entry["occurrences"] += 1
+                entry["last_detected_at"] = action_record["timestamp"]
+                entry["last_trigger_action"] = action_record
+                return
+
+        seq = self._anomaly_base + len(self.anomaly_log)
+        self._last_anomaly[key] = (seq, now)
         log_entry = {
-            "id": f"ANM{len(self.anomaly_log) + 1001}",
+            "id": f"ANM{seq + 1001}",
             "agent_id": agent_id,
             "anomaly": anomaly,
             "trigger_action": action_record,
             "status": "detected",
-            "detected_at": datetime.now().isoformat()
+            "detected_at": datetime.now().isoformat(),
+            "occurrences": 1
         }
         self.anomaly_log.append(log_entry)
+        if len(self.anomaly_log) > self.anomaly_log_size:
+            self._trim_anomalies()
+        for key in (("severity", severity), ("agent", agent_id), ("agent_severity", agent_id, severity)):
+            self._anomaly_index[key].append(seq)
         
         # Auto-response for critical anomalies
-        if anomaly["severity"] == "critical":
+        if severity == "critical":
             self._trigger_alert(log_entry)
     
+    def _trim_anomalies(self):
+        """Drop the oldest quarter of the anomaly log and its index entries, so trimming is amortized O(1)"""
+        drop = max(1, len(self.anomaly_log) - 3 * self.anomaly_log_size // 4)
+        del self.anomaly_log[:drop]
+        self._anomaly_base += drop
+        for key in list(self._anomaly_index):
+            seqs = self._anomaly_index[key]
+            del seqs[:bisect_left(seqs, self._anomaly_base)]
+            if not seqs:
+                del self._anomaly_index[key]
+        self._last_anomaly = {key: last for key, last in self._last_anomaly.items() if last[0] >= self._anomaly_base}
+    
     def _trigger_alert(self, anomaly_log: Dict):
         """Trigger alert for critical anomalies"""
         anomaly_log["alert_triggered"] = True
@@ -149,44 +239,85 @@ class UEBAMonitor:
     
     def get_anomalies(self, severity: str = None, agent_id: str = None) -> List[Dict]:
         """Get detected anomalies with optional filtering"""
-        anomalies = self.anomaly_log
+        with self._lock:
+            seqs = self._matching(severity, agent_id)
+            return [self._entry(seq) for seq in seqs]
+
+    def _entry(self, seq: int) -> Dict:
+        """Copy of one logged anomaly; call with the lock held, since folding repeats mutates entries"""
+        return self._copy_entry(self.anomaly_log[seq - self._anomaly_base])
+
+    @staticmethod
+    def _copy_entry(entry: Dict) -> Dict:
+        """Copy an anomaly entry and its nested dicts, the levels the monitor writes to"""
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in entry.items()}
+
+    def _matching(self, severity: Optional[str], agent_id: Optional[str]):
+        """Ascending sequence numbers of anomalies matching the filters"""
+        if severity and agent_id:
+            return self._anomaly_index.get(("agent_severity", agent_id, severity), [])
         if severity:
-            anomalies = [a for a in anomalies if a["anomaly"]["severity"] == severity]
+            return self._anomaly_index.get(("severity", severity), [])
         if agent_id:
-            anomalies = [a for a in anomalies if a["agent_id"] == agent_id]
-        return anomalies
+            return self._anomaly_index.get(("agent", agent_id), [])
+        return range(self._anomaly_base, self._anomaly_base + len(self.anomaly_log))
+
+    def query_anomalies(self, severity: str = None, agent_id: str = None, limit: int = 50,
+                        cursor: int = None) -> Dict:
+        """One page of matching anomalies, newest first.
+
+        `cursor` is the next_cursor of the previous page; each page costs
+        O(log n + limit) via the secondary indexes. Only the most recent
+        anomaly_log_size anomalies are retained.
+        """
+        limit = max(1, min(limit, MAX_ANOMALY_PAGE))
+        with self._lock:
+            seqs = self._matching(severity, agent_id)
+            end = len(seqs) if cursor is None else bisect_left(seqs, cursor)
+            start = max(0, end - limit)
+            page = [self._entry(seqs[i]) for i in range(end - 1, start - 1, -1)]
+            return {
+                "anomalies": page,
+                "next_cursor": seqs[start] if start > 0 else None,
+                "total": len(seqs)
+            }
     
     def get_agent_behavior_report(self, agent_id: str) -> Dict:
         """Get behavior analysis for an agent"""
-        actions = self.action_history.get(agent_id, [])
-        anomalies = [a for a in self.anomaly_log if a["agent_id"] == agent_id]
+        with self._lock:
+            recent = list(self.action_history[agent_id])[-10:] if agent_id in self.action_history else []
+            total_actions = self.action_counts[agent_id]
+            anomalies = self.anomaly_counts["agent"][agent_id]
         
         return {
             "agent_id": agent_id,
-            "total_actions": len(actions),
-            "anomalies_detected": len(anomalies),
-            "risk_level": "high" if len(anomalies) >= 3 else "medium" if len(anomalies) >= 1 else "low",
-            "recent_actions": actions[-10:] if actions else [],
+            "total_actions": total_actions,
+            "anomalies_detected": anomalies,
+            "risk_level": "high" if anomalies >= 3 else "medium" if anomalies >= 1 else "low",
+            "recent_actions": recent,
             "baseline": self.behavioral_baselines.get(agent_id, {})
         }
     
     def get_security_dashboard(self) -> Dict:
         """Get security dashboard data"""
-        total_actions = sum(len(actions) for actions in self.action_history.values())
-        critical = sum(1 for a in self.anomaly_log if a["anomaly"]["severity"] == "critical")
+        with self._lock:
+            by_severity = {severity: self.anomaly_counts["severity"][severity] for severity in SEVERITIES}
+            by_agent = dict(self.anomaly_counts["agent"])
+            by_type = dict(self.anomaly_counts["type"])
+            total_actions = self.total_actions
+            total_anomalies = sum(self.anomaly_counts["severity"].values())
+            recent_anomalies = [self._copy_entry(entry) for entry in self.anomaly_log[-5:]]
         
         return {
-            "status": "alert" if critical > 0 else "monitoring",
+            "status": "alert" if by_severity["critical"] > 0 else "monitoring",
             "total_actions_monitored": total_actions,
-            "total_anomalies": len(self.anomaly_log),
-            "by_severity": {
-                "critical": critical,
-                "high": sum(1 for a in self.anomaly_log if a["anomaly"]["severity"] == "high"),
-                "medium": sum(1 for a in self.anomaly_log if a["anomaly"]["severity"] == "medium"),
-                "low": sum(1 for a in self.anomaly_log if a["anomaly"]["severity"] == "low")
-            },
+            "total_anomalies": total_anomalies,
+            "by_severity": by_severity,
+            "by_agent": by_agent,
+            "by_type": by_type,
             "agents_monitored": list(self.behavioral_baselines.keys()),
-            "recent_anomalies": self.anomaly_log[-5:] if self.anomaly_log else []
+            "policy": self.policy.get_status(),
+            "recent_anomalies": recent_anomalies
         }
     
     def simulate_anomaly(self, anomaly_type: str) -> Dict: